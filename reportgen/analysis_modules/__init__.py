@@ -1,17 +1,30 @@
 from .alert_analysis import AlertsSummary, AlertsDetails
+from .api_proxy import MemoizedFiddlerApi
 from .base import BaseAnalysis
-from .connection_helpers import FrontEndCall
+from .concurrency import concurrency_controller, ConcurrencyController, AdaptiveLimiter
+from .connection_helpers import FrontEndCall, AsyncFrontEndCall, ConnectionConfig
 from .dataset_summary import DatasetSummary
+from .estimator import CostEstimator, recorded_latencies
 from .failure_case_analysis import FailureCaseAnalysis
 from .feature_impact import FeatureImpact
+from .instrumentation import IOStats
 from .metadata import MetaData
 from .model_evaluation import ModelEvaluation
 from .model_summary import ModelSummary
+from .output_cache import ModuleOutputCache
+from .planner import DataPlanner, DataRequirement
 from .project_summary import ProjectSummary
+from .response_cache import ResponseCache, CACHE_FOREVER, NO_CACHE
+from .schema_catalog import SchemaCatalog
+from .score_store import IntervalScoreStore
 from .segment_analysis import PerformanceTimeSeries, PerformanceAnalysisSpec, PerformanceAnalysis
 from .segment_analysis import Segment
 
 __all__ = ('BaseAnalysis', 'ProjectSummary', 'ModelSummary', 'DatasetSummary',
            'ModelEvaluation', 'PerformanceTimeSeries', 'Segment', 'FailureCaseAnalysis', 'MetaData',
            'AlertsSummary', 'AlertsDetails', 'FrontEndCall', 'PerformanceAnalysisSpec', 'PerformanceAnalysis',
-           'FeatureImpact')
+           'FeatureImpact', 'ConnectionConfig', 'AsyncFrontEndCall',
+           'ResponseCache', 'CACHE_FOREVER', 'NO_CACHE', 'MemoizedFiddlerApi',
+           'concurrency_controller', 'ConcurrencyController', 'AdaptiveLimiter', 'IOStats',
+           'DataPlanner', 'DataRequirement', 'ModuleOutputCache', 'CostEstimator', 'recorded_latencies',
+           'IntervalScoreStore', 'SchemaCatalog')
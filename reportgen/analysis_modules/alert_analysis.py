@@ -6,7 +6,8 @@ import fiddler as fdl
 import numpy as np
 import pandas as pd
 
-from .base import BaseAnalysis
+from .base import BaseAnalysis, is_open_window
+from .planner import DataRequirement, client_requirement
 from .plotting_helpers import pie_chart
 from ..output_modules import BaseOutput, SimpleTextBlock, FormattedTextBlock, FormattedTextStyle, SimpleTextStyle, \
     AddBreak, Table, \
@@ -35,6 +36,17 @@ class Alerts(BaseAnalysis):
         self.alerts_count = None
         self.alerts = None
 
+    def fingerprint_params(self) -> Optional[dict]:
+        # alerts are triggered until the end of the end date
+        if is_open_window(pd.Timestamp(self.end_time) + pd.Timedelta('1D') if self.end_time else None):
+            return None
+        return {'project_id': self.project_id,
+                'model_id': self.model_id,
+                'start_time': self.start_time,
+                'end_time': self.end_time,
+                'alert_rules': [rule.alert_rule_uuid for rule in self.alert_rules or []],
+                }
+
     def preflight(self, api, project_id):
         if not self.project_id:
             if project_id:
@@ -48,18 +60,31 @@ class Alerts(BaseAnalysis):
         if self.alert_rules is None:
             self.alert_rules = api.get_alert_rules(self.project_id, self.model_id)
 
-        self.alerts = self._get_alerts(api)
-        self.alerts_count = len(pd.concat(list(self.alerts.values()))) if self.alerts else 0
+    def _get_triggered_alerts_kwargs(self, rule) -> dict:
+        # Update the next line if the API changes to accept None args
+        kwargs = dict(alert_rule_uuid=rule.alert_rule_uuid,
+                      start_time=self.start_time,
+                      end_time=self.end_time,
+                      ordering=['alert_time_bucket'])
+        return {k: v for k, v in kwargs.items() if v is not None}
+
+    def requirements(self, api) -> List[DataRequirement]:
+        return [client_requirement('get_triggered_alerts', **self._get_triggered_alerts_kwargs(rule))
+                for rule in self.alert_rules]
+
+    def _load_alerts(self, api):
+        """
+        Fetches the triggered alerts of all alert rules once; called at the start of run so that the fetches can be
+        planned together with the other modules of the report.
+        """
+        if self.alerts is None:
+            self.alerts = self._get_alerts(api)
+            self.alerts_count = len(pd.concat(list(self.alerts.values()))) if self.alerts else 0
 
     def _get_alerts(self, api):
         alerts = {}
         for rule in self.alert_rules:
-            # Update the next line if the API changes to accept None args
-            kwargs = dict(alert_rule_uuid=rule.alert_rule_uuid,
-                          start_time=self.start_time,
-                          end_time=self.end_time,
-                          ordering=['alert_time_bucket'])
-            triggered_alerts = api.get_triggered_alerts(**{k: v for k, v in kwargs.items() if v is not None})
+            triggered_alerts = api.get_triggered_alerts(**self._get_triggered_alerts_kwargs(rule))
 
             alerts_dict = defaultdict(list)
             for a in triggered_alerts:
@@ -84,6 +109,7 @@ class Alerts(BaseAnalysis):
 
 class AlertsSummary(Alerts):
     def run(self, api) -> List[BaseOutput]:
+        self._load_alerts(api)
         if self.alerts_count > 0:
             alerts_df = pd.concat(list(self.alerts.values()), ignore_index=True)
             agg_df = alerts_df.groupby('severity').agg(count=('alert_type', 'size'),
@@ -125,6 +151,7 @@ class AlertsSummary(Alerts):
 
 class AlertsDetails(Alerts):
     def run(self, api) -> List[BaseOutput]:
+        self._load_alerts(api)
         output_modules = []
         output_modules += [SimpleTextBlock(text='Alert Rules and Incidents',
                                            style=SimpleTextStyle(font_style='bold', size=18))]
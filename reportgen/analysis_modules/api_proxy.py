@@ -0,0 +1,201 @@
+import contextlib
+import copy
+import inspect
+import threading
+from collections import defaultdict
+from concurrent.futures import Future
+
+from .concurrency import concurrency_controller
+from .deadline import call_with_deadline, call_with_deadline_holding, wait_result
+from .instrumentation import active_io_stats, track_call
+
+MEMOIZED_METHODS = ('list_projects',
+                    'list_models',
+                    'list_datasets',
+                    'get_dataset',
+                    'get_model_info',
+                    'get_alert_rules',
+                    )
+# client methods that acquire a slot of the concurrency budget with the same name before calling the backend
+CONTROLLED_METHODS = ('get_slice',
+                      )
+# hooks the connection helpers call instead of the client methods, returned unchanged since the front-end calls they
+# make are already tracked and bounded by the connection
+PASSTHROUGH_METHODS = ('frontend_transport',
+                       )
+
+
+def _call_key(name, method, args, kwargs):
+    try:
+        bound = inspect.signature(method).bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = tuple(bound.arguments.items())
+    except (TypeError, ValueError):
+        arguments = (args, tuple(sorted(kwargs.items())))
+    return name, repr(arguments)
+
+
+def _copy_result(result):
+    # memoized results are shared by all modules of a report, so each caller gets a copy it may modify
+    if hasattr(result, 'copy') and hasattr(result, 'memory_usage'):
+        return result.copy()
+    return copy.deepcopy(result)
+
+
+def _request_size(args, kwargs) -> int:
+    # only string arguments such as SQL queries are counted towards the request size of a client call
+    return sum(len(v) for v in list(args) + list(kwargs.values()) if isinstance(v, str))
+
+
+def _response_size(result) -> int:
+    if hasattr(result, 'memory_usage'):
+        return int(result.memory_usage(deep=True).sum())
+    return 0
+
+
+def _tracked(name, method, *args, **kwargs):
+    if active_io_stats.get() is None:
+        return method(*args, **kwargs)
+
+    with track_call(name, request_bytes=_request_size(args, kwargs)) as call:
+        result = method(*args, **kwargs)
+        call.response_bytes = _response_size(result)
+    return result
+
+
+class MemoizedFiddlerApi:
+    """
+    A proxy around the Fiddler client that memoizes the read-only metadata calls (see MEMOIZED_METHODS) shared by
+    the analysis modules of a report and applies backpressure to data calls (see CONTROLLED_METHODS). Results of other
+    methods are only kept if they were prefetched by the data planner (see planner.py); otherwise all attributes and
+    methods are forwarded to the client unchanged. Calls that reach the client are recorded in the active IOStats
+    object (see instrumentation.py); hooks such as the front-end transport (see PASSTHROUGH_METHODS) are returned
+    untracked. Every caller of a memoized method gets its own copy of the result. The report generator invalidates
+    the memoized results at the start of each report.
+    """
+    def __init__(self, api, memoized_methods=MEMOIZED_METHODS):
+        self._api = api
+        self._memoized_methods = set(memoized_methods)
+        self._prefetched_methods = set()
+        self._results = {}
+        self._lock = threading.Lock()
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+    @property
+    def client(self):
+        return self._api
+
+    def __getstate__(self):
+        # memoized results, locks and counters are per process; see snapshot and seed to share warm results
+        return {'api': self._api, 'memoized_methods': self._memoized_methods}
+
+    def __setstate__(self, state):
+        self.__init__(state['api'], state['memoized_methods'])
+
+    def __getattr__(self, name):
+        if name == '_api':
+            # not initialized yet, e.g. while being unpickled
+            raise AttributeError(name)
+        attr = getattr(self._api, name)
+        if name.startswith('_') or name in PASSTHROUGH_METHODS or not callable(attr) or isinstance(attr, type):
+            return attr
+
+        memoize = name in self._memoized_methods
+
+        def wrapper(*args, **kwargs):
+            if memoize or name in self._prefetched_methods:
+                return self._call(name, attr, args, kwargs, store=memoize)
+            return self._fetch(name, attr, args, kwargs)
+        return wrapper
+
+    def __dir__(self):
+        return sorted(set(dir(self._api)) | set(super().__dir__()))
+
+    @staticmethod
+    def _fetch(name, method, args, kwargs):
+        # the client has no timeouts of its own, so a stalled call is abandoned at the deadline of its module
+        if name in CONTROLLED_METHODS:
+            # an abandoned call holds its slot until it returns, since it still loads the backend
+            with contextlib.ExitStack() as stack:
+                stack.enter_context(concurrency_controller.acquire(name))
+                slot = stack.pop_all()
+            return call_with_deadline_holding(slot, _tracked, name, method, *args, **kwargs)
+        return call_with_deadline(_tracked, name, method, *args, **kwargs)
+
+    def _call(self, name, method, args, kwargs, store=True):
+        """
+        :param store: If False the result is only taken from memory if it has been prefetched, and is not kept.
+        """
+        key = _call_key(name, method, args, kwargs)
+        with self._lock:
+            future = self._results.get(key)
+            is_owner = future is None
+            if is_owner and store:
+                future = Future()
+                self._results[key] = future
+                self.misses[name] += 1
+            elif not is_owner:
+                self.hits[name] += 1
+
+        if is_owner and not store:
+            return self._fetch(name, method, args, kwargs)
+
+        # concurrent callers with the same arguments wait for the first call instead of repeating it
+        if is_owner:
+            try:
+                future.set_result(self._fetch(name, method, args, kwargs))
+            except BaseException as e:
+                with self._lock:
+                    self._results.pop(key, None)
+                future.set_exception(e)
+
+        return _copy_result(wait_result(future))
+
+    def prefetch(self, name, *args, **kwargs):
+        """
+        Calls a client method ahead of time (see planner.py) and keeps its result until the next invalidation, so
+        that the first call of the method with the same arguments is answered from memory.
+        """
+        method = getattr(self._api, name)
+        with self._lock:
+            self._prefetched_methods.add(name)
+        return self._call(name, method, args, kwargs)
+
+    def snapshot(self) -> dict:
+        """
+        Returns the successfully memoized results of the metadata calls. The snapshot can be pickled and passed to
+        seed, e.g. to share warm metadata with the worker processes of a batch run.
+        """
+        with self._lock:
+            items = list(self._results.items())
+        return {key: future.result() for key, future in items
+                if key[0] in self._memoized_methods and future.done() and future.exception() is None}
+
+    def seed(self, results: dict):
+        """
+        Adds memoized results taken from snapshot. Seeded results are kept until the next invalidation.
+        """
+        with self._lock:
+            for key, result in results.items():
+                future = Future()
+                future.set_result(result)
+                self._results.setdefault(key, future)
+
+    def invalidate(self):
+        """
+        Drops all memoized results and resets the hit/miss counters.
+        """
+        with self._lock:
+            self._results = {}
+            self._prefetched_methods = set()
+            self.hits = defaultdict(int)
+            self.misses = defaultdict(int)
+
+    def cache_stats(self) -> dict:
+        """
+        Returns the number of hits (round trips saved) and misses for each memoized method.
+        """
+        with self._lock:
+            return {name: {'hits': self.hits[name], 'misses': self.misses[name]}
+                    for name in sorted(set(self.hits) | set(self.misses))}
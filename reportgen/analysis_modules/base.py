@@ -1,9 +1,25 @@
 from abc import ABC, abstractmethod
-from typing import List, Type
+from collections import Counter
+from typing import List, Type, Iterator, Dict, Optional
+
+import pandas as pd
 
 from ..output_modules import BaseOutput
 
 
+def is_open_window(end_time) -> bool:
+    """
+    Returns True if a time window ending at end_time (None if it has no end) has not ended yet, so that its data
+    can still change.
+    """
+    if end_time is None:
+        return True
+    end_time = pd.Timestamp(end_time)
+    if end_time.tz is not None:
+        end_time = end_time.tz_convert('UTC').tz_localize(None)
+    return end_time > pd.Timestamp.now(tz='UTC').tz_localize(None)
+
+
 class BaseAnalysis(ABC):
     @abstractmethod
     def preflight(self, api, project_id):
@@ -14,6 +30,41 @@ class BaseAnalysis(ABC):
         """
         pass
 
+    def fingerprint_params(self) -> Optional[dict]:
+        """
+        Returns the parameters that determine the outputs of the module: its constructor arguments as resolved by
+        preflight (e.g. the time window), leaving out arguments that only affect how the data is fetched. The module
+        output cache keys the outputs of a module by these parameters, its class and the metadata of its project (see
+        ModuleOutputCache). Modules that return None, the default, are always run; so should modules whose outputs
+        depend on data that can still change, e.g. of a time window that is still open (see is_open_window).
+        """
+        return None
+
+    def requirements(self, api) -> list:
+        """
+        Declares the data (a list of DataRequirement objects, see planner.py) that the run method of the module will
+        fetch. It is called after preflight. The report generator merges the requirements of all modules and fetches
+        each unique one once before the modules are run. Modules that do not override this method are run as usual.
+        """
+        return []
+
+    def estimate_calls(self, api) -> Dict[str, int]:
+        """
+        Returns the number of backend calls that the run method of the module is expected to make, by front-end
+        endpoint or client method (e.g. scores, explain, get_slice). It is called after preflight by the dry run of the
+        report generator. The default counts the declared requirements; modules override it to add the calls that
+        depend on fetched data.
+        """
+        return dict(Counter(requirement.source for requirement in self.requirements(api)))
+
     @abstractmethod
     def run(self, api) -> List[Type[BaseOutput]]:
         pass
+
+    def iter_run(self, api) -> Iterator[BaseOutput]:
+        """
+        Streaming variant of run used by the report generator in streaming mode: output modules are yielded as soon
+        as they are created so that they can be rendered and released one at a time. The default yields the outputs of
+        run; modules with large outputs override this method and implement run as list(self.iter_run(api)).
+        """
+        yield from self.run(api)
@@ -0,0 +1,93 @@
+import contextlib
+import contextvars
+import os
+import shutil
+from typing import List, Callable, Iterator
+
+from .output_cache import ModuleOutputCache
+from ..output_modules import BaseOutput
+from ..output_modules.serialization import OUTPUTS_FILE
+
+DEFAULT_RUN_DIR = '.reportgen_runs'
+
+# checkpoint of the module (or submodule) that is currently run, see run_checkpointed
+active_checkpoint = contextvars.ContextVar('active_checkpoint', default=None)
+
+
+class RunCheckpoint(ModuleOutputCache):
+    """
+    The checkpoints of a report run: the outputs (images included) of every module that has completed, keyed by the
+    position and name of the module. Modules that contain submodules (e.g. ProjectSummary) checkpoint them in a nested
+    RunCheckpoint, so a rerun of a failed report only runs the modules and submodules that have not completed.
+    """
+    def __init__(self, directory: str):
+        super().__init__(directory, ttl=None)
+
+    def completed(self, key: str) -> bool:
+        return os.path.isfile(os.path.join(self._path(key), OUTPUTS_FILE))
+
+    def _scope_path(self, key: str) -> str:
+        return self._path(f'{key}.parts')
+
+    @contextlib.contextmanager
+    def scope(self, key: str):
+        """
+        Activates the nested checkpoint of the module with the given key while its submodules are run.
+        """
+        token = active_checkpoint.set(RunCheckpoint(self._scope_path(key)))
+        try:
+            yield
+        finally:
+            active_checkpoint.reset(token)
+
+    @contextlib.contextmanager
+    def writer(self, key: str):
+        with super().writer(key) as writer:
+            yield writer
+        # the submodule checkpoints are superseded by the outputs of the module
+        shutil.rmtree(self._scope_path(key), ignore_errors=True)
+
+
+def run_checkpointed(key: str, run: Callable, *args) -> List[BaseOutput]:
+    """
+    Returns the checkpointed outputs of a (sub)module if the active run has completed it before, otherwise calls
+    run(*args) and checkpoints its outputs. Without an active run this is the same as calling run(*args).
+    """
+    checkpoint = active_checkpoint.get()
+    if checkpoint is None:
+        return run(*args)
+
+    outputs = checkpoint.load(key)
+    if outputs is not None:
+        return outputs
+
+    with checkpoint.scope(key):
+        outputs = run(*args)
+
+    with checkpoint.writer(key) as writer:
+        for output_module in outputs:
+            writer.write(output_module)
+    return outputs
+
+
+def iter_checkpointed(key: str, iter_run: Callable, *args) -> Iterator[BaseOutput]:
+    """
+    Streaming variant of run_checkpointed: yields the checkpointed outputs of a (sub)module if the active run has
+    completed it before, otherwise yields the outputs of iter_run(*args) one at a time. Each output is checkpointed
+    before it is yielded, since rendering deletes its images; the checkpoint only becomes visible once iter_run is
+    exhausted.
+    """
+    checkpoint = active_checkpoint.get()
+    if checkpoint is None:
+        yield from iter_run(*args)
+        return
+
+    outputs = checkpoint.load(key)
+    if outputs is not None:
+        yield from outputs
+        return
+
+    with checkpoint.scope(key), checkpoint.writer(key) as writer:
+        for output_module in iter_run(*args):
+            writer.write(output_module)
+            yield output_module
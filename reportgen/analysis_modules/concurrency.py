@@ -0,0 +1,179 @@
+import contextlib
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, List, Iterator
+
+from .deadline import check_deadline, remaining_time
+
+DEFAULT_INITIAL_LIMITS = {'scores': 8, 'explain': 4, 'get_slice': 4}
+
+# Number of analysis modules run at the same time. The report generator sets it for the duration of each report.
+module_max_workers = contextvars.ContextVar('module_max_workers', default=1)
+
+
+class AdaptiveLimiter:
+    """
+    An AIMD (additive increase, multiplicative decrease) concurrency limit for the calls made to one endpoint. The
+    limit grows by about one slot per limit-many successful calls and is cut by backoff_ratio whenever a call fails
+    or takes longer than latency_tolerance times the baseline latency observed for the endpoint. Calls faster than
+    min_congested_latency never count as congested, which keeps jitter on fast calls from shrinking the limit.
+    """
+    def __init__(self,
+                 name: str,
+                 initial_limit: int = 4,
+                 min_limit: int = 1,
+                 max_limit: int = 32,
+                 latency_tolerance: float = 3.0,
+                 backoff_ratio: float = 0.5,
+                 min_congested_latency: float = 0.5,
+                 ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.min_congested_latency = min_congested_latency
+
+        self._limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self._in_flight = 0
+        self._waiting = 0
+        self._baseline_latency = None
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return self._waiting
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """
+        Waits for a free slot and holds it for the duration of the context. An exception raised inside the context
+        counts as a failed call.
+        """
+        with self._condition:
+            self._waiting += 1
+            try:
+                while self._in_flight >= self.limit:
+                    check_deadline()
+                    self._condition.wait(timeout=remaining_time())
+            finally:
+                self._waiting -= 1
+            self._in_flight += 1
+
+        start = time.monotonic()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self._release(time.monotonic() - start, failed)
+
+    def _release(self, latency: float, failed: bool):
+        with self._condition:
+            self._in_flight -= 1
+
+            if self._baseline_latency is None:
+                self._baseline_latency = latency
+            congested = failed or latency > max(self.latency_tolerance * self._baseline_latency,
+                                                self.min_congested_latency)
+
+            if congested:
+                self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+            else:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+                # the baseline follows the fastest recent latencies and slowly forgets old ones
+                self._baseline_latency = min(latency, 0.95 * self._baseline_latency + 0.05 * latency)
+
+            self._condition.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._condition:
+            return {'limit': self.limit,
+                    'in_flight': self._in_flight,
+                    'queue_depth': self._waiting,
+                    'baseline_latency': self._baseline_latency,
+                    }
+
+
+class ConcurrencyController:
+    """
+    A process-wide registry of AdaptiveLimiter objects, one budget per endpoint (e.g. 'scores', 'explain' and
+    'get_slice'). All outgoing Fiddler API calls that are subject to backpressure acquire a slot from it.
+    """
+    def __init__(self):
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, endpoint: str) -> AdaptiveLimiter:
+        with self._lock:
+            if endpoint not in self._limiters:
+                self._limiters[endpoint] = AdaptiveLimiter(endpoint,
+                                                           initial_limit=DEFAULT_INITIAL_LIMITS.get(endpoint, 4))
+            return self._limiters[endpoint]
+
+    def configure(self, endpoint: str, **kwargs) -> AdaptiveLimiter:
+        """
+        Replaces the limiter of an endpoint by a new one created with the given AdaptiveLimiter arguments.
+        """
+        with self._lock:
+            self._limiters[endpoint] = AdaptiveLimiter(endpoint, **kwargs)
+            return self._limiters[endpoint]
+
+    def acquire(self, endpoint: Optional[str]):
+        if endpoint is None:
+            return contextlib.nullcontext()
+        return self.limiter(endpoint).acquire()
+
+    def limit(self, endpoint: str) -> int:
+        return self.limiter(endpoint).limit
+
+    def queue_depth(self, endpoint: str) -> int:
+        return self.limiter(endpoint).queue_depth
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {endpoint: limiter.snapshot() for endpoint, limiter in sorted(limiters.items())}
+
+
+concurrency_controller = ConcurrencyController()
+
+
+def iter_concurrently(tasks: List[Callable], max_workers: Optional[int] = None) -> Iterator:
+    """
+    Calls every task in a thread pool and yields their results in the order of the tasks, each one as soon as it and
+    all results before it are available. Each task runs in a copy of the caller's context, so report-level settings
+    (response cache, coalescer, instrumentation) still apply. A task that raises re-raises its exception when its
+    result is reached.
+
+    :param tasks: Callables without arguments.
+    :param max_workers: Size of the thread pool. If None the report default (module_max_workers) is used. With one
+                        worker the tasks are called sequentially in the current thread when their result is needed.
+    """
+    max_workers = max_workers if max_workers else module_max_workers.get()
+    if max_workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield task()
+        return
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, task) for task in tasks]
+        for future in futures:
+            yield future.result()
+
+
+def run_concurrently(tasks: List[Callable], max_workers: Optional[int] = None) -> list:
+    """
+    Calls every task in a thread pool (see iter_concurrently) and returns their results in the order of the tasks.
+    """
+    return list(iter_concurrently(tasks, max_workers=max_workers))
@@ -1,12 +1,414 @@
+import asyncio
+import contextvars
+import copy
+import functools
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass
+from typing import Optional, Tuple, List, Iterable
+
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .concurrency import concurrency_controller
+from .deadline import cap_timeout, check_deadline, remaining_time, wait_result
+from .instrumentation import active_io_stats, track_call, note_response_size, note_cache_hit
+from .response_cache import NO_CACHE, ResponseCache, canonical_request_key, cache_enabled
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# numeric arrays of the scores and explain responses that can be decoded into NumPy arrays (see as_numpy_arrays)
+ROC_ARRAY_FIELDS = ('fpr', 'tpr', 'thresholds')
+TEXT_ATTRIBUTION_FIELDS = ('text-attributions',)
+
+
+@dataclass
+class ConnectionConfig:
+    """
+    Connection settings shared by all front-end calls made for a Fiddler client.
+
+    :param pool_size: Maximum number of keep-alive connections kept open to the Fiddler deployment.
+    :param max_retries: Number of retries for requests that fail with a 429 or 5xx response or a connection error.
+    :param backoff_factor: Exponential backoff factor (in seconds) between retries.
+    :param connect_timeout: Timeout (in seconds) for establishing a connection.
+    :param read_timeout: Timeout (in seconds) for receiving a response. None waits indefinitely.
+    :param max_concurrency: Default maximum number of requests in flight for a batch submitted by AsyncFrontEndCall.
+    """
+    pool_size: int = 10
+    max_retries: int = 3
+    backoff_factor: float = 0.5
+    connect_timeout: float = 10
+    read_timeout: Optional[float] = 300
+    max_concurrency: int = 8
+
+    @property
+    def timeout(self) -> Tuple[float, Optional[float]]:
+        return self.connect_timeout, self.read_timeout
+
+
+def decode_json(content: bytes):
+    """
+    Decodes a JSON response body with orjson if it is installed, otherwise with the standard library parser. Bodies
+    that orjson rejects, e.g. metrics serialized as NaN or Infinity, are decoded with the standard library parser.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(content)
+
+
+def as_numpy_arrays(response, fields: Iterable[str]):
+    """
+    Returns a decoded JSON response in which the lists stored under any of the given keys are replaced by NumPy
+    arrays. Only the dictionaries and lists on the path to a converted list are copied; the rest of the response is
+    shared with the original, which is not modified.
+    """
+    fields = set(fields)
+
+    def convert(value, key=None):
+        if isinstance(value, list) and key in fields:
+            return np.asarray(value)
+        if isinstance(value, (dict, list)):
+            copied = None
+            for k, v in (value.items() if isinstance(value, dict) else enumerate(value)):
+                converted = convert(v, k if isinstance(value, dict) else None)
+                if converted is not v:
+                    copied = copied if copied is not None else type(value)(value)
+                    copied[k] = converted
+            return copied if copied is not None else value
+        return value
+
+    return convert(response)
+
+
+def deadline_retry(retry: Retry, remaining: float) -> Retry:
+    """
+    Returns the retry policy of a request that has to complete within the remaining time (in seconds) of a deadline.
+    A request whose response is not received in time is not sent again, since the backend may still be processing it,
+    and only as many retries are made as their backoff delays fit into the remaining time.
+    """
+    total = 0
+    # urllib3 retries the first time right away and waits backoff_factor * 2 ** (n - 1) seconds before the n-th retry
+    while total < (retry.total or 0) and retry.backoff_factor * (2 ** (total + 1) - 2) < remaining:
+        total += 1
+    return retry.new(total=total, read=0, respect_retry_after_header=False)
+
+
+class DeadlineHTTPAdapter(HTTPAdapter):
+    """
+    An HTTPAdapter that restricts its retry policy (see deadline_retry) while a deadline is active.
+    """
+    @property
+    def max_retries(self) -> Retry:
+        remaining = remaining_time()
+        if remaining is None:
+            return self._max_retries
+        return deadline_retry(self._max_retries, remaining)
+
+    @max_retries.setter
+    def max_retries(self, retry: Retry):
+        self._max_retries = retry
+
+
+def _create_session(config: ConnectionConfig) -> requests.Session:
+    retry = Retry(total=config.max_retries,
+                  backoff_factor=config.backoff_factor,
+                  status_forcelist=RETRY_STATUS_CODES,
+                  allowed_methods=None,  # scores and explain POSTs are read-only and safe to retry
+                  raise_on_status=False,
+                  )
+    adapter = DeadlineHTTPAdapter(pool_connections=config.pool_size,
+                                  pool_maxsize=config.pool_size,
+                                  max_retries=retry,
+                                  )
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class RequestCoalescer:
+    """
+    Shares the response of identical front-end requests within a report. A request that is already in flight is
+    awaited instead of being sent again and a request that has already completed successfully is answered from
+    memory. Error responses are shared with the requests waiting on them but are not kept for later requests. Each
+    caller gets its own copy of the response.
+    """
+    def __init__(self):
+        self._responses = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def run(self, key, fetch):
+        with self._lock:
+            future = self._responses.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._responses[key] = future
+            else:
+                self.coalesced += 1
+
+        if is_owner:
+            try:
+                response = fetch()
+            except BaseException as e:
+                with self._lock:
+                    self._responses.pop(key, None)
+                future.set_exception(e)
+            else:
+                if not (isinstance(response, dict) and response.get('kind') == 'NORMAL'):
+                    with self._lock:
+                        self._responses.pop(key, None)
+                future.set_result(response)
+
+        return copy.deepcopy(wait_result(future))
+
+
+# The report generator activates a coalescer for the duration of each report
+active_coalescer = contextvars.ContextVar('active_coalescer', default=None)
+
+
+# The report generator activates its own connection for the duration of each report (see get_connection)
+active_connection = contextvars.ContextVar('active_connection', default=None)
+
+
+class Connection:
+    """
+    A pooled keep-alive HTTP session tied to a Fiddler deployment. Each report generator owns a connection with its
+    own configuration and response cache, which is reused by every FrontEndCall of its reports; other front-end calls
+    share a default connection per Fiddler client (see get_connection). Identical requests are coalesced while a
+    RequestCoalescer is active and, if a response cache is attached, successful responses are served from and stored
+    in the cache.
+    """
+    def __init__(self, config: Optional[ConnectionConfig] = None, cache: Optional[ResponseCache] = None):
+        self.config = config if config else ConnectionConfig()
+        self.session = _create_session(self.config)
+        self.cache = cache
+
+    def post(self, url, headers, request, timeout=None, organization=None, cache_ttl=None, transport=None,
+             endpoint=None, use_cache: bool = True):
+        """
+        :param transport: A callable with the same signature as Connection.send used instead of the HTTP session,
+                          e.g. by the record/replay clients in reportgen.replay.
+        :param endpoint: Endpoint name used to select the concurrency budget of the request (see concurrency.py).
+        :param use_cache: If False the response cache is neither read nor written.
+        """
+        transport = transport if transport else self.send
+        key = canonical_request_key(url, organization, request)
+
+        def fetch():
+            return self._post(key, transport, url, headers, request, timeout, cache_ttl, endpoint, use_cache)
+
+        coalescer = active_coalescer.get()
+        if coalescer is not None:
+            return coalescer.run(key, fetch)
+        return fetch()
+
+    def _post(self, key, transport, url, headers, request, timeout, cache_ttl, endpoint, use_cache):
+        use_cache = use_cache and cache_ttl != NO_CACHE and self.cache is not None and cache_enabled.get()
+        if use_cache:
+            response = self.cache.get(key)
+            if response is not None:
+                note_cache_hit(endpoint if endpoint else url)
+                return response
+
+        # a request is not started after the deadline of its module and does not wait for a response beyond it
+        check_deadline()
+        timeout = cap_timeout(timeout if timeout is not None else self.config.timeout)
+
+        measure = active_io_stats.get() is not None
+        request_bytes = len(json.dumps(request, default=str)) if measure else 0
+        with concurrency_controller.acquire(endpoint), \
+                track_call(endpoint if endpoint else url, request_bytes=request_bytes) as call:
+            try:
+                response = transport(url, headers, request, timeout)
+            except requests.RequestException:
+                # the timeout was capped at the deadline, and a request that timed out is not retried
+                check_deadline()
+                raise
+            # transports other than send (e.g. replayed fixtures) do not report the size of the response body
+            if measure and call.response_bytes is None:
+                call.response_bytes = len(json.dumps(response, default=str))
+
+        if use_cache and response.get('kind') == 'NORMAL':
+            self.cache.put(key, response, ttl=cache_ttl)
+        return response
+
+    def send(self, url, headers, request, timeout=None):
+        r = self.session.post(url,
+                              headers=headers,
+                              json=request,
+                              timeout=timeout if timeout is not None else self.config.timeout
+                              )
+        # overload responses that are still failing after all retries are raised so that they count as failed calls
+        if r.status_code in RETRY_STATUS_CODES:
+            r.raise_for_status()
+        # Content-Length is the size on the wire, i.e. after compression
+        note_response_size(int(r.headers.get('Content-Length', len(r.content))))
+        return decode_json(r.content)
+
+    def close(self):
+        self.session.close()
+
+
+_connections = {}
+_connections_lock = threading.Lock()
+
+
+def _connection_key(api):
+    return api.url, api.organization_name
+
+
+def get_connection(api) -> Connection:
+    """
+    Returns the connection of the running report or, outside of a report, the default connection of the given
+    Fiddler client. Default connections use the default ConnectionConfig and have no response cache.
+    """
+    connection = active_connection.get()
+    if connection is not None:
+        return connection
+
+    key = _connection_key(api)
+    with _connections_lock:
+        if key not in _connections:
+            _connections[key] = Connection()
+        return _connections[key]
+
+
+def reset_connections():
+    """
+    Forgets the default connections of all Fiddler clients without closing them. Called in worker processes, which
+    must not reuse the sessions (and sockets) inherited from their parent process.
+    """
+    with _connections_lock:
+        _connections.clear()
 
 
 class FrontEndCall:
 
-    def __init__(self, api, endpoint):
+    def __init__(self, api, endpoint, timeout=None, connection: Optional[Connection] = None):
+        """
+        :param connection: Connection used for the requests. If None the connection of the running report, or the
+                           default connection of the Fiddler client, is used (see get_connection).
+        """
         self.api = api
+        self.endpoint = endpoint
         self.url = f'{api.url}/{endpoint}'
+        self.timeout = timeout
+        self.connection = connection if connection else get_connection(api)
+
+    def post(self, request, cache_ttl=None, numpy_fields: Optional[Iterable[str]] = None):
+        """
+        :param request: JSON payload of the request.
+        :param cache_ttl: Time-to-live (in seconds) of the cached response if a response cache is attached. If None
+                          the cache default is used. Use CACHE_FOREVER for responses that never change and NO_CACHE
+                          for responses that may change at any time, which bypass the cache.
+        :param numpy_fields: Keys of numeric arrays in the response that are returned as NumPy arrays,
+                             e.g. ROC_ARRAY_FIELDS.
+        """
+        response = self.connection.post(self.url,
+                                        self.api.request_headers,
+                                        request,
+                                        timeout=self.timeout,
+                                        organization=self.api.organization_name,
+                                        cache_ttl=cache_ttl,
+                                        transport=getattr(self.api, 'frontend_transport', None),
+                                        endpoint=self.endpoint,
+                                        # responses of a recording client must reach its transport (see replay.py)
+                                        use_cache=not getattr(self.api, 'bypass_caches', False),
+                                        )
+        if numpy_fields and isinstance(response, dict) and response.get('kind') == 'NORMAL':
+            response = as_numpy_arrays(response, numpy_fields)
+        return response
+
+
+def error_response(error: Exception) -> dict:
+    """
+    Wraps an exception raised by a front-end call in a response with the same structure as the error responses
+    returned by the Fiddler backend.
+    """
+    return {'kind': 'ERROR', 'error': f'{type(error).__name__}: {error}'}
+
+
+def run_coroutine(coroutine):
+    """
+    Runs a coroutine to completion from synchronous code. If an event loop is already running in the current thread
+    (e.g. in a notebook), the coroutine is run on a new event loop in a separate thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(context.run, asyncio.run, coroutine).result()
+
+
+class AsyncFrontEndCall:
+    """
+    An asyncio variant of FrontEndCall that submits many requests to the same endpoint concurrently over the shared
+    connection of the Fiddler client.
+    """
+    def __init__(self, api, endpoint, max_concurrency: Optional[int] = None, timeout=None,
+                 connection: Optional[Connection] = None):
+        """
+        :param api: An instance of Fiddler python client.
+        :param endpoint: Front-end endpoint name, e.g. 'scores' or 'explain'.
+        :param max_concurrency: Maximum number of requests in flight. If None the connection default is used.
+        :param timeout: Per-request timeout. If None the connection default is used.
+        :param connection: Connection used for the requests, see FrontEndCall.
+        """
+        self.call = FrontEndCall(api, endpoint, timeout=timeout, connection=connection)
+        self.max_concurrency = max_concurrency if max_concurrency else self.call.connection.config.max_concurrency
+
+    async def post(self, request, cache_ttl=None, numpy_fields: Optional[Iterable[str]] = None):
+        return await asyncio.to_thread(self.call.post, request, cache_ttl, numpy_fields)
+
+    async def post_many(self, payloads: List[dict], cache_ttl=None,
+                        numpy_fields: Optional[Iterable[str]] = None) -> List[dict]:
+        """
+        Posts all requests with at most max_concurrency requests in flight. Responses are returned in submission
+        order. A request that raises an exception does not affect the others; its response is replaced by an error
+        response (see error_response).
+
+        :param payloads: JSON payloads of the requests.
+        :param cache_ttl: Either a single time-to-live for all cached responses or a list with one value per request.
+        :param numpy_fields: Keys of numeric arrays in the responses that are returned as NumPy arrays.
+        """
+        loop = asyncio.get_running_loop()
+        cache_ttls = cache_ttl if isinstance(cache_ttl, list) else [cache_ttl] * len(payloads)
+
+        def _post(request, ttl):
+            # a DeadlineExceeded is not an Exception and cancels the whole batch, see deadline.py
+            try:
+                return self.call.post(request, cache_ttl=ttl, numpy_fields=numpy_fields)
+            except Exception as e:
+                return error_response(e)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = [loop.run_in_executor(executor,
+                                            functools.partial(contextvars.copy_context().run, _post, request, ttl)
+                                            )
+                       for request, ttl in zip(payloads, cache_ttls)]
+            return list(await asyncio.gather(*futures))
 
-    def post(self, request):
-        r = requests.post(self.url, headers=self.api.request_headers, json=request)
-        return r.json()
+    def post_batch(self, payloads: List[dict], cache_ttl=None,
+                   numpy_fields: Optional[Iterable[str]] = None) -> List[dict]:
+        """
+        Synchronous wrapper around post_many.
+        """
+        if not payloads:
+            return []
+        return run_coroutine(self.post_many(payloads, cache_ttl=cache_ttl, numpy_fields=numpy_fields))
@@ -0,0 +1,170 @@
+import contextlib
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Optional, Callable
+
+# deadline of the module (or report) that is currently run, see deadline_scope
+active_deadline = contextvars.ContextVar('active_deadline', default=None)
+
+
+class DeadlineExceeded(BaseException):
+    """
+    Raised by a backend call made after the time budget of the running module or report has been used up. Like
+    KeyboardInterrupt it is not an Exception, so that the handlers that turn failed backend calls into error outputs
+    do not swallow it: it has to reach the report generator, which truncates the module.
+    """
+    def __init__(self, deadline: 'Deadline'):
+        super().__init__(f'The {deadline.name} time budget of {deadline.seconds:g} seconds was exceeded.')
+        self.deadline = deadline
+        # outputs that the module yielded before it was cancelled (see collect_outputs)
+        self.partial_outputs = []
+
+
+class Deadline:
+    """
+    A wall-clock time budget. Deadlines are cooperative: backend calls (front-end requests and Fiddler client calls)
+    check the active deadline before they start and wait no longer than its remaining time for a response.
+    """
+    def __init__(self, seconds: float, name: str = 'module'):
+        """
+        :param seconds: Time budget in seconds, counted from the creation of the deadline.
+        :param name: Name of the budget used in error messages, e.g. 'module' or 'report'.
+        """
+        self.seconds = seconds
+        self.name = name
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def check(self):
+        if self.expired():
+            raise DeadlineExceeded(self)
+
+
+@contextlib.contextmanager
+def deadline_scope(seconds: Optional[float], name: str = 'module'):
+    """
+    Activates a deadline for the duration of the context. A deadline nested in another one never ends later than the
+    outer deadline. If seconds is None the outer deadline (if any) stays active.
+    """
+    outer = active_deadline.get()
+    deadline = Deadline(seconds, name) if seconds is not None else None
+    if deadline is None or (outer is not None and outer.expires <= deadline.expires):
+        deadline = outer
+
+    token = active_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        active_deadline.reset(token)
+
+
+def check_deadline():
+    """
+    Raises DeadlineExceeded if the active deadline has passed.
+    """
+    deadline = active_deadline.get()
+    if deadline is not None:
+        deadline.check()
+
+
+def remaining_time() -> Optional[float]:
+    """
+    Returns the remaining time of the active deadline in seconds, or None if no deadline is active.
+    """
+    deadline = active_deadline.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+def cap_timeout(timeout):
+    """
+    Caps a requests timeout (a number or a (connect, read) tuple, None meaning no timeout) at the remaining time of
+    the active deadline.
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    remaining = max(remaining, 0.001)
+
+    if isinstance(timeout, tuple):
+        return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def wait_result(future: Future):
+    """
+    Waits for the result of a future, but no longer than the remaining time of the active deadline.
+    """
+    deadline = active_deadline.get()
+    if deadline is None:
+        return future.result()
+
+    try:
+        return future.result(timeout=deadline.remaining())
+    except FutureTimeoutError:
+        if future.done():
+            raise
+        raise DeadlineExceeded(deadline) from None
+
+
+def call_with_deadline(func: Callable, *args, **kwargs):
+    """
+    Calls a blocking function that does not support timeouts (e.g. a Fiddler client method). If a deadline is active,
+    the function runs in a daemon thread and is abandoned once the deadline passes, so a stalled call cannot hang the
+    report; the thread finishes in the background.
+    """
+    return call_with_deadline_holding(contextlib.ExitStack(), func, *args, **kwargs)
+
+
+def call_with_deadline_holding(resources: contextlib.ExitStack, func: Callable, *args, **kwargs):
+    """
+    Same as call_with_deadline for a call that holds resources entered on an exit stack, e.g. a slot of the
+    concurrency controller. The stack is closed when the function returns, so a call that is abandoned at the deadline
+    keeps holding its resources until it finishes in the background.
+    """
+    deadline = active_deadline.get()
+    if deadline is None:
+        with resources:
+            return func(*args, **kwargs)
+
+    try:
+        deadline.check()
+    except DeadlineExceeded:
+        resources.close()
+        raise
+
+    future = Future()
+
+    def target():
+        try:
+            with resources:
+                result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(target,), daemon=True).start()
+    return wait_result(future)
+
+
+def collect_outputs(analysis_module, api) -> list:
+    """
+    Runs a module through iter_run and returns its outputs. If the module is cancelled by a deadline, the outputs
+    yielded so far are attached to the raised DeadlineExceeded as partial_outputs.
+    """
+    outputs = []
+    try:
+        for output_module in analysis_module.iter_run(api):
+            outputs.append(output_module)
+    except DeadlineExceeded as e:
+        e.partial_outputs = outputs
+        raise
+    return outputs
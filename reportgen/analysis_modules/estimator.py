@@ -0,0 +1,83 @@
+import warnings
+from collections import Counter
+from typing import Optional, List
+
+from .concurrency import concurrency_controller
+from .instrumentation import module_scope
+
+# mean latencies (in seconds) assumed for endpoints and client methods without recorded latencies
+DEFAULT_LATENCIES = {'scores': 1.0, 'explain': 2.0, 'get_slice': 1.0}
+DEFAULT_LATENCY = 0.2
+# calls that send work to the backend; the other client methods are memoized metadata lookups
+DATA_CALLS = ('scores', 'explain', 'get_slice')
+# plans with more data calls than this are reported with a warning
+LARGE_PLAN_CALLS = 1000
+
+
+def recorded_latencies(io_summary: dict) -> dict:
+    """
+    Returns the mean latency of every endpoint and client method in the I/O summary of a previous report (see
+    FiddlerReportGenerator.generate_report).
+    """
+    latencies = {}
+    for endpoint, stats in io_summary.get('by_endpoint', {}).items():
+        if stats['calls']:
+            latencies[endpoint] = stats['total_latency'] / stats['calls']
+    return latencies
+
+
+class CostEstimator:
+    """
+    Estimates the backend calls and the wall time of the analysis modules of a report from their preflight state,
+    without running them (see BaseAnalysis.estimate_calls). The wall time of a module assumes that its calls to each
+    endpoint use the whole concurrency budget of the endpoint (see concurrency.py), so it is a lower bound when the
+    backend is slower than the latencies used.
+    """
+    def __init__(self, api, latencies: Optional[dict] = None, large_plan_calls: int = LARGE_PLAN_CALLS):
+        """
+        :param api: The MemoizedFiddlerApi proxy used by the report generator.
+        :param latencies: Mean latency in seconds by endpoint or client method, e.g. recorded_latencies of a previous
+                          report. Missing entries fall back to DEFAULT_LATENCIES.
+        :param large_plan_calls: Number of data calls (scores, explain and get_slice) above which a warning is issued.
+        """
+        self.api = api
+        self.latencies = dict(DEFAULT_LATENCIES, **(latencies if latencies else {}))
+        self.large_plan_calls = large_plan_calls
+
+    def latency(self, source: str) -> float:
+        return self.latencies.get(source, DEFAULT_LATENCY)
+
+    def wall_time(self, calls: dict) -> float:
+        return sum(n * self.latency(source) / (concurrency_controller.limit(source) if source in DATA_CALLS else 1)
+                   for source, n in calls.items())
+
+    def estimate(self, analysis_modules: List) -> dict:
+        """
+        Returns the expected calls and wall time of every (already preflighted) module and of the whole report.
+        """
+        modules = []
+        total = Counter()
+        for analysis_module in analysis_modules:
+            name = type(analysis_module).__name__
+            with module_scope(name):
+                calls = analysis_module.estimate_calls(self.api)
+            modules.append({'module': name,
+                            'calls': dict(sorted(calls.items())),
+                            'data_calls': sum(calls.get(source, 0) for source in DATA_CALLS),
+                            'wall_time': self.wall_time(calls),
+                            })
+            total.update(calls)
+
+        estimate = {'modules': modules,
+                    'calls': dict(sorted(total.items())),
+                    'data_calls': sum(total.get(source, 0) for source in DATA_CALLS),
+                    'wall_time': sum(module['wall_time'] for module in modules),
+                    'latencies': {source: self.latency(source) for source in sorted(total)},
+                    }
+
+        if estimate['data_calls'] > self.large_plan_calls:
+            largest = max(modules, key=lambda module: module['data_calls'])
+            warnings.warn(f'The report plan makes {estimate["data_calls"]} data calls (scores, explain and get_slice), '
+                          f'{largest["data_calls"]} of them in {largest["module"]}, and is expected to take about '
+                          f'{estimate["wall_time"]:.0f} seconds. Consider longer interval lengths or fewer segments.')
+        return estimate
@@ -1,13 +1,14 @@
 import warnings
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 import fiddler as fdl
 import numpy as np
 import pandas as pd
 
-from .base import BaseAnalysis
-from .connection_helpers import FrontEndCall
+from .base import BaseAnalysis, is_open_window
+from .connection_helpers import AsyncFrontEndCall, TEXT_ATTRIBUTION_FIELDS
+from .planner import DataRequirement, client_requirement
 from ..output_modules import BaseOutput, SimpleTextBlock, FormattedTextBlock, SimpleTextStyle, AddBreak, Table, \
     PlainText, BoldText, ItalicText, TokenizedTextBlock, DescriptiveTextBlock
 
@@ -41,6 +42,21 @@ class FailureCaseAnalysis(BaseAnalysis):
         self.n_tokens = n_tokens
         self.n_permutations = n_permutations
 
+    def fingerprint_params(self) -> Optional[dict]:
+        if is_open_window(self.end_time):
+            return None
+        return {'project_id': self.project_id,
+                'models': self.models,
+                'dataset_id': self.dataset_id,
+                'start_time': self.start_time,
+                'end_time': self.end_time,
+                'n_examples': self.n_examples,
+                'explanation_alg': self.explanation_alg,
+                'n_attributions': self.n_attributions,
+                'n_tokens': self.n_tokens,
+                'n_permutations': self.n_permutations,
+                }
+
     def preflight(self, api, project_id):
         if not self.project_id:
             if project_id:
@@ -68,17 +84,9 @@ class FailureCaseAnalysis(BaseAnalysis):
         output_col = model_info.outputs[0].name
         reference_dataset = model_info.datasets[0]
 
-        output_modules = []
+        requests = []
         for row_index in range(df.shape[0]):
             query_df = df[row_index:row_index + 1]
-            output_prediction = query_df.iloc[0][output_col]
-
-            output_modules += [FormattedTextBlock([BoldText(f'Example {row_index + 1}.')])]
-            output_modules += [FormattedTextBlock([BoldText('Model Prediction: '),
-                                                   PlainText(f'{output_prediction:.2f}'),
-                                                   ]
-                                                  )
-                               ]
 
             row_req = {}
             max_len = 0
@@ -115,8 +123,22 @@ class FailureCaseAnalysis(BaseAnalysis):
                                           },
                     "summarize": 'true',
                 }
+            requests.append(request)
+
+        responses = AsyncFrontEndCall(api, endpoint='explain').post_batch(requests,
+                                                                          numpy_fields=TEXT_ATTRIBUTION_FIELDS)
+
+        output_modules = []
+        for row_index, response in enumerate(responses):
+            query_df = df[row_index:row_index + 1]
+            output_prediction = query_df.iloc[0][output_col]
 
-            response = FrontEndCall(api, endpoint='explain').post(request)
+            output_modules += [FormattedTextBlock([BoldText(f'Example {row_index + 1}.')])]
+            output_modules += [FormattedTextBlock([BoldText('Model Prediction: '),
+                                                   PlainText(f'{output_prediction:.2f}'),
+                                                   ]
+                                                  )
+                               ]
 
             if response['kind'] == 'NORMAL':
                 baseline_prediction = response['data']['explanations'][output_col]['baseline_prediction']
@@ -178,8 +200,9 @@ class FailureCaseAnalysis(BaseAnalysis):
                         tokens = item['text-segments']
                         attributions = item['text-attributions']
 
-                        top_tokens = np.array(tokens)[np.argsort(np.absolute(attributions))][::-1][:self.n_tokens]
-                        top_attributions = np.array(attributions)[np.argsort(np.absolute(attributions))][::-1][:self.n_tokens]
+                        order = np.argsort(np.absolute(attributions))[::-1][:self.n_tokens]
+                        top_tokens = np.array(tokens)[order]
+                        top_attributions = attributions[order]
 
                         output_modules += [Table(header=['Token', 'Attribution'],
                                                  records=list(zip(top_tokens, top_attributions))
@@ -209,7 +232,10 @@ class FailureCaseAnalysis(BaseAnalysis):
 
         return output_modules
 
-    def _failure_cases_binary_classification(self, model_id, model_info, api):
+    def _get_failure_queries(self, model_id, model_info):
+        """
+        Returns the SQL queries of the top false positives and the top false negatives of a binary classifier.
+        """
         binary_threshold = model_info.binary_classification_threshold
         output_col = model_info.outputs[0].name
         target_col = model_info.targets[0].name
@@ -224,26 +250,50 @@ class FailureCaseAnalysis(BaseAnalysis):
                              " model_info.target_class_order is None is not implemented yet.")
 
         # False Positives
-        query = f""" SELECT * FROM {self.dataset_id}."{model_id}" """
-        query += f"""WHERE {output_col} > {binary_threshold} AND {target_col} = '{negative_class}' """
+        fp_query = f""" SELECT * FROM {self.dataset_id}."{model_id}" """
+        fp_query += f"""WHERE {output_col} > {binary_threshold} AND {target_col} = '{negative_class}' """
         if self.start_time:
-            query += f"""AND fiddler_timestamp > '{self.start_time + pd.Timedelta('0s')}' """
+            fp_query += f"""AND fiddler_timestamp > '{self.start_time + pd.Timedelta('0s')}' """
         if self.end_time:
-            query += f"""AND fiddler_timestamp < '{self.end_time + pd.Timedelta('0s')}' """
-        query += f"""ORDER BY {output_col} DESC """
-        query += f"""LIMIT {self.n_examples}"""
-        fp_dataframe = api.get_slice(sql_query=query, project_id=self.project_id)
+            fp_query += f"""AND fiddler_timestamp < '{self.end_time + pd.Timedelta('0s')}' """
+        fp_query += f"""ORDER BY {output_col} DESC """
+        fp_query += f"""LIMIT {self.n_examples}"""
 
         # False Negatives
-        query = f""" SELECT * FROM {self.dataset_id}."{model_id}" """
-        query += f"""WHERE {output_col} < {binary_threshold} AND {target_col} = '{positive_class}' """
+        fn_query = f""" SELECT * FROM {self.dataset_id}."{model_id}" """
+        fn_query += f"""WHERE {output_col} < {binary_threshold} AND {target_col} = '{positive_class}' """
         if self.start_time:
-            query += f"""AND fiddler_timestamp > '{self.start_time + pd.Timedelta('0s')}' """
+            fn_query += f"""AND fiddler_timestamp > '{self.start_time + pd.Timedelta('0s')}' """
         if self.end_time:
-            query += f"""AND fiddler_timestamp < '{self.end_time + pd.Timedelta('0s')}' """
-        query += f"""ORDER BY {output_col} ASC """
-        query += f"""LIMIT {self.n_examples}"""
-        fn_dataframe = api.get_slice(sql_query=query, project_id=self.project_id)
+            fn_query += f"""AND fiddler_timestamp < '{self.end_time + pd.Timedelta('0s')}' """
+        fn_query += f"""ORDER BY {output_col} ASC """
+        fn_query += f"""LIMIT {self.n_examples}"""
+        return fp_query, fn_query
+
+    def requirements(self, api) -> List[DataRequirement]:
+        requirements = []
+        for model_id in self.models:
+            model_info = api.get_model_info(self.project_id, model_id)
+            if model_info.model_task == fdl.ModelTask.BINARY_CLASSIFICATION:
+                requirements += [client_requirement('get_slice', sql_query=query, project_id=self.project_id)
+                                 for query in self._get_failure_queries(model_id, model_info)]
+        return requirements
+
+    def estimate_calls(self, api) -> Dict[str, int]:
+        calls = super().estimate_calls(api)
+        # at most n_examples false positives and n_examples false negatives are explained per binary model
+        n_binary = sum(api.get_model_info(self.project_id, model_id).model_task == fdl.ModelTask.BINARY_CLASSIFICATION
+                       for model_id in self.models)
+        calls['explain'] = calls.get('explain', 0) + 2 * self.n_examples * n_binary
+        return calls
+
+    def _failure_cases_binary_classification(self, model_id, model_info, api):
+        output_col = model_info.outputs[0].name
+        target_col = model_info.targets[0].name
+
+        fp_query, fn_query = self._get_failure_queries(model_id, model_info)
+        fp_dataframe = api.get_slice(sql_query=fp_query, project_id=self.project_id)
+        fn_dataframe = api.get_slice(sql_query=fn_query, project_id=self.project_id)
 
         output_modules = []
         output_modules += [SimpleTextBlock(text=f'Model: {model_id}',
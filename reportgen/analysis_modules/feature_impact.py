@@ -2,6 +2,7 @@ import fiddler as fdl
 from typing import Optional, List
 
 from .base import BaseAnalysis
+from .planner import DataRequirement, client_requirement
 from .plotting_helpers import feature_impact_chart
 from ..output_modules import BaseOutput, SimpleTextBlock, FormattedTextBlock, SimpleTextStyle, AddBreak, PlainText, \
     BoldText, ObjectTable, AddPageBreak, DescriptiveTextBlock
@@ -20,6 +21,10 @@ class FeatureImpact(BaseAnalysis):
         self.dataset_id = dataset_id
         self.top_n = top_n
 
+    def fingerprint_params(self) -> dict:
+        return {'project_id': self.project_id, 'models': self.models, 'dataset_id': self.dataset_id,
+                'top_n': self.top_n}
+
     def preflight(self, api, project_id):
         if not self.project_id:
             if project_id:
@@ -30,6 +35,24 @@ class FeatureImpact(BaseAnalysis):
         if self.models is None:
             self.models = api.list_models(self.project_id)
 
+    def _get_feature_impact_kwargs(self, model, dataset_id) -> dict:
+        return dict(project_id=self.project_id,
+                    model_id=model,
+                    data_source=fdl.DatasetDataSource(dataset_id=dataset_id, num_samples=200)
+                    )
+
+    def requirements(self, api) -> List[DataRequirement]:
+        requirements = []
+        for model in self.models:
+            dataset_id = api.get_model_info(self.project_id, model).datasets[0]
+            try:
+                kwargs = self._get_feature_impact_kwargs(model, dataset_id)
+            except Exception:
+                # the error is reported in the document when the module runs
+                continue
+            requirements.append(client_requirement('get_feature_impact', **kwargs))
+        return requirements
+
     def run(self, api) -> List[BaseOutput]:
         output_modules = []
         output_modules += [SimpleTextBlock(text='Global Feature Impact',
@@ -51,11 +74,7 @@ class FeatureImpact(BaseAnalysis):
             feature_impacts = {}
 
             try:
-                response = api.get_feature_impact(
-                    project_id=self.project_id,
-                    model_id=model,
-                    data_source=fdl.DatasetDataSource(dataset_id=dataset_id, num_samples=200)
-                )
+                response = api.get_feature_impact(**self._get_feature_impact_kwargs(model, dataset_id))
                 
                 if hasattr(response, 'impact_table'):
                     for token in response.impact_table:
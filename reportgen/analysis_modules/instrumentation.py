@@ -0,0 +1,147 @@
+import contextlib
+import contextvars
+import json
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+# The report generator activates an IOStats object for the duration of each report
+active_io_stats = contextvars.ContextVar('active_io_stats', default=None)
+# Name of the analysis module on whose behalf backend calls are made, e.g. 'ProjectSummary/ModelEvaluation'
+current_module = contextvars.ContextVar('current_module', default=None)
+_current_call = contextvars.ContextVar('current_call', default=None)
+
+
+@dataclass
+class CallRecord:
+    endpoint: str
+    module: Optional[str]
+    latency: float = 0.0
+    request_bytes: int = 0
+    response_bytes: Optional[int] = None
+    error: bool = False
+
+
+def _aggregate(records) -> dict:
+    latencies = np.array([r.latency for r in records]) if records else np.zeros(1)
+    return {'calls': len(records),
+            'errors': sum(r.error for r in records),
+            'total_latency': float(latencies.sum()),
+            'p50_latency': float(np.percentile(latencies, 50)),
+            'p95_latency': float(np.percentile(latencies, 95)),
+            'p99_latency': float(np.percentile(latencies, 99)),
+            'request_bytes': int(sum(r.request_bytes for r in records)),
+            'response_bytes': int(sum(r.response_bytes or 0 for r in records)),
+            }
+
+
+class IOStats:
+    """
+    Collects a record of every backend interaction made during a report together with the duration of the report
+    phases (preflight, run, render), and summarizes them by endpoint and by analysis module.
+    """
+    def __init__(self):
+        self._records = []
+        self._cache_hits = defaultdict(int)
+        self._phases = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def add(self, record: CallRecord):
+        with self._lock:
+            self._records.append(record)
+
+    def add_cache_hit(self, endpoint: str):
+        with self._lock:
+            self._cache_hits[endpoint] += 1
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._phases[name] += time.perf_counter() - start
+
+    def summary(self) -> dict:
+        with self._lock:
+            records = list(self._records)
+            cache_hits = dict(self._cache_hits)
+            phases = dict(self._phases)
+
+        by_endpoint = defaultdict(list)
+        by_module = defaultdict(lambda: defaultdict(list))
+        for record in records:
+            by_endpoint[record.endpoint].append(record)
+            by_module[record.module or 'FiddlerReportGenerator'][record.endpoint].append(record)
+
+        return {'total': _aggregate(records),
+                'by_endpoint': {endpoint: _aggregate(by_endpoint[endpoint]) for endpoint in sorted(by_endpoint)},
+                'by_module': {module: {endpoint: _aggregate(module_records[endpoint])
+                                       for endpoint in sorted(module_records)}
+                              for module, module_records in sorted(by_module.items())},
+                'cache_hits': cache_hits,
+                'phases': phases,
+                }
+
+    def to_json(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+
+@contextlib.contextmanager
+def track_call(endpoint: str, request_bytes: int = 0):
+    """
+    Times a backend call and adds its record to the active IOStats object, if any. The yielded record can be used to
+    set the response size once it is known.
+    """
+    stats = active_io_stats.get()
+    record = CallRecord(endpoint=endpoint, module=current_module.get(), request_bytes=request_bytes)
+    if stats is None:
+        yield record
+        return
+
+    token = _current_call.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        record.error = True
+        raise
+    finally:
+        record.latency = time.perf_counter() - start
+        _current_call.reset(token)
+        stats.add(record)
+
+
+def note_response_size(n_bytes: int):
+    """
+    Sets the response size of the call that is being tracked in the current context.
+    """
+    record = _current_call.get()
+    if record is not None:
+        record.response_bytes = n_bytes
+
+
+def note_cache_hit(endpoint: str):
+    stats = active_io_stats.get()
+    if stats is not None:
+        stats.add_cache_hit(endpoint)
+
+
+@contextlib.contextmanager
+def module_scope(name: str):
+    """
+    Attributes the backend calls made inside the context to the given analysis module. Nested scopes are joined
+    into a path, e.g. 'ProjectSummary/ModelEvaluation'.
+    """
+    parent = current_module.get()
+    token = current_module.set(f'{parent}/{name}' if parent else name)
+    try:
+        yield
+    finally:
+        current_module.reset(token)
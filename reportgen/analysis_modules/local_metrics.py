@@ -0,0 +1,149 @@
+"""
+Vectorized versions of the metrics returned by the scores endpoint. Every function takes the rows of many cells at once
+(e.g. every time interval x segment of a PerformanceTimeSeries), identified by an integer cell code per row, and
+returns one value per cell. Cells without rows, and cells where a metric is undefined (e.g. the AUC of a cell with a
+single class), are NaN.
+"""
+from typing import Optional
+
+import fiddler as fdl
+import numpy as np
+import pandas as pd
+
+DEFAULT_BINARY_THRESHOLD = 0.5
+
+BINARY_CLASSIFICATION_METRICS = ('accuracy', 'precision', 'recall', 'f1_score', 'auc')
+REGRESSION_METRICS = ('mae', 'mse', 'r2')
+LOCAL_METRICS = {fdl.ModelTask.BINARY_CLASSIFICATION: BINARY_CLASSIFICATION_METRICS,
+                 fdl.ModelTask.REGRESSION: REGRESSION_METRICS,
+                 }
+
+
+def supports(model_task, metric: str) -> bool:
+    return metric in LOCAL_METRICS.get(model_task, ())
+
+
+def _cell_sum(codes: np.ndarray, n_cells: int, weights: Optional[np.ndarray] = None) -> np.ndarray:
+    return np.bincount(codes, weights=weights, minlength=n_cells).astype(float)
+
+
+def _divide(numerator: np.ndarray, denominator: np.ndarray, empty: float = np.nan) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1), empty)
+
+
+def binary_classification_metric(metric: str,
+                                 codes: np.ndarray,
+                                 n_cells: int,
+                                 y_true: np.ndarray,
+                                 y_score: np.ndarray,
+                                 threshold: float = DEFAULT_BINARY_THRESHOLD,
+                                 ) -> np.ndarray:
+    """
+    :param y_true: Boolean array, True for rows of the positive class.
+    :param y_score: Model output (probability of the positive class).
+    :param threshold: Outputs above the threshold are predicted as positive.
+    """
+    n = _cell_sum(codes, n_cells)
+    positives = _cell_sum(codes, n_cells, y_true)
+
+    if metric == 'auc':
+        # Mann-Whitney U statistic computed from the ranks of the outputs within each cell, ties get average ranks
+        ranks = pd.Series(y_score).groupby(codes).rank(method='average').to_numpy()
+        negatives = n - positives
+        rank_sum = _cell_sum(codes, n_cells, np.where(y_true, ranks, 0))
+        return _divide(rank_sum - positives * (positives + 1) / 2, positives * negatives)
+
+    y_pred = y_score > threshold
+    tp = _cell_sum(codes, n_cells, y_true & y_pred)
+    predicted = _cell_sum(codes, n_cells, y_pred)
+    correct = _cell_sum(codes, n_cells, y_true == y_pred)
+
+    # precision and recall of cells without predicted or actual positives are 0, as in sklearn
+    precision = _divide(tp, predicted, empty=0.0)
+    recall = _divide(tp, positives, empty=0.0)
+    if metric == 'accuracy':
+        values = _divide(correct, n)
+    elif metric == 'precision':
+        values = precision
+    elif metric == 'recall':
+        values = recall
+    else:
+        values = _divide(2 * precision * recall, precision + recall, empty=0.0)
+    return np.where(n > 0, values, np.nan)
+
+
+def regression_metric(metric: str,
+                      codes: np.ndarray,
+                      n_cells: int,
+                      y_true: np.ndarray,
+                      y_pred: np.ndarray,
+                      ) -> np.ndarray:
+    n = _cell_sum(codes, n_cells)
+    errors = y_pred - y_true
+    if metric == 'mae':
+        return _divide(_cell_sum(codes, n_cells, np.abs(errors)), n)
+
+    squared_error = _cell_sum(codes, n_cells, errors ** 2)
+    if metric == 'mse':
+        return _divide(squared_error, n)
+
+    # r2 = 1 - SSE / SST, as in sklearn a cell with a constant target scores 1 if it is predicted exactly and 0
+    # otherwise, and r2 is undefined for a single row
+    mean = _divide(_cell_sum(codes, n_cells, y_true), n, empty=0.0)
+    sst = _cell_sum(codes, n_cells, (y_true - mean[codes]) ** 2)
+    r2 = np.where(sst > 0, 1 - _divide(squared_error, sst), np.where(squared_error == 0, 1.0, 0.0))
+    return np.where(n > 1, r2, np.nan)
+
+
+def positive_class_rows(target: pd.Series, positive_class) -> np.ndarray:
+    """
+    Returns True for the rows of a binary classification target that belong to the positive class. The class (e.g. a
+    label of target_class_order, which may be a string) is converted to the dtype of the target first, so that a
+    positive class 1 matches the targets 1, 1.0, '1' and True.
+    """
+    if isinstance(target.dtype, pd.CategoricalDtype):
+        positive_categories = positive_class_rows(pd.Series(target.cat.categories), positive_class)
+        codes = target.cat.codes.to_numpy()
+        return np.where(codes >= 0, positive_categories[codes], False)
+
+    if pd.api.types.is_bool_dtype(target.dtype):
+        positive = str(positive_class).lower() in ('1', '1.0', 'true')
+        return target.to_numpy(dtype=bool, na_value=False) == positive
+
+    try:
+        positive = float(positive_class)
+    except (TypeError, ValueError):
+        positive = None
+
+    if pd.api.types.is_numeric_dtype(target.dtype):
+        if positive is None:
+            return np.zeros(len(target), dtype=bool)
+        return target.to_numpy(dtype=float, na_value=np.nan) == positive
+
+    # labels are compared as strings, and numeric labels (e.g. '1' and '1.0') also by their value
+    rows = (target.astype(str) == str(positive_class)).to_numpy()
+    if positive is not None:
+        rows = rows | (pd.to_numeric(target, errors='coerce') == positive).to_numpy()
+    return rows
+
+
+def cell_metric(model_task,
+                metric: str,
+                codes: np.ndarray,
+                n_cells: int,
+                y_true: np.ndarray,
+                y_output: np.ndarray,
+                threshold: float = DEFAULT_BINARY_THRESHOLD,
+                ) -> np.ndarray:
+    """
+    Computes a metric for every cell. Rows with a negative cell code are ignored.
+    """
+    keep = codes >= 0
+    codes, y_true, y_output = codes[keep], y_true[keep], y_output[keep]
+
+    if model_task == fdl.ModelTask.BINARY_CLASSIFICATION:
+        return binary_classification_metric(metric, codes, n_cells, y_true, y_output, threshold)
+    if model_task == fdl.ModelTask.REGRESSION:
+        return regression_metric(metric, codes, n_cells, y_true.astype(float), y_output.astype(float))
+    raise ValueError(f'Metric {metric} cannot be computed locally for {model_task} models.')
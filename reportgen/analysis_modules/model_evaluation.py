@@ -6,6 +6,7 @@ import fiddler as fdl
 from .base import BaseAnalysis
 from .performance_metrics import BinaryClassifierMetrics
 from .performance_plots import BinaryConfusionMatrix, ROC
+from .planner import DataRequirement
 from ..output_modules import BaseOutput, SimpleTextBlock, FormattedTextBlock, SimpleTextStyle, AddBreak, AddPageBreak
 from ..output_modules.text_styles import BoldText
 
@@ -25,6 +26,9 @@ class ModelEvaluation(BaseAnalysis):
         self.project_id = project_id
         self.models = model_list
 
+    def fingerprint_params(self) -> dict:
+        return {'project_id': self.project_id, 'models': self.models}
+
     def preflight(self, api, project_id):
         if not self.project_id:
             if project_id:
@@ -32,6 +36,28 @@ class ModelEvaluation(BaseAnalysis):
             else:
                 raise ValueError('Project ID is not specified.')
 
+    def _get_models_by_type(self, api) -> dict:
+        models = self.models if self.models is not None else api.list_models(self.project_id)
+
+        models_by_type = defaultdict(list)
+        for model_id in models:
+            model_info = api.get_model_info(self.project_id, model_id)
+            models_by_type[model_info.model_task].append(model_id)
+        return models_by_type
+
+    def requirements(self, api) -> List[DataRequirement]:
+        model_list = self._get_models_by_type(api).get(fdl.ModelTask.BINARY_CLASSIFICATION)
+        if not model_list:
+            return []
+
+        requirements = []
+        for evaluation in [BinaryClassifierMetrics(self.project_id, model_list),
+                           ROC(self.project_id, model_list),
+                           BinaryConfusionMatrix(self.project_id, model_list),
+                           ]:
+            requirements += evaluation.requirements(api)
+        return requirements
+
     def _binary_classification_evaluations(self, model_list: List[str], api):
         output_modules = []
         output_modules += [SimpleTextBlock(text='Performance Summary',
@@ -64,9 +90,6 @@ class ModelEvaluation(BaseAnalysis):
         :param api: An instance of Fiddler python client.
         :return: List of output modules.
         """
-        if self.models is None:
-            self.models = api.list_models(self.project_id)
-
         output_modules = []
         output_modules += [SimpleTextBlock(text='Baseline Model Performance',
                                            style=SimpleTextStyle(alignment='left',
@@ -74,11 +97,7 @@ class ModelEvaluation(BaseAnalysis):
                                                                  size=18))]
         output_modules += [AddBreak(1)]
 
-        models_by_type = defaultdict(list)
-        for model_id in self.models:
-            model_info = api.get_model_info(self.project_id, model_id)
-            models_by_type[model_info.model_task].append(model_id)
-
+        models_by_type = self._get_models_by_type(api)
         for model_type in models_by_type:
             if model_type == fdl.ModelTask.BINARY_CLASSIFICATION:
                 output_modules += self._binary_classification_evaluations(models_by_type[model_type], api)
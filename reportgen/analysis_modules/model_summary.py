@@ -1,6 +1,7 @@
 from typing import Optional, List
 
 from .base import BaseAnalysis
+from .planner import DataRequirement, client_requirement
 from ..output_modules import BaseOutput, SimpleTextBlock, SimpleTextStyle, AddBreak, Table
 
 
@@ -16,6 +17,9 @@ class ModelSummary(BaseAnalysis):
         """
         self.project_id = project_id
 
+    def fingerprint_params(self) -> dict:
+        return {'project_id': self.project_id}
+
     def preflight(self, api, project_id):
         if not self.project_id:
             if project_id:
@@ -23,6 +27,10 @@ class ModelSummary(BaseAnalysis):
             else:
                 raise ValueError('Project ID is not specified.')
 
+    def requirements(self, api) -> List[DataRequirement]:
+        return [client_requirement('get_model_info', self.project_id, model)
+                for model in api.list_models(self.project_id)]
+
     def run(self, api) -> List[BaseOutput]:
         """
         :param api: An instance of Fiddler python client.
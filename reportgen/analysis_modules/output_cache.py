@@ -0,0 +1,109 @@
+import contextlib
+import os
+import shutil
+import time
+import uuid
+from typing import Optional, List
+
+from .response_cache import fingerprint
+from ..output_modules import BaseOutput
+from ..output_modules.serialization import OutputWriter, load_outputs, OUTPUTS_FILE
+
+DEFAULT_MODULE_CACHE_DIR = '.reportgen_cache/modules'
+# bump when the layout of cached outputs changes
+CACHE_FORMAT_VERSION = 1
+
+
+def metadata_snapshot(api, project_id) -> dict:
+    """
+    Returns the backend metadata of a project that the outputs of an analysis module depend on: its models and
+    datasets together with their model info and dataset info.
+    """
+    models = api.list_models(project_id)
+    datasets = api.list_datasets(project_id)
+    return {'models': {model: api.get_model_info(project_id, model) for model in models},
+            'datasets': {dataset: api.get_dataset(project_id, dataset) for dataset in datasets},
+            }
+
+
+class ModuleOutputCache:
+    """
+    A content-addressed on-disk cache of the outputs of analysis modules, images included. An entry is keyed by a
+    fingerprint of the module class, its parameters after preflight (see BaseAnalysis.fingerprint_params) and the
+    metadata of its project, so a module is only run again if one of these has changed.
+    """
+    def __init__(self, directory: str = DEFAULT_MODULE_CACHE_DIR, ttl: Optional[float] = None):
+        """
+        :param directory: Directory of the cache entries.
+        :param ttl: Time-to-live of an entry in seconds. If None entries are kept until they are cleared. Modules whose
+                    time window ends today are fingerprinted with today's date only, so use a ttl if such reports
+                    are regenerated during the day while new production data arrives.
+        """
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def fingerprint(self, analysis_module, api) -> Optional[str]:
+        """
+        Returns the cache key of a preflighted module, or None if the module cannot be fingerprinted.
+        """
+        params = analysis_module.fingerprint_params()
+        if params is None:
+            return None
+
+        project_id = params.get('project_id')
+        try:
+            metadata = metadata_snapshot(api, project_id) if project_id else None
+        except Exception:
+            return None
+
+        return fingerprint(CACHE_FORMAT_VERSION,
+                           type(analysis_module).__module__,
+                           type(analysis_module).__qualname__,
+                           params,
+                           metadata,
+                           )
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def load(self, key: str) -> Optional[List[BaseOutput]]:
+        path = self._path(key)
+        if not os.path.isfile(os.path.join(path, OUTPUTS_FILE)):
+            return None
+
+        if self.ttl is not None and time.time() - os.path.getmtime(path) > self.ttl:
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+
+        try:
+            return load_outputs(path)
+        except Exception:
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+
+    @contextlib.contextmanager
+    def writer(self, key: str):
+        """
+        Yields an OutputWriter for the outputs of a module. The entry only becomes visible once the context exits
+        without an exception.
+        """
+        tmp_path = self._path(f'{key}.{uuid.uuid4().hex}.tmp')
+        try:
+            with OutputWriter(tmp_path) as writer:
+                yield writer
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+        path = self._path(key)
+        shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # another report stored the same entry in the meantime
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
@@ -3,7 +3,8 @@ from typing import Optional, List
 import fiddler as fdl
 
 from .base import BaseAnalysis
-from .connection_helpers import FrontEndCall
+from .connection_helpers import AsyncFrontEndCall
+from .planner import DataRequirement, scores_requirement
 from ..output_modules import BaseOutput, Table
 
 
@@ -22,6 +23,9 @@ class BinaryClassifierMetrics(BaseAnalysis):
         self.project_id = project_id
         self.models = model_list
 
+    def fingerprint_params(self) -> dict:
+        return {'project_id': self.project_id, 'models': self.models}
+
     def preflight(self, api, project_id):
         if not self.project_id:
             if project_id:
@@ -29,17 +33,11 @@ class BinaryClassifierMetrics(BaseAnalysis):
             else:
                 raise ValueError('Project ID is not specified.')
 
-    def run(self, api) -> List[BaseOutput]:
-        """
-        :param api: An instance of Fiddler python client.
-        :return: List of output modules.
-        """
-        if self.models is None:
-            self.models = api.list_models(self.project_id)
+    def _get_evaluations(self, api) -> list:
+        models = self.models if self.models is not None else api.list_models(self.project_id)
 
-        table_rows = []
-
-        for model_id in self.models:
+        evaluations = []
+        for model_id in models:
             model_info = api.get_model_info(self.project_id, model_id)
             if not model_info.model_task == fdl.ModelTask.BINARY_CLASSIFICATION:
                 raise TypeError(
@@ -60,36 +58,50 @@ class BinaryClassifierMetrics(BaseAnalysis):
                                                "source": source['name']},
                                "binary_threshold": model_info.binary_classification_threshold
                                }
-                    response = FrontEndCall(api, endpoint='scores').post(request)
-
-                    if response['kind'] == 'NORMAL':
-
-                        table_rows.append(
-                            (
-                                '{}'.format(model_id),
-                                '{}'.format(dataset),
-                                '{}'.format(source['name']),
-                                '{: .2f}'.format(response['data']['accuracy']),
-                                #'{: .2f}'.format(response['data']['precision']),
-                                #'{: .2f}'.format(response['data']['recall']),
-                                '{: .2f}'.format(response['data']['f1_score']),
-                                '{: .2f}'.format(response['data']['auc'])
-                            )
-                        )
-
-                    else:
-                        table_rows.append(
-                            (
-                                '{}'.format(model_id),
-                                '{}'.format(dataset),
-                                '{}'.format(source['name']),
-                                'Not available',
-                                # '{: .2f}'.format(response['data']['precision']),
-                                # '{: .2f}'.format(response['data']['recall']),
-                                'Not available',
-                                'Not available'
-                            )
-                        )
+                    evaluations.append((model_id, dataset, source, request))
+        return evaluations
+
+    def requirements(self, api) -> List[DataRequirement]:
+        return [scores_requirement(request) for *_, request in self._get_evaluations(api)]
+
+    def run(self, api) -> List[BaseOutput]:
+        """
+        :param api: An instance of Fiddler python client.
+        :return: List of output modules.
+        """
+        evaluations = self._get_evaluations(api)
+        responses = AsyncFrontEndCall(api, endpoint='scores').post_batch([request for *_, request in evaluations])
+
+        table_rows = []
+        for (model_id, dataset, source, _), response in zip(evaluations, responses):
+            if response['kind'] == 'NORMAL':
+
+                table_rows.append(
+                    (
+                        '{}'.format(model_id),
+                        '{}'.format(dataset),
+                        '{}'.format(source['name']),
+                        '{: .2f}'.format(response['data']['accuracy']),
+                        #'{: .2f}'.format(response['data']['precision']),
+                        #'{: .2f}'.format(response['data']['recall']),
+                        '{: .2f}'.format(response['data']['f1_score']),
+                        '{: .2f}'.format(response['data']['auc'])
+                    )
+                )
+
+            else:
+                table_rows.append(
+                    (
+                        '{}'.format(model_id),
+                        '{}'.format(dataset),
+                        '{}'.format(source['name']),
+                        'Not available',
+                        # '{: .2f}'.format(response['data']['precision']),
+                        # '{: .2f}'.format(response['data']['recall']),
+                        'Not available',
+                        'Not available'
+                    )
+                )
 
         output_modules = [
                             Table(
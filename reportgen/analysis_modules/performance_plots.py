@@ -6,7 +6,8 @@ import numpy as np
 from docx.shared import RGBColor
 
 from .base import BaseAnalysis
-from .connection_helpers import FrontEndCall
+from .connection_helpers import AsyncFrontEndCall, ROC_ARRAY_FIELDS
+from .planner import DataRequirement, scores_requirement
 from .plotting_helpers import confusion_matrix, roc_curve
 from ..output_modules import BaseOutput, FormattedTextBlock, SimpleImage, \
     AddBreak, PlainText, BoldText, ItalicText, ObjectTable, DescriptiveTextBlock
@@ -28,6 +29,9 @@ class BinaryConfusionMatrix(BaseAnalysis):
         self.project_id = project_id
         self.models = model_list
 
+    def fingerprint_params(self) -> dict:
+        return {'project_id': self.project_id, 'models': self.models}
+
     def preflight(self, api, project_id):
         if not self.project_id:
             if project_id:
@@ -35,35 +39,15 @@ class BinaryConfusionMatrix(BaseAnalysis):
             else:
                 raise ValueError('Project ID is not specified.')
 
-    def run(self, api) -> List[BaseOutput]:
-        """
-        :param api: An instance of Fiddler python client.
-        :return: List of output modules.
-        """
+    def _get_evaluations(self, api) -> list:
+        models = self.models if self.models is not None else api.list_models(self.project_id)
 
-        if self.models is None:
-            self.models = api.list_models(self.project_id)
-
-        output_modules = []
-
-        for model_id in self.models:
-            table_objects = []
+        evaluations = []
+        for model_id in models:
             model_info = api.get_model_info(self.project_id, model_id)
             for dataset in model_info.datasets:
                 dataset_obj = api.get_dataset(self.project_id, dataset)
                 for source in dataset_obj.file_list['tree']:
-
-                    table_objects.append(
-                                         FormattedTextBlock([BoldText('Model: '),
-                                                             PlainText(model_id + '\n'),
-                                                             BoldText('Dataset: '),
-                                                             PlainText(dataset + '\n'),
-                                                             BoldText('Source: '),
-                                                             PlainText(source['name']),
-                                                             ]
-                                                            )
-                                         )
-
                     request = {
                                "organization_name": api.organization_name,
                                "project_name": self.project_id,
@@ -73,27 +57,58 @@ class BinaryConfusionMatrix(BaseAnalysis):
                                                "source": source['name']},
                                "binary_threshold": model_info.binary_classification_threshold
                                }
-                    response = FrontEndCall(api, endpoint='scores').post(request)
-
-                    if response['kind'] == 'NORMAL':
-                        CM = np.zeros((2, 2))
-                        CM[0, 0] = response['data']['confusion_matrix']['tp']
-                        CM[0, 1] = response['data']['confusion_matrix']['fn']
-                        CM[1, 0] = response['data']['confusion_matrix']['fp']
-                        CM[1, 1] = response['data']['confusion_matrix']['tn']
-                        table_objects.append(confusion_matrix(CM, ['Positive', 'Negative']))
-
-                    else:
-                        table_objects.append(
-                                             FormattedTextBlock([ItalicText('Confusion matrix data are not available',
-                                                                            font_color=RGBColor(128, 128, 128)
-                                                                            )
-                                                                 ]
-                                                                )
-                                             )
-
-                    output_modules += [ObjectTable(table_objects, width=3)]
-                    output_modules += [AddBreak(4)]
+                    evaluations.append((model_id, dataset, source, request))
+        return evaluations
+
+    def requirements(self, api) -> List[DataRequirement]:
+        return [scores_requirement(request) for *_, request in self._get_evaluations(api)]
+
+    def run(self, api) -> List[BaseOutput]:
+        """
+        :param api: An instance of Fiddler python client.
+        :return: List of output modules.
+        """
+        evaluations = self._get_evaluations(api)
+        responses = AsyncFrontEndCall(api, endpoint='scores').post_batch([request for *_, request in evaluations])
+
+        output_modules = []
+        table_objects = []
+        previous_model_id = None
+        for (model_id, dataset, source, _), response in zip(evaluations, responses):
+            if model_id != previous_model_id:
+                table_objects = []
+                previous_model_id = model_id
+
+            table_objects.append(
+                                 FormattedTextBlock([BoldText('Model: '),
+                                                     PlainText(model_id + '\n'),
+                                                     BoldText('Dataset: '),
+                                                     PlainText(dataset + '\n'),
+                                                     BoldText('Source: '),
+                                                     PlainText(source['name']),
+                                                     ]
+                                                    )
+                                 )
+
+            if response['kind'] == 'NORMAL':
+                CM = np.zeros((2, 2))
+                CM[0, 0] = response['data']['confusion_matrix']['tp']
+                CM[0, 1] = response['data']['confusion_matrix']['fn']
+                CM[1, 0] = response['data']['confusion_matrix']['fp']
+                CM[1, 1] = response['data']['confusion_matrix']['tn']
+                table_objects.append(confusion_matrix(CM, ['Positive', 'Negative']))
+
+            else:
+                table_objects.append(
+                                     FormattedTextBlock([ItalicText('Confusion matrix data are not available',
+                                                                    font_color=RGBColor(128, 128, 128)
+                                                                    )
+                                                         ]
+                                                        )
+                                     )
+
+            output_modules += [ObjectTable(table_objects, width=3)]
+            output_modules += [AddBreak(4)]
         return output_modules
 
 
@@ -112,6 +127,9 @@ class ROC(BaseAnalysis):
         self.project_id = project_id
         self.models = model_list
 
+    def fingerprint_params(self) -> dict:
+        return {'project_id': self.project_id, 'models': self.models}
+
     def preflight(self, api, project_id):
         if not self.project_id:
             if project_id:
@@ -119,30 +137,19 @@ class ROC(BaseAnalysis):
             else:
                 raise ValueError('Project ID is not specified.')
 
-    def run(self, api) -> List[BaseOutput]:
-        """
-        :param api: An instance of Fiddler python client.
-        :return: List of output modules.
-        """
-        if self.models is None:
-            self.models = api.list_models(self.project_id)
+    def _get_evaluations(self, api) -> list:
+        models = self.models if self.models is not None else api.list_models(self.project_id)
 
-        output_modules = []
-        metrics = {}
-        for model_id in self.models:
+        evaluations = []
+        for model_id in models:
             model_info = api.get_model_info(self.project_id, model_id)
             if model_info.model_task == fdl.ModelTask.BINARY_CLASSIFICATION:
-                metrics[model_id] = {}
-
                 dataset = model_info.datasets[0]
-                metrics[model_id][dataset] = {}
-
                 dataset_obj = api.get_dataset(self.project_id, dataset)
                 binary_threshold = model_info.binary_classification_threshold
 
+                sources = []
                 for source in dataset_obj.file_list['tree']:
-                    metrics[model_id][dataset][source['name']] = {}
-
                     request = {
                         "organization_name": api.organization_name,
                         "project_name": self.project_id,
@@ -152,25 +159,51 @@ class ROC(BaseAnalysis):
                                         "source": source['name']},
                         "binary_threshold": binary_threshold
                     }
-                    response = FrontEndCall(api, endpoint='scores').post(request)
-
-                    if response['kind'] == 'NORMAL':
-                        fpr = response['data']['roc_curve']['fpr']
-                        tpr = response['data']['roc_curve']['tpr']
-                        thresholds = response['data']['roc_curve']['thresholds']
-                        res = np.abs(np.array(thresholds) - binary_threshold)
-                        threshold_indx = np.argmin(res)
-
-                        metrics[model_id][dataset][source['name']]['fpr'] = fpr
-                        metrics[model_id][dataset][source['name']]['tpr'] = tpr
-                        metrics[model_id][dataset][source['name']]['threshold_indx'] = threshold_indx
-
-                    else:
-                        warnings.warn(f'Performance scores could not be fetched from Fiddler backend'
-                                      f'with error {response["error"]}.')
-                        output_modules += [DescriptiveTextBlock(f"Performance scores are not available "
-                                                                f"for {model_id} model and {dataset} dataset")
-                                           ]
+                    sources.append((source, request))
+                evaluations.append((model_id, dataset, binary_threshold, sources))
+        return evaluations
+
+    def requirements(self, api) -> List[DataRequirement]:
+        return [scores_requirement(request)
+                for *_, sources in self._get_evaluations(api) for _, request in sources]
+
+    def run(self, api) -> List[BaseOutput]:
+        """
+        :param api: An instance of Fiddler python client.
+        :return: List of output modules.
+        """
+        evaluations = self._get_evaluations(api)
+        requests = [request for *_, sources in evaluations for _, request in sources]
+        responses = iter(AsyncFrontEndCall(api, endpoint='scores').post_batch(requests,
+                                                                            numpy_fields=ROC_ARRAY_FIELDS))
+
+        output_modules = []
+        metrics = {}
+        for model_id, dataset, binary_threshold, sources in evaluations:
+            metrics[model_id] = {}
+            metrics[model_id][dataset] = {}
+
+            for source, _ in sources:
+                metrics[model_id][dataset][source['name']] = {}
+                response = next(responses)
+
+                if response['kind'] == 'NORMAL':
+                    fpr = response['data']['roc_curve']['fpr']
+                    tpr = response['data']['roc_curve']['tpr']
+                    thresholds = response['data']['roc_curve']['thresholds']
+                    res = np.abs(thresholds - binary_threshold)
+                    threshold_indx = np.argmin(res)
+
+                    metrics[model_id][dataset][source['name']]['fpr'] = fpr
+                    metrics[model_id][dataset][source['name']]['tpr'] = tpr
+                    metrics[model_id][dataset][source['name']]['threshold_indx'] = threshold_indx
+
+                else:
+                    warnings.warn(f'Performance scores could not be fetched from Fiddler backend'
+                                  f'with error {response["error"]}.')
+                    output_modules += [DescriptiveTextBlock(f"Performance scores are not available "
+                                                            f"for {model_id} model and {dataset} dataset")
+                                       ]
 
         if metrics:
             tmp_image_file = roc_curve(metrics, binary_threshold)
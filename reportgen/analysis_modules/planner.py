@@ -0,0 +1,149 @@
+import functools
+import json
+import warnings
+from collections import defaultdict
+from typing import Optional, List
+
+from .concurrency import run_concurrently
+from .connection_helpers import AsyncFrontEndCall, get_connection
+from .instrumentation import module_scope
+
+
+class DataRequirement:
+    """
+    A unit of data that an analysis module fetches in its run method: either a front-end request (e.g. to the scores
+    endpoint) or a call of a Fiddler client method (e.g. get_slice or get_model_info). Requirements with the same key
+    are fetched once per report.
+    """
+    def __init__(self, source: str, args: tuple = (), kwargs: Optional[dict] = None, request: Optional[dict] = None):
+        """
+        :param source: Front-end endpoint name or client method name.
+        :param args: Positional arguments of a client method call.
+        :param kwargs: Keyword arguments of a client method call.
+        :param request: JSON payload of a front-end request.
+        """
+        self.source = source
+        self.args = args
+        self.kwargs = kwargs if kwargs else {}
+        self.request = request
+
+    @property
+    def is_frontend(self) -> bool:
+        return self.request is not None
+
+    @property
+    def key(self):
+        if self.is_frontend:
+            return self.source, json.dumps(self.request, sort_keys=True, default=str)
+        return self.source, repr(self.args), repr(sorted(self.kwargs.items()))
+
+    def __repr__(self):
+        if self.is_frontend:
+            return f'DataRequirement({self.source}, request={self.request})'
+        return f'DataRequirement({self.source}, args={self.args}, kwargs={self.kwargs})'
+
+
+def scores_requirement(request: dict) -> DataRequirement:
+    return DataRequirement('scores', request=request)
+
+
+def client_requirement(method: str, *args, **kwargs) -> DataRequirement:
+    return DataRequirement(method, args=args, kwargs=kwargs)
+
+
+class DataPlanner:
+    """
+    Merges the data requirements declared by the analysis modules of a report (see BaseAnalysis.requirements) and
+    fetches every unique requirement once, in parallel, before the modules are run. Front-end responses are kept by
+    the request coalescer of the report and client call results by the MemoizedFiddlerApi proxy, so the modules get
+    them without a round trip when they make the same request in their run method.
+    """
+    def __init__(self, api):
+        """
+        :param api: The MemoizedFiddlerApi proxy used by the report generator.
+        """
+        self.api = api
+        self._requirements = {}
+        self._declared = defaultdict(int)
+
+    def plan(self, analysis_modules: List) -> dict:
+        """
+        Collects the requirements of the given (already preflighted) modules and returns the fetch cost estimate. A
+        module whose requirements cannot be determined is skipped with a warning; it fetches its data when it is run.
+        """
+        for analysis_module in analysis_modules:
+            name = type(analysis_module).__name__
+            try:
+                with module_scope(name):
+                    requirements = analysis_module.requirements(self.api)
+            except Exception as e:
+                warnings.warn(f'The data requirements of the {name} module could not be determined: {e}')
+                continue
+
+            for requirement in requirements:
+                self._declared[requirement.source] += 1
+                self._requirements.setdefault(requirement.key, requirement)
+        return self.estimate()
+
+    def estimate(self) -> dict:
+        """
+        Returns the number of declared and unique requirements for each endpoint and client method.
+        """
+        unique = defaultdict(int)
+        for requirement in self._requirements.values():
+            unique[requirement.source] += 1
+        return {source: {'declared': self._declared[source], 'unique': unique[source]}
+                for source in sorted(self._declared)}
+
+    def execute(self, max_workers: Optional[int] = None) -> dict:
+        """
+        Fetches all planned requirements and returns the fetch cost estimate (see estimate) together with the number
+        of failed fetches for each endpoint and client method. A failed fetch only issues a warning here; the module
+        that needs the data gets the error when it makes the request itself.
+
+        :param max_workers: Number of fetches in flight. If None the max_concurrency of the connection is used.
+        """
+        fetch_plan = self.estimate()
+        frontend_requests = defaultdict(list)
+        client_calls = []
+        for requirement in self._requirements.values():
+            if requirement.is_frontend:
+                frontend_requests[requirement.source].append(requirement.request)
+            else:
+                client_calls.append(requirement)
+
+        max_workers = max_workers if max_workers else get_connection(self.api).config.max_concurrency
+        sources = list(frontend_requests) + [requirement.source for requirement in client_calls]
+        tasks = [functools.partial(self._post_batch, endpoint, requests, max_workers)
+                 for endpoint, requests in frontend_requests.items()]
+        tasks += [functools.partial(self._prefetch, requirement) for requirement in client_calls]
+        failures = run_concurrently(tasks, max_workers=max_workers)
+
+        failed = defaultdict(int)
+        for source, n_failed in zip(sources, failures):
+            failed[source] += n_failed
+        for source in fetch_plan:
+            fetch_plan[source]['failed'] = failed[source]
+        if sum(failed.values()):
+            warnings.warn(f'{sum(failed.values())} planned fetches failed '
+                          f'({", ".join(f"{source}: {n}" for source, n in failed.items() if n)}). '
+                          'The modules that need this data request it again when they are run.')
+
+        self._requirements = {}
+        self._declared = defaultdict(int)
+        return fetch_plan
+
+    def _post_batch(self, endpoint: str, requests: List[dict], max_workers: int) -> int:
+        # returns the number of failed requests
+        try:
+            responses = AsyncFrontEndCall(self.api, endpoint, max_concurrency=max_workers).post_batch(requests)
+        except Exception:
+            return len(requests)
+        return sum(not (isinstance(response, dict) and response.get('kind') == 'NORMAL') for response in responses)
+
+    def _prefetch(self, requirement: DataRequirement) -> int:
+        try:
+            self.api.prefetch(requirement.source, *requirement.args, **requirement.kwargs)
+        except Exception:
+            return 1
+        return 0
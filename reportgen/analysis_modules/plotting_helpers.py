@@ -4,8 +4,10 @@ from matplotlib.lines import Line2D
 from matplotlib.ticker import PercentFormatter
 
 from ..output_modules import TempOutputFile
+from ..output_modules.charts import synchronized_plot
 
 
+@synchronized_plot
 def confusion_matrix(matrix, ticks):
 
     if not matrix.shape[0] == matrix.shape[1]:
@@ -55,6 +57,7 @@ def confusion_matrix(matrix, ticks):
     return tmp_image_file
 
 
+@synchronized_plot
 def pie_chart(total_count, sections, section_names):
 
     slices = dict(zip(section_names, [0]*len(section_names)))
@@ -128,6 +131,7 @@ def pie_chart(total_count, sections, section_names):
     return tmp_image_file
 
 
+@synchronized_plot
 def feature_impact_chart(feature_impacts, top_n = 6):
     feature_impacts = dict(sorted(feature_impacts.items(), key=lambda item: item[1], reverse=True))
     features = [*feature_impacts.keys()]
@@ -166,6 +170,7 @@ def feature_impact_chart(feature_impacts, top_n = 6):
     return tmp_image_file
 
 
+@synchronized_plot
 def roc_curve(measurements, binary_threshold):
     fig, ax = plt.subplots(figsize=(9, 6))
     plt.rc('font', size=12)
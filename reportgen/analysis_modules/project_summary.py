@@ -1,21 +1,33 @@
+import functools
 import warnings
+from collections import Counter
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Iterator, Dict
 
 import pandas as pd
 from tqdm import tqdm
 
 from .alert_analysis import AlertsSummary, AlertsDetails
 from .base import BaseAnalysis
+from .checkpoint import active_checkpoint, iter_checkpointed
+from .concurrency import run_concurrently, iter_concurrently, module_max_workers
 from .dataset_summary import DatasetSummary
 from .failure_case_analysis import FailureCaseAnalysis
 from .feature_impact import FeatureImpact
+from .instrumentation import current_module, module_scope
 from .model_evaluation import ModelEvaluation
 from .model_summary import ModelSummary
+from .planner import DataRequirement, client_requirement
 from .segment_analysis import PerformanceAnalysis, PerformanceAnalysisSpec
 from ..output_modules import BaseOutput, SimpleTextBlock, FormattedTextBlock, SimpleTextStyle, AddBreak, AddPageBreak
+from ..output_modules.profiling import profiled, profiled_iter
 from ..output_modules.text_styles import PlainText, BoldText, ItalicText
 
+SUBMODULE_OUTPUT_ORDER = ('ModelSummary', 'DatasetSummary', 'AlertsSummary', 'AlertsDetails', 'ModelEvaluation',
+                          'FeatureImpact', 'FailureCaseAnalysis', 'PerformanceAnalysis')
+PAGE_BREAK_BEFORE = ('AlertsSummary', 'ModelEvaluation', 'PerformanceAnalysis')
+PAGE_BREAK_AFTER = ('ModelEvaluation', 'PerformanceAnalysis')
+
 
 class ProjectSummary(BaseAnalysis):
     """
@@ -32,8 +44,13 @@ class ProjectSummary(BaseAnalysis):
                  feature_impact=True,
                  failed_cases=False,
                  impact_top_n=6,
-                 n_failed_cases=3
+                 n_failed_cases=3,
+                 max_workers: Optional[int] = None,
                  ):
+        """
+        :param max_workers: Number of submodules that are run at the same time. If None the max_workers argument of
+                            generate_report is used.
+        """
 
         self.project_id = project_id
         self.start_time = start_time
@@ -46,6 +63,24 @@ class ProjectSummary(BaseAnalysis):
         self.failed_cases = failed_cases
         self.impact_top_n = impact_top_n
         self.n_failed_cases = n_failed_cases
+        self.max_workers = max_workers
+        self.submodules = {}
+
+    def fingerprint_params(self) -> Optional[dict]:
+        # the outputs of the submodules are part of the summary
+        if any(module.fingerprint_params() is None for module in self.submodules.values()):
+            return None
+        return {'project_id': self.project_id,
+                'start_time': self.start_time,
+                'end_time': self.end_time,
+                'models': self.models,
+                'performance_analysis': self.performance_analysis,
+                'alert_details': self.alert_details,
+                'feature_impact': self.feature_impact,
+                'failed_cases': self.failed_cases,
+                'impact_top_n': self.impact_top_n,
+                'n_failed_cases': self.n_failed_cases,
+                }
 
     def preflight(self, api, project_id):
         if not self.project_id:
@@ -63,101 +98,132 @@ class ProjectSummary(BaseAnalysis):
         else:
             self.start_time = (self.end_time - pd.to_timedelta(self.start_time_delta))
 
-    def run(self, api) -> List[BaseOutput]:
-        """
-        :param api: An instance of Fiddler python client.
-        :return: List of output modules.
-        """
         # ----------------- external modules initialization and preflights ------------------
-        submodules = {}
-        submodules['DatasetSummary'] = DatasetSummary(self.project_id)
-        submodules['ModelSummary'] = ModelSummary(self.project_id)
-        submodules['AlertsSummary'] = AlertsSummary(project_id=self.project_id,
-                                                    start_time=self.start_time,
-                                                    end_time=self.end_time
-                                                    )
+        self.submodules = {}
+        self.submodules['DatasetSummary'] = DatasetSummary(self.project_id)
+        self.submodules['ModelSummary'] = ModelSummary(self.project_id)
+        self.submodules['AlertsSummary'] = AlertsSummary(project_id=self.project_id,
+                                                         start_time=self.start_time,
+                                                         end_time=self.end_time
+                                                         )
 
         if self.alert_details:
-            submodules['AlertsDetails'] = AlertsDetails(project_id=self.project_id,
-                                                        start_time=self.start_time,
-                                                        end_time=self.end_time
-                                                        )
+            self.submodules['AlertsDetails'] = AlertsDetails(project_id=self.project_id,
+                                                             start_time=self.start_time,
+                                                             end_time=self.end_time
+                                                             )
 
-        submodules['ModelEvaluation'] = ModelEvaluation(project_id=self.project_id)
+        self.submodules['ModelEvaluation'] = ModelEvaluation(project_id=self.project_id)
 
         if self.feature_impact:
-            submodules['FeatureImpact'] = FeatureImpact(project_id=self.project_id, top_n=self.impact_top_n)
+            self.submodules['FeatureImpact'] = FeatureImpact(project_id=self.project_id, top_n=self.impact_top_n)
 
         if self.failed_cases:
-            submodules['FailureCaseAnalysis'] = FailureCaseAnalysis(project_id=self.project_id,
-                                                                    start_time=self.start_time,
-                                                                    end_time=self.end_time,
-                                                                    n_examples=self.n_failed_cases
-                                                                    )
+            self.submodules['FailureCaseAnalysis'] = FailureCaseAnalysis(project_id=self.project_id,
+                                                                         start_time=self.start_time,
+                                                                         end_time=self.end_time,
+                                                                         n_examples=self.n_failed_cases
+                                                                         )
 
         if self.performance_analysis:
-            submodules['PerformanceAnalysis'] = PerformanceAnalysis(project_id=self.project_id,
-                                                                    start_time=self.start_time,
-                                                                    end_time=self.end_time,
-                                                                    analysis_specs=self.performance_analysis)
-
-        pbar = tqdm(total=len(submodules.keys()), desc='Running submodule preflights')
-        for module in submodules.keys():
-            submodules[module].preflight(api, self.project_id)
-            pbar.update()
+            self.submodules['PerformanceAnalysis'] = PerformanceAnalysis(project_id=self.project_id,
+                                                                         start_time=self.start_time,
+                                                                         end_time=self.end_time,
+                                                                         analysis_specs=self.performance_analysis)
+
+        pbar = tqdm(total=len(self.submodules.keys()), desc='Running submodule preflights')
+        run_concurrently([functools.partial(self._preflight_submodule, submodule, name, api, self.project_id, pbar)
+                          for name, submodule in self.submodules.items()],
+                         max_workers=self.max_workers)
         # -----------------------------------------------------------------------------------
 
-        models = api.list_models(self.project_id)
-        datasets = api.list_datasets(self.project_id)
-
-        output_modules = []
-        output_modules += [SimpleTextBlock(text=f'Project: {self.project_id}',
-                                           style=SimpleTextStyle(alignment='left', font_style='bold', size=18))
-                           ]
-        output_modules += [AddBreak(1)]
-        output_modules += [FormattedTextBlock([BoldText('Time Interval: '),
-                                               ItalicText('{} '.format(self.start_time)),
-                                               PlainText('to '),
-                                               ItalicText('{}'.format(self.end_time))
-                                               ]
-                                              )
-                           ]
-        output_modules += [AddBreak(1)]
-        output_modules += [FormattedTextBlock([PlainText('Project '),
-                                               BoldText(self.project_id),
-                                               PlainText(' contains '),
-                                               BoldText('{} model(s) '.format(len(models))),
-                                               PlainText('and '),
-                                               BoldText('{} dataset(s) '.format(len(datasets))),
-                                               PlainText('as summarized below. '.format(len(models), len(datasets))),
-                                               PlainText('During this time interval a total number of '),
-                                               BoldText('{} alert(s) '.format(submodules['AlertsSummary'].alerts_count)),
-                                               PlainText('were triggered for this project.')
-                                               ]
-                                              )
-                           ]
-        output_modules += [AddBreak(2)]
-        output_modules += submodules['ModelSummary'].run(api)
-        output_modules += submodules['DatasetSummary'].run(api)
-        output_modules += [AddPageBreak()]
-        output_modules += submodules['AlertsSummary'].run(api)
-
-        if self.alert_details:
-            output_modules += submodules['AlertsDetails'].run(api)
+    @staticmethod
+    def _preflight_submodule(submodule, name, api, project_id, pbar):
+        with module_scope(name), profiled('preflight', current_module.get()):
+            submodule.preflight(api, project_id)
+        pbar.update()
+
+    @staticmethod
+    def _iter_submodule(submodule, name, api) -> Iterator[BaseOutput]:
+        with module_scope(name):
+            # submodules completed by a failed run are restored when the run is resumed
+            yield from profiled_iter(iter_checkpointed(name, submodule.iter_run, api), 'run', current_module.get())
+
+    def _run_submodule(self, submodule, name, api) -> List[BaseOutput]:
+        return list(self._iter_submodule(submodule, name, api))
+
+    def requirements(self, api) -> List[DataRequirement]:
+        requirements = [client_requirement('list_models', self.project_id),
+                        client_requirement('list_datasets', self.project_id),
+                        ]
+        checkpoint = active_checkpoint.get()
+        for name, submodule in self.submodules.items():
+            if checkpoint is not None and checkpoint.completed(name):
+                # restored from the checkpoint instead of being run
+                continue
+            with module_scope(name):
+                requirements += submodule.requirements(api)
+        return requirements
+
+    def estimate_calls(self, api) -> Dict[str, int]:
+        calls = Counter({'list_models': 1, 'list_datasets': 1})
+        for name, submodule in self.submodules.items():
+            with module_scope(name):
+                calls.update(submodule.estimate_calls(api))
+        return dict(calls)
 
-        output_modules += [AddPageBreak()]
-        output_modules += submodules['ModelEvaluation'].run(api)
-        output_modules += [AddPageBreak()]
-
-        if self.feature_impact:
-            output_modules += submodules['FeatureImpact'].run(api)
+    def run(self, api) -> List[BaseOutput]:
+        """
+        :param api: An instance of Fiddler python client.
+        :return: List of output modules.
+        """
+        return list(self.iter_run(api))
 
-        if self.failed_cases:
-            output_modules += submodules['FailureCaseAnalysis'].run(api)
+    def iter_run(self, api) -> Iterator[BaseOutput]:
+        # the alert count is shown in the project header, before the outputs of the submodules
+        self.submodules['AlertsSummary']._load_alerts(api)
 
-        if self.performance_analysis:
-            output_modules += [AddPageBreak()]
-            output_modules += submodules['PerformanceAnalysis'].run(api)
-            output_modules += [AddPageBreak()]
+        models = api.list_models(self.project_id)
+        datasets = api.list_datasets(self.project_id)
 
-        return output_modules
+        yield SimpleTextBlock(text=f'Project: {self.project_id}',
+                              style=SimpleTextStyle(alignment='left', font_style='bold', size=18))
+        yield AddBreak(1)
+        yield FormattedTextBlock([BoldText('Time Interval: '),
+                                  ItalicText('{} '.format(self.start_time)),
+                                  PlainText('to '),
+                                  ItalicText('{}'.format(self.end_time))
+                                  ]
+                                 )
+        yield AddBreak(1)
+        yield FormattedTextBlock([PlainText('Project '),
+                                  BoldText(self.project_id),
+                                  PlainText(' contains '),
+                                  BoldText('{} model(s) '.format(len(models))),
+                                  PlainText('and '),
+                                  BoldText('{} dataset(s) '.format(len(datasets))),
+                                  PlainText('as summarized below. '.format(len(models), len(datasets))),
+                                  PlainText('During this time interval a total number of '),
+                                  BoldText('{} alert(s) '.format(self.submodules['AlertsSummary'].alerts_count)),
+                                  PlainText('were triggered for this project.')
+                                  ]
+                                 )
+        yield AddBreak(2)
+
+        # the submodules are independent of each other and may run concurrently; their outputs are yielded in the
+        # order below as soon as they are available. Submodules run one after another stream their outputs.
+        names = [name for name in SUBMODULE_OUTPUT_ORDER if name in self.submodules]
+        if (self.max_workers if self.max_workers else module_max_workers.get()) <= 1:
+            submodule_outputs = (self._iter_submodule(self.submodules[name], name, api) for name in names)
+        else:
+            submodule_outputs = iter_concurrently([functools.partial(self._run_submodule, self.submodules[name], name,
+                                                                     api)
+                                                   for name in names],
+                                                  max_workers=self.max_workers)
+
+        for name, outputs in zip(names, submodule_outputs):
+            if name in PAGE_BREAK_BEFORE:
+                yield AddPageBreak()
+            yield from outputs
+            if name in PAGE_BREAK_AFTER:
+                yield AddPageBreak()
@@ -0,0 +1,158 @@
+import contextlib
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+CACHE_FOREVER = float('inf')
+# time-to-live of responses that must neither be served from nor stored in the cache
+NO_CACHE = 0
+DEFAULT_CACHE_PATH = '.reportgen_cache/responses.sqlite'
+
+# Reports can bypass the cache without detaching it from the connection (see FiddlerReportGenerator.generate_report)
+cache_enabled = contextvars.ContextVar('cache_enabled', default=True)
+
+
+def canonical_request_key(url: str, organization: str, request: dict) -> str:
+    """
+    Returns a key that identifies a front-end request regardless of the ordering of the keys in its JSON payload.
+    """
+    canonical = json.dumps({'url': url, 'organization': organization, 'request': request},
+                           sort_keys=True,
+                           separators=(',', ':'),
+                           default=str,
+                           )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def normalize(value):
+    """
+    Converts a value into a structure of JSON types that does not depend on object identity. Objects without a custom
+    __repr__ are represented by their attributes, all other objects by their repr.
+    """
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if hasattr(value, '__dict__') and type(value).__repr__ is object.__repr__:
+        return {'__class__': type(value).__name__, **normalize(vars(value))}
+    return repr(value)
+
+
+def fingerprint(*parts) -> str:
+    """
+    Returns a stable key for the given values (see normalize).
+    """
+    canonical = json.dumps(normalize(parts), sort_keys=True, separators=(',', ':'), default=repr)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    A persistent on-disk cache of front-end (e.g. scores and explain) responses stored in a SQLite file. Entries
+    expire after a time-to-live and the least recently used entries are evicted once the cache grows beyond its size
+    limit. Only successful responses are cached.
+    """
+    def __init__(self,
+                 path: str = DEFAULT_CACHE_PATH,
+                 ttl: Optional[float] = 24 * 3600,
+                 max_size_mb: float = 512,
+                 ):
+        """
+        :param path: Path of the SQLite file. Parent directories are created if they do not exist.
+        :param ttl: Default time-to-live of an entry in seconds. None or CACHE_FOREVER keeps entries until evicted.
+        :param max_size_mb: Maximum total size of the cached responses in megabytes.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS responses ('
+                         'key TEXT PRIMARY KEY, '
+                         'response TEXT NOT NULL, '
+                         'size INTEGER NOT NULL, '
+                         'expires REAL, '
+                         'accessed REAL NOT NULL)'
+                         )
+            conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute('SELECT response FROM responses WHERE key=? AND (expires IS NULL OR expires>?)',
+                               (key, now)
+                               ).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE responses SET accessed=? WHERE key=?', (now, key))
+        return json.loads(row[0])
+
+    def put(self, key: str, response: dict, ttl: Optional[float] = None):
+        """
+        :param ttl: Time-to-live of this entry in seconds. If None the cache default is used.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        expires = None if ttl is None or ttl == CACHE_FOREVER else now + ttl
+        payload = json.dumps(response, separators=(',', ':'))
+
+        with self._lock, self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO responses (key, response, size, expires, accessed) '
+                         'VALUES (?, ?, ?, ?, ?)',
+                         (key, payload, len(payload), expires, now)
+                         )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute('DELETE FROM responses WHERE expires IS NOT NULL AND expires<=?', (now,))
+
+        total_size = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total_size <= self.max_size:
+            return
+
+        stale_keys = []
+        for key, size in conn.execute('SELECT key, size FROM responses ORDER BY accessed'):
+            if total_size <= self.max_size:
+                break
+            stale_keys.append((key,))
+            total_size -= size
+        conn.executemany('DELETE FROM responses WHERE key=?', stale_keys)
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute('DELETE FROM responses')
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
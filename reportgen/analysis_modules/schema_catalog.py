@@ -0,0 +1,102 @@
+import contextvars
+import threading
+from typing import Optional, Dict, Tuple
+
+import fiddler as fdl
+import pandas as pd
+
+# schema catalog of the running report (see FiddlerReportGenerator.generate_report)
+active_schema_catalog = contextvars.ContextVar('active_schema_catalog', default=None)
+
+
+def _data_type(dtype) -> fdl.DataType:
+    if isinstance(dtype, pd.CategoricalDtype):
+        return fdl.DataType.CATEGORY
+    if pd.api.types.is_bool_dtype(dtype):
+        return fdl.DataType.BOOLEAN
+    if pd.api.types.is_integer_dtype(dtype):
+        return fdl.DataType.INTEGER
+    if pd.api.types.is_float_dtype(dtype):
+        return fdl.DataType.FLOAT
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return fdl.DataType.TIMESTAMP
+    return fdl.DataType.STRING
+
+
+class SchemaCatalog:
+    """
+    Column types and time ranges of the (dataset, model) tables queried by the analysis modules of a report. Column
+    types are taken from the model info (inputs, outputs, targets and metadata columns); a table is only probed with
+    a one-row query for columns that the model info does not describe. Both time bounds of a table are fetched with a
+    single MIN/MAX query. Everything is looked up once per report.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._declared_types = {}
+        self._probed_types = {}
+        self._time_ranges = {}
+
+    def column_types(self, api, project_id: str, model_id: str, dataset_id: str,
+                     column: Optional[str] = None) -> Dict[str, fdl.DataType]:
+        """
+        Returns the data type of every known column of a table.
+
+        :param column: If the model info does not describe this column, the table is probed for its columns.
+        """
+        key = (project_id, model_id, dataset_id)
+        with self._lock:
+            declared_types = self._declared_types.get(key)
+            probed_types = self._probed_types.get(key)
+
+        if declared_types is None:
+            model_info = api.get_model_info(project_id, model_id)
+            declared_types = {}
+            for columns in [model_info.inputs, model_info.outputs, model_info.targets,
+                            getattr(model_info, 'metadata', None)]:
+                for model_column in columns or []:
+                    declared_types[model_column.name] = model_column.data_type
+            with self._lock:
+                self._declared_types[key] = declared_types
+
+        if column is not None and column not in declared_types and probed_types is None:
+            query = f""" SELECT * FROM {dataset_id}."{model_id}" LIMIT 1 """
+            slice_df = api.get_slice(sql_query=query, project_id=project_id)
+            probed_types = {name: _data_type(dtype) for name, dtype in slice_df.dtypes.items()}
+            with self._lock:
+                self._probed_types[key] = probed_types
+
+        # the model info takes precedence, since a one-row slice does not show the declared type
+        return {**(probed_types or {}), **declared_types}
+
+    def column_type(self, api, project_id: str, model_id: str, dataset_id: str, column: str) -> Optional[fdl.DataType]:
+        """
+        Returns the data type of a column, or None if the table has no such column.
+        """
+        return self.column_types(api, project_id, model_id, dataset_id, column).get(column)
+
+    def time_range(self, api, project_id: str, model_id: str, dataset_id: str) -> Tuple[pd.Timestamp, pd.Timestamp]:
+        """
+        Returns the first and the last fiddler_timestamp of a table.
+        """
+        key = (project_id, model_id, dataset_id)
+        with self._lock:
+            time_range = self._time_ranges.get(key)
+        if time_range is not None:
+            return time_range
+
+        query = f""" SELECT MIN(fiddler_timestamp) AS start_time, MAX(fiddler_timestamp) AS end_time """
+        query += f"""FROM {dataset_id}."{model_id}" """
+        slice_df = api.get_slice(sql_query=query, project_id=project_id)
+        time_range = pd.Timestamp(slice_df['start_time'][0]), pd.Timestamp(slice_df['end_time'][0])
+
+        with self._lock:
+            self._time_ranges[key] = time_range
+        return time_range
+
+
+def schema_catalog() -> SchemaCatalog:
+    """
+    Returns the schema catalog of the running report, or a new catalog outside of a report.
+    """
+    catalog = active_schema_catalog.get()
+    return catalog if catalog is not None else SchemaCatalog()
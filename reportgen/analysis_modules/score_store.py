@@ -0,0 +1,116 @@
+import contextlib
+import contextvars
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict
+
+import pandas as pd
+
+DEFAULT_SCORE_STORE_PATH = '.reportgen_cache/interval_scores.sqlite'
+
+# score store of the running report (see FiddlerReportGenerator.generate_report)
+active_score_store = contextvars.ContextVar('active_score_store', default=None)
+
+
+class IntervalScoreStore:
+    """
+    A persistent on-disk store of the interval scores of PerformanceTimeSeries modules in a SQLite file. Scores are
+    kept per series, i.e. per (project, model, dataset, metric, segment, interval length), and interval start, so a
+    report only fetches the intervals that are not in the store yet. Only closed intervals are stored: the score of
+    an interval that has not ended yet (the current partial interval) changes while production data arrives.
+    """
+    def __init__(self, path: str = DEFAULT_SCORE_STORE_PATH, grace_period: Optional[str] = None):
+        """
+        :param path: Path of the SQLite file. Parent directories are created if they do not exist.
+        :param grace_period: Time after the end of an interval (e.g. '6H') during which its score is still considered
+                             volatile, for deployments where events arrive late. If None intervals are final as soon
+                             as they end.
+        """
+        self.path = path
+        self.grace_period = pd.Timedelta(grace_period) if grace_period else pd.Timedelta(0)
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS scores ('
+                         'project TEXT NOT NULL, '
+                         'model TEXT NOT NULL, '
+                         'dataset TEXT NOT NULL, '
+                         'metric TEXT NOT NULL, '
+                         'segment TEXT NOT NULL, '
+                         'interval_length TEXT NOT NULL, '
+                         'interval_start TEXT NOT NULL, '
+                         'score REAL NOT NULL, '
+                         'stored REAL NOT NULL, '
+                         'PRIMARY KEY (project, model, dataset, metric, segment, interval_length, interval_start))'
+                         )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def is_final(self, interval: pd.Interval, now: Optional[pd.Timestamp] = None) -> bool:
+        """
+        Returns True if the score of the interval can no longer change.
+        """
+        now = now if now is not None else pd.Timestamp.now(tz='UTC').tz_localize(None)
+        return interval.right + self.grace_period <= now
+
+    def get(self, series: tuple) -> Dict[str, float]:
+        """
+        Returns the stored scores of a series by interval start.
+
+        :param series: (project, model, dataset, metric, segment, interval_length) tuple.
+        """
+        with self._lock, self._connect() as conn:
+            rows = conn.execute('SELECT interval_start, score FROM scores WHERE project=? AND model=? AND dataset=? '
+                                'AND metric=? AND segment=? AND interval_length=?',
+                                series
+                                ).fetchall()
+        return dict(rows)
+
+    def put(self, series: tuple, scores: Dict[str, float]):
+        """
+        Stores scores of a series by interval start. Missing scores (NaN) are not stored, since they may be caused
+        by a failed request.
+        """
+        now = time.time()
+        rows = [(*series, interval_start, float(score), now) for interval_start, score in scores.items()
+                if score is not None and not math.isnan(score)]
+        if not rows:
+            return
+
+        with self._lock, self._connect() as conn:
+            conn.executemany('INSERT OR REPLACE INTO scores (project, model, dataset, metric, segment, '
+                             'interval_length, interval_start, score, stored) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                             rows
+                             )
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute('DELETE FROM scores')
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM scores').fetchone()[0]
@@ -1,16 +1,45 @@
 import enum
-from collections import defaultdict
+import functools
+import warnings
+from collections import defaultdict, Counter
 from dataclasses import dataclass
-from typing import Optional, List
+from typing import Optional, List, Iterator, Dict
 
+import fiddler as fdl
 import numpy as np
 import pandas as pd
 
 from .base import BaseAnalysis
-from .connection_helpers import FrontEndCall
+from .concurrency import concurrency_controller, run_concurrently
+from .connection_helpers import AsyncFrontEndCall
+from .local_metrics import DEFAULT_BINARY_THRESHOLD, supports, cell_metric, positive_class_rows
+from .response_cache import CACHE_FOREVER, NO_CACHE, cache_enabled
+from .schema_catalog import SchemaCatalog, active_schema_catalog, schema_catalog
+from .score_store import active_score_store
 from ..output_modules import BaseOutput, SimpleTextBlock, FormattedTextBlock, SimpleTextStyle, AddBreak, LinePlot, \
     PlainText, BoldText, ObjectTable
 
+ENGINES = ('scores', 'local')
+# maximum time span fetched by one get_slice call of the local engine
+LOCAL_CHUNK_LENGTH = '30D'
+# column of the segment labels fetched by the local engine
+SEGMENT_LABEL_COLUMN = 'segment_label'
+CATEGORICAL_MODES = ('all', 'top_n', 'top_n_with_other', 'list')
+# the 'all' mode combines the categories beyond the most frequent ones into the other segment
+MAX_CATEGORICAL_SEGMENTS = 20
+OTHER_SEGMENT = 'other'
+NUMERICAL_MODES = ('equal_width', 'quantile', 'edges')
+DEFAULT_N_BINS = 4
+# resolution of the histogram from which the bin edges of the quantile mode are interpolated
+HISTOGRAM_BINS = 1000
+
+
+def sql_string(value) -> str:
+    """
+    Returns a SQL string literal of a value.
+    """
+    return "'" + str(value).replace("'", "''") + "'"
+
 
 @enum.unique
 class SegmentType(str, enum.Enum):
@@ -30,6 +59,8 @@ class PerformanceAnalysisSpec:
     predicate: Optional[str] = None
     dataset_id: str = 'production'
     show_baseline: bool = True
+    engine: str = 'scores'
+    max_workers: Optional[int] = None
 
 
 @dataclass
@@ -41,11 +72,43 @@ class Segment:
     predicate: Optional[str] = None
 
     def __post_init__(self):
-        if self.type == SegmentType.CATEGORICAL and self.mode is None:
-            self.mode = 'all'
+        if self.type == SegmentType.CATEGORICAL:
+            if self.mode is None:
+                self.mode = 'all'
+            if self.mode not in CATEGORICAL_MODES:
+                raise ValueError(f'Unknown categorical segmentation mode {self.mode}. '
+                                 f'Supported modes are {CATEGORICAL_MODES}.')
+            if self.mode in ['top_n', 'top_n_with_other'] and 'top_n' not in (self.args or {}):
+                raise ValueError(f"When mode is set to '{self.mode}' a 'top_n' value must be passed to args.")
+            if self.mode == 'list' and not (self.args or {}).get('categories'):
+                raise ValueError("When mode is set to 'list' a list of 'categories' must be passed to args.")
+
+        if self.type == SegmentType.CUSTOM and not self.predicate:
+            raise ValueError('A custom segment requires a SQL predicate.')
+
+        if self.type == SegmentType.NUMERICAL:
+            if self.mode is None:
+                self.mode = 'equal_width'
+            if self.mode not in NUMERICAL_MODES:
+                raise ValueError(f'Unknown numerical segmentation mode {self.mode}. '
+                                 f'Supported modes are {NUMERICAL_MODES}.')
+            if self.mode == 'edges' and len((self.args or {}).get('edges', [])) < 2:
+                raise ValueError("When mode is set to 'edges' a list of at least two 'edges' must be passed to args.")
+            if self.mode == 'edges' and not np.isfinite(np.asarray(self.args['edges'], dtype=float)).all():
+                raise ValueError(f"The bin edges must be finite numbers, got {list(self.args['edges'])}.")
 
     @classmethod
     def categorical(cls, column: str, mode: str = 'all', args: Optional[dict] = None):
+        """
+        Segments the rows by the categories of a categorical column.
+
+        :param mode: 'all' creates a segment for each category; beyond args['max_segments'] categories (default
+                     MAX_CATEGORICAL_SEGMENTS) the least frequent ones are combined into the segment OTHER_SEGMENT.
+                     'top_n' creates a segment for each of the args['top_n'] most frequent categories and
+                     'top_n_with_other' combines the remaining categories into OTHER_SEGMENT. 'list' creates a
+                     segment for each category in args['categories'], and the OTHER_SEGMENT of the remaining
+                     categories if args['other'] is True.
+        """
         return cls(
             type=SegmentType.CATEGORICAL,
             column=column,
@@ -54,9 +117,57 @@ class Segment:
         )
 
     @classmethod
-    def numerical(cls, feature: str, mode: str, args: Optional[dict] = None):
-        print("Segmentation on numerical columns is not implemented yet")
-        return None
+    def numerical(cls, column: str, mode: str = 'equal_width', args: Optional[dict] = None):
+        """
+        Segments the rows by bins of a numerical column. The last bin includes its right edge, all other bins are
+        right-open.
+
+        :param mode: 'equal_width' splits the range of the column into args['n_bins'] bins of equal width, 'quantile'
+                     into args['n_bins'] bins with about the same number of rows and 'edges' uses the bin edges in
+                     args['edges']. The range and the quantiles are computed by the backend with aggregate queries.
+        """
+        return cls(
+            type=SegmentType.NUMERICAL,
+            column=column,
+            mode=mode,
+            args=args
+        )
+
+    @classmethod
+    def custom(cls, predicate: str, label: Optional[str] = None):
+        """
+        A single segment of the rows that satisfy a SQL predicate, e.g. "age > 40 AND state='CA'".
+
+        :param label: Name of the segment in the plot. Defaults to the predicate.
+        """
+        return cls(
+            type=SegmentType.CUSTOM,
+            predicate=predicate,
+            args={'label': label} if label else None
+        )
+
+
+def histogram_quantiles(counts: np.ndarray, min_value: float, bin_width: float, quantiles) -> np.ndarray:
+    """
+    Interpolates quantiles from the counts of equal-width histogram bins starting at min_value, assuming that the
+    values are spread uniformly within each bin.
+    """
+    cumulative = np.concatenate([[0], np.cumsum(counts)])
+    bin_edges = min_value + bin_width * np.arange(len(counts) + 1)
+    return np.interp(np.asarray(quantiles) * cumulative[-1], cumulative, bin_edges)
+
+
+def bin_labels(edges: np.ndarray) -> List[str]:
+    """
+    Returns the labels of the bins between consecutive edges. Edges are shown with 4 significant digits, or as many
+    more as are needed to tell them apart, so that every bin gets its own label.
+    """
+    for digits in range(4, 18):
+        formatted = [f'{edge:.{digits}g}' for edge in edges]
+        if len(set(formatted)) == len(set(edges)):
+            break
+    return [f'[{left}, {right}' + (']' if i == len(edges) - 2 else ')')
+            for i, (left, right) in enumerate(zip(formatted[:-1], formatted[1:]))]
 
 
 class PerformanceAnalysis(BaseAnalysis):
@@ -73,6 +184,15 @@ class PerformanceAnalysis(BaseAnalysis):
         self.start_time = pd.Timestamp(start_time).floor(freq='D') if start_time else None
         self.end_time = pd.Timestamp(end_time).ceil(freq='D') if end_time else None
         self.analysis_modules = []
+        # (index in analysis_modules, index of the metric in the outputs of that module) of every spec
+        self.spec_outputs = []
+
+    def fingerprint_params(self) -> dict:
+        return {'project_id': self.project_id,
+                'analysis_specs': self.analysis_specs,
+                'start_time': self.start_time,
+                'end_time': self.end_time,
+                }
 
     def preflight(self, api, project_id):
         if not self.project_id:
@@ -81,58 +201,94 @@ class PerformanceAnalysis(BaseAnalysis):
             else:
                 raise ValueError('Project ID is not specified.')
 
-        df_heads = {}
+        # the time series are rebuilt by every preflight, e.g. by a dry run followed by the report
+        self.analysis_modules = []
+        self.spec_outputs = []
+
+        # the time series of the specs share the column types and time ranges of their tables
+        catalog = schema_catalog()
+        catalog_token = active_schema_catalog.set(catalog)
+        try:
+            self._preflight_specs(api, catalog)
+        finally:
+            active_schema_catalog.reset(catalog_token)
+
+    def _preflight_specs(self, api, catalog: SchemaCatalog):
+        # specs that only differ in their metric share one time series, since every scores response (and every
+        # slice of the local engine) serves all metrics
+        groups = {}
         for spec in self.analysis_specs:
             segment = None
             if spec.segment_col:
-                if (spec.dataset_id, spec.model_id) in df_heads:
-                    slice_df = df_heads[(spec.dataset_id, spec.model_id)]
-                else:
-                    query = f""" SELECT * FROM {spec.dataset_id}."{spec.model_id}" LIMIT 1 """
-                    slice_df = api.get_slice(sql_query=query, project_id=self.project_id)
-                    df_heads[(spec.dataset_id, spec.model_id)] = slice_df
-
-                if spec.segment_col not in slice_df.columns:
+                column_type = catalog.column_type(api, self.project_id, spec.model_id, spec.dataset_id,
+                                                  spec.segment_col)
+                if column_type is None:
                     raise ValueError(f"Feature name {spec.segment_col} does not exists.")
 
-                if slice_df.dtypes[spec.segment_col] == 'category':
+                if column_type == fdl.DataType.CATEGORY:
                     segment = Segment.categorical(column=spec.segment_col,
                                                   mode=spec.segment_mode,
                                                   args=spec.args
                                                   )
-                elif slice_df.dtypes[spec.segment_col] in ['int64', 'float64']:
+                elif column_type in [fdl.DataType.INTEGER, fdl.DataType.FLOAT]:
                     segment = Segment.numerical(column=spec.segment_col,
                                                 mode=spec.segment_mode,
                                                 args=spec.args
                                                 )
                 else:
                     raise ValueError(f"Segmentation on column {spec.segment_col} with type "
-                                     f"{slice_df.dtypes[spec.segment_col]} is not supported.")
-
-            self.analysis_modules.append(
-                                         PerformanceTimeSeries(project_id=self.project_id,
-                                                               model_id=spec.model_id,
-                                                               metric=spec.metric,
-                                                               interval_length=spec.interval_length,
-                                                               start_time=self.start_time,
-                                                               end_time=self.end_time,
-                                                               segments=segment,
-                                                               dataset_id=spec.dataset_id,
-                                                               show_baseline=spec.show_baseline
-                                                               )
-                                         )
+                                     f"{column_type.value} is not supported.")
+
+            elif spec.predicate:
+                segment = Segment.custom(predicate=spec.predicate)
+
+            key = (spec.model_id, spec.dataset_id, spec.interval_length, repr(segment), spec.show_baseline,
+                   spec.engine, spec.max_workers)
+            if key not in groups:
+                groups[key] = len(self.analysis_modules)
+                self.analysis_modules.append(
+                                             PerformanceTimeSeries(project_id=self.project_id,
+                                                                   model_id=spec.model_id,
+                                                                   metric=spec.metric,
+                                                                   interval_length=spec.interval_length,
+                                                                   start_time=self.start_time,
+                                                                   end_time=self.end_time,
+                                                                   segments=segment,
+                                                                   dataset_id=spec.dataset_id,
+                                                                   show_baseline=spec.show_baseline,
+                                                                   engine=spec.engine,
+                                                                   max_workers=spec.max_workers,
+                                                                   )
+                                             )
+
+            module = self.analysis_modules[groups[key]]
+            if spec.metric not in module.metrics:
+                module.additional_metrics.append(spec.metric)
+            self.spec_outputs.append((groups[key], module.metrics.index(spec.metric)))
+
         for module in self.analysis_modules:
             module.preflight(api, self.project_id)
 
+    def estimate_calls(self, api) -> Dict[str, int]:
+        calls = Counter()
+        for module in self.analysis_modules:
+            calls.update(module.estimate_calls(api))
+        return dict(calls)
+
     def run(self, api) -> List[BaseOutput]:
-        output_modules = []
-        output_modules += [SimpleTextBlock(text='Performance Analysis',
-                                           style=SimpleTextStyle(font_style='bold', size=18)
-                                           )
-                           ]
-        output_modules += [AddBreak(2)]
+        return list(self.iter_run(api))
 
+    def iter_run(self, api) -> Iterator[BaseOutput]:
+        yield SimpleTextBlock(text='Performance Analysis',
+                              style=SimpleTextStyle(font_style='bold', size=18)
+                              )
+        yield AddBreak(2)
+
+        # the plots of a time series are kept until all of its specs are rendered
+        plots = {}
         for idx, spec in enumerate(self.analysis_specs):
+            module_index, plot_index = self.spec_outputs[idx]
+            module = self.analysis_modules[module_index]
             table_objects = []
             spec_info = [BoldText('Model: '),
                          PlainText(spec.model_id + '\n'),
@@ -144,16 +300,20 @@ class PerformanceAnalysis(BaseAnalysis):
                 spec_info += [BoldText('Segmentation: '),
                               PlainText(spec.segment_col + '\n'),
                               BoldText('Segmentation Mode: '),
-                              PlainText(self.analysis_modules[idx].segments.mode + '\n'),
+                              PlainText(module.segments.mode + '\n'),
+                              ]
+            elif spec.predicate:
+                spec_info += [BoldText('Segment: '),
+                              PlainText(spec.predicate.strip() + '\n'),
                               ]
 
             table_objects.append(FormattedTextBlock(spec_info))
-            table_objects.append(self.analysis_modules[idx].run(api)[0].get_image())
+            if module_index not in plots:
+                plots[module_index] = module.run(api)
+            table_objects.append(plots[module_index][plot_index].get_image())
 
-            output_modules += [ObjectTable(table_objects, width=3.5)]
-            output_modules += [AddBreak(4)]
-
-        return output_modules
+            yield ObjectTable(table_objects, width=3.5)
+            yield AddBreak(4)
 
 
 class PerformanceTimeSeries(BaseAnalysis):
@@ -167,8 +327,29 @@ class PerformanceTimeSeries(BaseAnalysis):
                  end_time=None,
                  segments: Optional[Segment] = None,
                  dataset_id: str = 'production',
-                 show_baseline: bool = True
+                 show_baseline: bool = True,
+                 engine: str = 'scores',
+                 chunk_length: str = LOCAL_CHUNK_LENGTH,
+                 max_workers: Optional[int] = None,
+                 additional_metrics: Optional[List[str]] = None,
                  ):
+        """
+        :param engine: 'scores' requests the metric of every interval and segment from the scores endpoint. 'local'
+                       fetches the target, output and segment columns of the whole window with a few get_slice calls
+                       and computes the metrics of all intervals and segments locally (see local_metrics.py). The
+                       local engine supports the metrics in LOCAL_METRICS; for other metrics the scores engine is
+                       used.
+        :param chunk_length: Maximum time span fetched by one get_slice call of the local engine.
+        :param max_workers: Maximum number of requests in flight: the (interval, segment) and baseline requests of
+                            the scores engine, or the get_slice calls of the local engine. If None the max_concurrency
+                            of the connection (scores) or the get_slice limit of the concurrency controller (local)
+                            is used.
+        :param additional_metrics: Further metrics that are extracted from the same scores responses (or computed
+                                   from the same rows by the local engine). run returns one LinePlot per metric,
+                                   starting with metric.
+        """
+        if engine not in ENGINES:
+            raise ValueError(f'Unknown engine {engine}. Supported engines are {ENGINES}.')
 
         self.project_id = project_id
         self.model_id = model_id
@@ -179,6 +360,25 @@ class PerformanceTimeSeries(BaseAnalysis):
         self.segments = segments
         self.dataset_id = dataset_id
         self.show_baseline = show_baseline
+        self.engine = engine
+        self.chunk_length = chunk_length
+        self.max_workers = max_workers
+        self.additional_metrics = [m for m in additional_metrics or [] if m != metric]
+
+    def fingerprint_params(self) -> dict:
+        # chunk_length and max_workers only affect how the scores are fetched
+        return {'project_id': self.project_id,
+                'model_id': self.model_id,
+                'metric': self.metric,
+                'additional_metrics': self.additional_metrics,
+                'interval_length': self.interval_length,
+                'start_time': self.start_time,
+                'end_time': self.end_time,
+                'segments': self.segments,
+                'dataset_id': self.dataset_id,
+                'show_baseline': self.show_baseline,
+                'engine': self.engine,
+                }
 
     def preflight(self, api, project_id):
         if not self.project_id:
@@ -187,74 +387,161 @@ class PerformanceTimeSeries(BaseAnalysis):
             else:
                 raise ValueError('Project ID is not specified.')
 
-        self.start_time = self.start_time if self.start_time else self._get_start_time_time(api)
-        self.end_time = self.end_time if self.end_time else self._get_end_time_time(api)
+        catalog = schema_catalog()
+        self.start_time = self.start_time if self.start_time else self._get_start_time_time(api, catalog)
+        self.end_time = self.end_time if self.end_time else self._get_end_time_time(api, catalog)
 
         if self.start_time > self.end_time:
             raise ValueError(f"Invalid time interval: end_time time {self.end_time} is before start_time time {self.start_time}")
 
-        if self.segments:
-            query = f""" SELECT * FROM {self.dataset_id}."{self.model_id}" LIMIT 1 """
-            slice_df = api.get_slice(sql_query=query, project_id=self.project_id)
+        if self.segments and self.segments.column:
+            column_type = catalog.column_type(api, self.project_id, self.model_id, self.dataset_id,
+                                              self.segments.column)
+            if column_type is None:
+                raise ValueError(f"Feature name {self.segments.column} does not exists.")
 
-            if self.segments.column:
-                if self.segments.column not in slice_df.columns:
-                    raise ValueError(f"Feature name {self.segments.column} does not exists.")
+            if self.segments.type == SegmentType.CATEGORICAL and column_type != fdl.DataType.CATEGORY:
+                raise ValueError(f"Categorical segmentations is applied to the non-categorical feature {self.segments.column}.")
 
-                if self.segments.type == SegmentType.CATEGORICAL and not slice_df.dtypes[self.segments.column] == 'category':
-                    raise ValueError(f"Categorical segmentations is applied to the non-categorical feature {self.segments.column}.")
+            if self.segments.type == SegmentType.NUMERICAL and \
+                    column_type not in [fdl.DataType.INTEGER, fdl.DataType.FLOAT]:
+                raise ValueError(f"Numerical segmentations is applied to the non-numerical feature {self.segments.column}.")
 
-    def _get_start_time_time(self, api):
-        query = f""" SELECT * FROM {self.dataset_id}."{self.model_id}" """
-        query += f"""WHERE """
-        query += f"""fiddler_timestamp=(SELECT MIN(fiddler_timestamp) FROM {self.dataset_id}."{self.model_id}")"""
-        slice_df = api.get_slice(sql_query=query, project_id=self.project_id)
-        return slice_df.fiddler_timestamp[0].floor(freq='D')
+    def estimate_calls(self, api) -> Dict[str, int]:
+        intervals = pd.interval_range(self.start_time, self.end_time, freq=self.interval_length, closed='both')
+        if self._use_local_engine(api.get_model_info(self.project_id, self.model_id)):
+            # one get_slice call per chunk of the window and one for the baseline, no matter the number of segments
+            return {'get_slice': len(self._get_chunks(intervals)) + int(self.show_baseline) + self._segment_queries(),
+                    'list_datasets': int(self.show_baseline),
+                    }
+
+        n_intervals = len(intervals)
+        calls = {'scores': n_intervals}
+        if self.segments:
+            # each segment adds a series of n_intervals requests
+            n_segments = len(self._get_segment_predicates(api, self.dataset_id, self.segments))
+            calls['get_slice'] = self._segment_queries()
+            calls['scores'] += n_intervals * n_segments
+        else:
+            n_segments = 0
 
-    def _get_end_time_time(self, api):
-        query = f""" SELECT * FROM {self.dataset_id}."{self.model_id}" """
-        query += f"""WHERE """
-        query += f"""fiddler_timestamp=(SELECT MAX(fiddler_timestamp) FROM {self.dataset_id}."{self.model_id}")"""
-        slice_df = api.get_slice(sql_query=query, project_id=self.project_id)
-        return slice_df.fiddler_timestamp[0].ceil(freq='D')
+        if self.show_baseline:
+            calls['list_datasets'] = 1
+            calls['scores'] += n_segments + 1
+        return calls
+
+    def _segment_queries(self) -> int:
+        """
+        Returns the number of get_slice calls that look up the segments.
+        """
+        if not self.segments:
+            return 0
+        if self.segments.type == SegmentType.NUMERICAL:
+            return {'equal_width': 1, 'quantile': 2, 'edges': 0}[self.segments.mode]
+        if self.segments.type == SegmentType.CATEGORICAL and self.segments.mode != 'list':
+            return 1
+        return 0
+
+    def _get_start_time_time(self, api, catalog: SchemaCatalog):
+        start_time, _ = catalog.time_range(api, self.project_id, self.model_id, self.dataset_id)
+        return start_time.floor(freq='D')
+
+    def _get_end_time_time(self, api, catalog: SchemaCatalog):
+        _, end_time = catalog.time_range(api, self.project_id, self.model_id, self.dataset_id)
+        return end_time.ceil(freq='D')
 
     def _get_segment_predicates(self, api, dataset: str, segment: Segment):
         segment_predicates = {}
         if segment.type == SegmentType.CATEGORICAL:
-            if segment.mode == 'all':
-                query = f""" SELECT DISTINCT {segment.column} FROM {dataset}."{self.model_id}" """
-                slice_df = api.get_slice(sql_query=query, project_id=self.project_id)
-                categories = sorted(slice_df[segment.column].values)
-                for cat in categories:
-                    segment_predicates[cat] = f""" {segment.column}='{cat}'"""
-
-            elif segment.mode == 'top_n':
-                try:
-                    top_n = segment.args['top_n']
-                except ValueError:
-                    print("when mode is set to 'top_n' a 'top_n' value must be passed to args.")
-                query = f"""SELECT {segment.column}, COUNT(*) AS num """
-                query += f"""FROM {dataset}."{self.model_id}" GROUP BY {segment.column} ORDER BY COUNT(*) DESC """
-                query += f"""LIMIT {top_n}"""
+            if segment.mode == 'list':
+                categories = [str(cat) for cat in segment.args['categories']]
+                has_other = segment.args.get('other', False)
+            else:
+                # all modes rank the categories by their number of rows with one aggregate query
+                limit = segment.args['top_n'] if segment.mode != 'all' else \
+                    (segment.args or {}).get('max_segments', MAX_CATEGORICAL_SEGMENTS)
+                query = f"""SELECT {segment.column}, COUNT(*) AS num FROM {dataset}."{self.model_id}" """
+                query += f"""WHERE {segment.column} IS NOT NULL """
+                query += f"""GROUP BY {segment.column} ORDER BY COUNT(*) DESC """
+                query += f"""LIMIT {limit + 1}"""
                 slice_df = api.get_slice(sql_query=query, project_id=self.project_id)
-                categories = sorted(slice_df[segment.column].values)
-                for cat in categories:
-                    segment_predicates[cat] = f""" {segment.column}='{cat}'"""
+                categories = [str(cat) for cat in slice_df[segment.column].values if not pd.isna(cat)]
+
+                has_other = len(categories) > limit and segment.mode != 'top_n'
+                if len(categories) > limit and segment.mode == 'all':
+                    warnings.warn(f'The column {segment.column} has more than {limit} categories. The least '
+                                  f'frequent categories are combined into the segment {OTHER_SEGMENT}.')
+                categories = sorted(categories[:limit])
+
+            for cat in categories:
+                segment_predicates[cat] = f""" {segment.column}={sql_string(cat)}"""
+            if has_other and categories:
+                # rows without a category belong to the other segment, since NOT IN is never true for NULL
+                segment_predicates[OTHER_SEGMENT] = f""" ({segment.column} NOT IN """ \
+                                                    f"""({', '.join(sql_string(cat) for cat in categories)}) """ \
+                                                    f"""OR {segment.column} IS NULL)"""
+
+        elif segment.type == SegmentType.NUMERICAL:
+            edges = self._get_bin_edges(api, dataset, segment)
+            for i, (label, left, right) in enumerate(zip(bin_labels(edges), edges[:-1], edges[1:])):
+                last = i == len(edges) - 2
+                segment_predicates[label] = f""" {segment.column}>={float(left)!r} AND """ \
+                                            f"""{segment.column}{'<=' if last else '<'}{float(right)!r}"""
+
+        elif segment.type == SegmentType.CUSTOM:
+            label = (segment.args or {}).get('label', segment.predicate.strip())
+            segment_predicates[label] = f' {segment.predicate.strip()}'
 
-            elif segment.mode == 'top_n_with_other':
-                pass
-            elif segment.mode == 'list':
-                pass
+        return segment_predicates
 
-        elif segments.type == SegmentType.NUMERICAL:
-            pass
-        elif segments.type == SegmentType.CUSTOM:
-            pass
+    @staticmethod
+    def _get_segment_label_expression(segment_predicates: dict) -> str:
+        """
+        Returns a SQL expression that evaluates to the segment (in segment_predicates) of a row, or NULL.
+        """
+        cases = ' '.join(f'WHEN {predicate.strip()} THEN {sql_string(segment)}'
+                         for segment, predicate in segment_predicates.items())
+        return f'CASE {cases} END'
+
+    def _get_bin_edges(self, api, dataset: str, segment: Segment) -> np.ndarray:
+        """
+        Returns the increasing bin edges of a numerical segmentation. The edges of the equal_width and quantile modes
+        are computed from aggregate queries, so the column itself is never fetched.
+        """
+        if segment.mode == 'edges':
+            return np.unique(np.asarray(segment.args['edges'], dtype=float))
+
+        n_bins = (segment.args or {}).get('n_bins', DEFAULT_N_BINS)
+        query = f""" SELECT MIN({segment.column}) AS min_value, MAX({segment.column}) AS max_value """
+        query += f"""FROM {dataset}."{self.model_id}" """
+        slice_df = api.get_slice(sql_query=query, project_id=self.project_id)
+        min_value, max_value = slice_df['min_value'][0], slice_df['max_value'][0]
+        if pd.isna(min_value) or pd.isna(max_value):
+            return np.array([])
+
+        min_value, max_value = float(min_value), float(max_value)
+        if min_value == max_value:
+            return np.array([min_value, max_value])
+
+        if segment.mode == 'equal_width':
+            return np.linspace(min_value, max_value, n_bins + 1)
+
+        # the quantiles are interpolated from a fine histogram of the column that is computed by the backend
+        bin_width = (max_value - min_value) / HISTOGRAM_BINS
+        bin_expression = f"""FLOOR(({segment.column} - {min_value!r}) / {bin_width!r})"""
+        query = f""" SELECT {bin_expression} AS bin, COUNT(*) AS num FROM {dataset}."{self.model_id}" """
+        query += f"""WHERE {segment.column} IS NOT NULL GROUP BY {bin_expression}"""
+        slice_df = api.get_slice(sql_query=query, project_id=self.project_id)
 
-        return segment_predicates
+        # the maximum falls into the bin after the last one
+        bins = np.clip(slice_df['bin'].to_numpy(dtype=float).astype(int), 0, HISTOGRAM_BINS - 1)
+        counts = np.bincount(bins, weights=slice_df['num'].to_numpy(dtype=float), minlength=HISTOGRAM_BINS)
+        quantiles = histogram_quantiles(counts, min_value, bin_width, np.linspace(0, 1, n_bins + 1)[1:-1])
+        return np.unique(np.concatenate([[min_value], quantiles, [max_value]]))
 
-    def _get_sql_query(self, dataset: str, time_interval: Optional[pd.Interval] = None, segment_predicate: Optional[str] = None):
-        sql_query = f""" SELECT * FROM {dataset}."{self.model_id}" """
+    def _get_sql_query(self, dataset: str, time_interval: Optional[pd.Interval] = None, segment_predicate: Optional[str] = None,
+                       columns: str = '*'):
+        sql_query = f""" SELECT {columns} FROM {dataset}."{self.model_id}" """
 
         if time_interval:
             sql_query += f"""WHERE (fiddler_timestamp BETWEEN '{time_interval.left + pd.Timedelta('0s')}' """ \
@@ -267,7 +554,7 @@ class PerformanceTimeSeries(BaseAnalysis):
 
         return sql_query
 
-    def _get_segment_score(self,
+    def _get_score_request(self,
                            api,
                            dataset: str,
                            time_interval: Optional[pd.Interval] = None,
@@ -282,55 +569,270 @@ class PerformanceTimeSeries(BaseAnalysis):
                                    "source_type": "SQL_SLICE_QUERY",
                                    },
                    }
+        return request
 
-        try:
-            response = FrontEndCall(api, endpoint='scores').post(request)
-        except Exception as e:
-            print(e)
-            print(f'The sql query was: {sql_query}')
-            response = None
-
+    def _get_scores(self, response, request, metrics: List[str]) -> Dict[str, float]:
         if response['kind'] == "NORMAL":
-            return response
+            return {metric: response['data'][metric] for metric in metrics}
         else:
-            return None
-
-    def run(self, api) -> List[BaseOutput]:
-        intervals = pd.interval_range(self.start_time, self.end_time, freq=self.interval_length, closed='both')
-        segment_predicates = self._get_segment_predicates(api, self.dataset_id, self.segments) if self.segments else {}
-
-        scores = defaultdict(list)
+            warnings.warn(f"The scores request failed: {response.get('error')}. "
+                          f"The sql query was: {request['data_source']['query'].strip()}")
+            return {metric: np.nan for metric in metrics}
+
+    @property
+    def metrics(self) -> List[str]:
+        return [self.metric] + self.additional_metrics
+
+    def _use_local_engine(self, model_info) -> bool:
+        if self.engine != 'local':
+            return False
+
+        for metric in self.metrics:
+            if not supports(model_info.model_task, metric):
+                warnings.warn(f'The local engine does not support the metric {metric} for '
+                              f'{model_info.model_task.value} models. The scores endpoint is used instead.')
+                return False
+        return True
+
+    def _get_chunks(self, intervals) -> List[pd.Interval]:
+        """
+        Groups consecutive intervals into time windows that span at most chunk_length (and at least one interval).
+        Gaps between intervals (e.g. intervals that are already in the score store) are not fetched.
+        """
+        max_span = pd.Timedelta(self.chunk_length)
+        chunks = []
+        left = right = None
         for interval in intervals:
-            segment_scores = self._get_segment_score(api, self.dataset_id, interval)
-            score = segment_scores['data'][self.metric] if segment_scores else np.NaN
-            scores[self.dataset_id + '_all'].append(score)
+            if left is None:
+                left = interval.left
+            elif interval.left != right or interval.right - left > max_span:
+                chunks.append(pd.Interval(left, right, closed='both'))
+                left = interval.left
+            right = interval.right
+
+        if left is not None:
+            chunks.append(pd.Interval(left, right, closed='both'))
+        return chunks
+
+    def _fetch_columns(self, api, dataset: str, columns: List[str], chunks: Optional[List[pd.Interval]] = None):
+        # an empty list of chunks fetches nothing, None fetches the whole dataset
+        queries = [self._get_sql_query(dataset, chunk, columns=', '.join(columns)) for chunk in chunks] \
+            if chunks is not None else [self._get_sql_query(dataset, columns=', '.join(columns))]
+        slices = run_concurrently([functools.partial(api.get_slice, sql_query=query, project_id=self.project_id)
+                                   for query in queries],
+                                  max_workers=self.max_workers or concurrency_controller.limit('get_slice'))
+        return pd.concat(slices, ignore_index=True) if slices else \
+            pd.DataFrame(columns=[column.split(' AS ')[-1] for column in columns])
+
+    @staticmethod
+    def _get_interval_codes(df, intervals) -> np.ndarray:
+        """
+        Returns the index of the interval of every row, or -1, with the same bounds as the queries of the scores engine
+        (from the left end of an interval to one second before its right end).
+        """
+        timestamps = pd.to_datetime(df['fiddler_timestamp'])
+        if timestamps.dt.tz is not None:
+            timestamps = timestamps.dt.tz_convert(None)
+        timestamps = timestamps.to_numpy()
+
+        lefts = intervals.left.to_numpy()
+        last_seconds = (intervals.right - pd.Timedelta('1s')).to_numpy()
+        codes = np.searchsorted(lefts, timestamps, side='right') - 1
+        inside = (codes >= 0) & (timestamps <= last_seconds[np.clip(codes, 0, None)])
+        return np.where(inside, codes, -1)
+
+    @staticmethod
+    def _get_segment_codes(df, segment_predicates: dict) -> np.ndarray:
+        """
+        Returns the index of the segment (in segment_predicates) of every row, or -1, from the segment label column
+        (see _get_segment_label_expression).
+        """
+        return pd.Categorical(df[SEGMENT_LABEL_COLUMN], categories=list(segment_predicates)).codes.astype(int)
+
+    def _get_local_metric(self, model_info, df, codes: np.ndarray, n_cells: int, metric: str) -> np.ndarray:
+        target = df[model_info.targets[0].name]
+        output = df[model_info.outputs[0].name].to_numpy(dtype=float)
+        # like the scores endpoint, rows without a target are not scored
+        codes = np.where(target.isna().to_numpy(), -1, codes)
+
+        if model_info.model_task == fdl.ModelTask.BINARY_CLASSIFICATION:
+            target_class_order = getattr(model_info, 'target_class_order', None)
+            positive_class = target_class_order[1] if target_class_order is not None else 1
+            y_true = positive_class_rows(target, positive_class)
+        else:
+            y_true = target.to_numpy(dtype=float)
+
+        threshold = getattr(model_info, 'binary_classification_threshold', None)
+        return cell_metric(model_info.model_task, metric, codes, n_cells, y_true, output,
+                           threshold=threshold if threshold is not None else DEFAULT_BINARY_THRESHOLD)
+
+    def _local_scores(self, api, model_info, intervals, segment_predicates: dict, metrics: List[str]):
+        """
+        Computes the metrics of every (series, interval) cell and of the baseline from the rows of the dataset.
+        """
+        columns = [model_info.targets[0].name, model_info.outputs[0].name]
+        if segment_predicates:
+            # the backend labels the rows with their segment, so the segment column itself is not fetched
+            columns.append(f'{self._get_segment_label_expression(segment_predicates)} AS {SEGMENT_LABEL_COLUMN}')
+
+        scores = {metric: {} for metric in metrics}
+        n_intervals = len(intervals)
+        if n_intervals:
+            df = self._fetch_columns(api, self.dataset_id, ['fiddler_timestamp'] + columns, self._get_chunks(intervals))
+            interval_codes = self._get_interval_codes(df, intervals)
+            if segment_predicates:
+                # one cell per (segment, interval)
+                segment_codes = self._get_segment_codes(df, segment_predicates)
+                codes = np.where((interval_codes >= 0) & (segment_codes >= 0),
+                                 segment_codes * n_intervals + interval_codes,
+                                 -1)
+
+            for metric in metrics:
+                scores[metric][self.dataset_id + '_all'] = \
+                    list(self._get_local_metric(model_info, df, interval_codes, n_intervals, metric))
+                if segment_predicates:
+                    values = self._get_local_metric(model_info, df, codes, len(segment_predicates) * n_intervals,
+                                                    metric)
+                    for segment, segment_values in zip(segment_predicates, values.reshape(-1, n_intervals)):
+                        scores[metric][self.dataset_id + '_' + segment] = list(segment_values)
+
+        baseline_scores = {metric: {} for metric in metrics}
+        if self.show_baseline:
+            dataset_id = api.list_datasets(self.project_id)[0]
+            baseline_df = self._fetch_columns(api, dataset_id, columns)
+
+            all_codes = np.zeros(len(baseline_df), dtype=int)
+            if segment_predicates:
+                segment_codes = self._get_segment_codes(baseline_df, segment_predicates)
+
+            for metric in metrics:
+                baseline_scores[metric]['baseline' + '_all'] = \
+                    self._get_local_metric(model_info, baseline_df, all_codes, 1, metric)[0]
+                if segment_predicates:
+                    values = self._get_local_metric(model_info, baseline_df, segment_codes, len(segment_predicates),
+                                                    metric)
+                    for segment, value in zip(segment_predicates, values):
+                        baseline_scores[metric]['baseline' + '_' + segment] = value
+
+        return scores, baseline_scores
+
+    def _endpoint_scores(self, api, intervals, segment_predicates: dict, metrics: List[str]):
+        """
+        Requests the scores of every (series, interval) cell and of the baseline from the scores endpoint. Every
+        response contains all metrics, so each cell is requested once for all metrics.
+        """
+        # all (series, interval) and baseline requests are independent and submitted as a single batch
+        series_requests = []
+        series_cache_ttls = []
+        now = pd.Timestamp.now(tz='UTC').tz_localize(None)
+        for interval in intervals:
+            # scores of production intervals that are already closed never change, the scores of the interval that
+            # is still open change while events arrive
+            if interval.right > now:
+                cache_ttl = NO_CACHE
+            else:
+                cache_ttl = CACHE_FOREVER if self.dataset_id == 'production' else None
+
+            series_requests.append((self.dataset_id + '_all',
+                                    self._get_score_request(api, self.dataset_id, interval)))
+            series_cache_ttls.append(cache_ttl)
 
             for segment in segment_predicates:
-                segment_scores = self._get_segment_score(api, self.dataset_id, interval, segment_predicates[segment])
-                score = segment_scores['data'][self.metric] if segment_scores else np.NaN
-                scores[self.dataset_id + '_' + segment].append(score)
+                series_requests.append((self.dataset_id + '_' + segment,
+                                        self._get_score_request(api, self.dataset_id, interval,
+                                                                segment_predicates[segment])))
+                series_cache_ttls.append(cache_ttl)
 
-        baseline_scores = {}
+        baseline_requests = []
         if self.show_baseline:
             datasets = api.list_datasets(self.project_id)
             dataset_id = datasets[0]
 
-            segment_scores = self._get_segment_score(api, dataset_id)
-            baseline_scores['baseline' + '_all'] = segment_scores['data'][self.metric] if segment_scores else np.NaN
+            baseline_requests.append(('baseline' + '_all', self._get_score_request(api, dataset_id)))
 
             for segment in segment_predicates:
-                segment_scores = self._get_segment_score(api, dataset_id, segment_predicate=segment_predicates[segment])
-                baseline_scores['baseline' + '_' + segment] = segment_scores['data'][self.metric] if segment_scores else np.NaN
+                baseline_requests.append(('baseline' + '_' + segment,
+                                          self._get_score_request(api, dataset_id,
+                                                                  segment_predicate=segment_predicates[segment])))
+
+        all_requests = [request for _, request in series_requests + baseline_requests]
+        cache_ttls = series_cache_ttls + [None] * len(baseline_requests)
+        responses = AsyncFrontEndCall(api, endpoint='scores', max_concurrency=self.max_workers).post_batch(
+            all_requests, cache_ttl=cache_ttls)
+
+        scores = {metric: defaultdict(list) for metric in metrics}
+        for (series, request), response in zip(series_requests, responses):
+            for metric, score in self._get_scores(response, request, metrics).items():
+                scores[metric][series].append(score)
+
+        baseline_scores = {metric: {} for metric in metrics}
+        for (series, request), response in zip(baseline_requests, responses[len(series_requests):]):
+            for metric, score in self._get_scores(response, request, metrics).items():
+                baseline_scores[metric][series] = score
+
+        return scores, baseline_scores
+
+    def _store_series(self, metric: str, segment_predicate: Optional[str]) -> tuple:
+        # the predicate identifies a segment regardless of how it was selected (e.g. by top_n or all)
+        segment = segment_predicate.strip() if segment_predicate else 'all'
+        return self.project_id, self.model_id, self.dataset_id, metric, segment, str(self.interval_length)
+
+    def _compute_scores(self, api, model_info, intervals, segment_predicates: dict):
+        """
+        Returns the scores of every series and the baseline scores, both by metric.
+        """
+        if self._use_local_engine(model_info):
+            return self._local_scores(api, model_info, intervals, segment_predicates, self.metrics)
+        return self._endpoint_scores(api, intervals, segment_predicates, self.metrics)
+
+    def _incremental_scores(self, api, store, model_info, intervals, segment_predicates: dict):
+        """
+        Takes the scores of the intervals in the score store from the store and only computes the scores of the
+        other intervals: new intervals and the ones that are still open. The baseline is always computed.
+        """
+        series_predicates = {self.dataset_id + '_all': None}
+        for segment in segment_predicates:
+            series_predicates[self.dataset_id + '_' + segment] = segment_predicates[segment]
+        series = {(metric, name): self._store_series(metric, predicate)
+                  for metric in self.metrics for name, predicate in series_predicates.items()}
+        stored = {name: store.get(key) for name, key in series.items()}
+
+        # an interval is fetched for all series and metrics if one of them is missing it
+        starts = [str(interval.left) for interval in intervals]
+        missing = [i for i, start in enumerate(starts) if not all(start in stored[name] for name in series)]
+        computed, baseline_scores = self._compute_scores(api, model_info, intervals[missing], segment_predicates)
+
+        now = pd.Timestamp.now(tz='UTC').tz_localize(None)
+        final = [i for i in missing if store.is_final(intervals[i], now)]
+        positions = {i: position for position, i in enumerate(missing)}
+        scores = {metric: {} for metric in self.metrics}
+        for (metric, name), key in series.items():
+            values = computed[metric].get(name, [])
+            store.put(key, {starts[i]: values[positions[i]] for i in final})
+            scores[metric][name] = [values[positions[i]] if i in positions else stored[(metric, name)][start]
+                                    for i, start in enumerate(starts)]
+        return scores, baseline_scores
+
+    def run(self, api) -> List[BaseOutput]:
+        intervals = pd.interval_range(self.start_time, self.end_time, freq=self.interval_length, closed='both')
+        segment_predicates = self._get_segment_predicates(api, self.dataset_id, self.segments) if self.segments else {}
+
+        model_info = api.get_model_info(self.project_id, self.model_id)
+        store = active_score_store.get() if cache_enabled.get() else None
+        if store is not None:
+            scores, baseline_scores = self._incremental_scores(api, store, model_info, intervals, segment_predicates)
+        else:
+            scores, baseline_scores = self._compute_scores(api, model_info, intervals, segment_predicates)
 
         xticks = [interval.left if 'H' in self.interval_length else interval.left.strftime("%d-%m-%Y")
                   for interval in intervals]
 
-        output_modules = [LinePlot(scores,
+        output_modules = [LinePlot(scores[metric],
                                    xlabel='Time Interval',
-                                   ylabel=self.metric,
+                                   ylabel=metric,
                                    xticks=xticks,
                                    xtick_freq=np.ceil(len(xticks)/10),
-                                   benchmarks=baseline_scores
+                                   benchmarks=baseline_scores[metric]
                                    )
-                          ]
+                          for metric in self.metrics]
         return output_modules
@@ -1,14 +1,44 @@
+import contextlib
+import cProfile
+import functools
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+import traceback
 import warnings
-from typing import List, Type, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Type, Optional, Iterator
 
 import fiddler as fdl
 from tqdm import tqdm
 
 from .analysis_modules import BaseAnalysis
+from .analysis_modules import ConnectionConfig
 from .analysis_modules import MetaData
+from .analysis_modules import ResponseCache
+from .analysis_modules.api_proxy import MemoizedFiddlerApi
+from .analysis_modules.checkpoint import DEFAULT_RUN_DIR, RunCheckpoint, active_checkpoint, run_checkpointed
+from .analysis_modules.connection_helpers import Connection, active_connection, reset_connections
+from .analysis_modules.concurrency import concurrency_controller, module_max_workers, run_concurrently
+from .analysis_modules.connection_helpers import RequestCoalescer, active_coalescer
+from .analysis_modules.deadline import Deadline, DeadlineExceeded, active_deadline, collect_outputs, deadline_scope
+from .analysis_modules.estimator import CostEstimator, recorded_latencies
+from .analysis_modules.instrumentation import IOStats, active_io_stats, module_scope
+from .analysis_modules.output_cache import ModuleOutputCache, metadata_snapshot
+from .analysis_modules.planner import DataPlanner
+from .analysis_modules.response_cache import cache_enabled, fingerprint
+from .analysis_modules.schema_catalog import SchemaCatalog, active_schema_catalog
+from .analysis_modules.score_store import IntervalScoreStore, active_score_store
 from .output_modules import BaseOutput
+from .output_modules import DescriptiveTextBlock, SimpleTextBlock, SimpleTextStyle, Table, AddBreak, AddPageBreak
 from .output_modules import OutputTypes
 from .output_modules import generate_output
+from .output_modules.generate_output import FIDDLER_DEFAULT_REPORT_NAME
+from .output_modules.profiling import Profiler, active_profiler, profiled, profiled_iter
+from .output_modules.tmp_file import active_scratch_dir
 
 
 class FiddlerReportGenerator:
@@ -24,8 +54,23 @@ class FiddlerReportGenerator:
                  org_id: Optional[str] = None,
                  auth_token: Optional[str] = None,
                  author: Optional[str] = None,
+                 connection_config: Optional[ConnectionConfig] = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 module_cache: Optional[ModuleOutputCache] = None,
+                 score_store: Optional[IntervalScoreStore] = None,
                  ):
+        """
+        :param module_cache: If specified, the outputs of the analysis modules are stored in this cache and modules
+                             whose fingerprint has not changed since a previous report are restored from it instead
+                             of being run again.
+        :param score_store: If specified, the scores of closed intervals of PerformanceTimeSeries modules are stored
+                            in this store and later reports only compute the scores of new and still open intervals.
+        """
         self.author = author
+        self.connection_config = connection_config
+        self.response_cache = response_cache
+        self.module_cache = module_cache
+        self.score_store = score_store
 
         if fiddler_api:
             if 'add_model' in dir(fiddler_api):
@@ -49,35 +94,501 @@ class FiddlerReportGenerator:
                 raise ValueError('All connection information (url, org_id, auth_token) or '
                                  'a Fiddler client object is required to initiate report generator.')
 
-    def _run_analyses(self,
-                      analysis_modules: List[BaseAnalysis],
-                      project_id,
-                      ) -> List[Type[BaseOutput]]:
-        for analysis_module in analysis_modules:
-            analysis_module.preflight(self.fiddler_api, project_id)
+        # read-only metadata calls are memoized for the duration of each report
+        if not isinstance(self.fiddler_api, MemoizedFiddlerApi):
+            self.fiddler_api = MemoizedFiddlerApi(self.fiddler_api)
+        self.metadata_cache_stats = {}
+        self.io_summary = {}
+        self.fetch_plan = {}
+        self.cached_modules = []
+        self.resumed_modules = []
+        self.truncated_modules = []
+        self.dry_run_estimate = {}
+        # metadata snapshot seeded into the memoized proxy at the start of each report (see warm_up)
+        self.warm_metadata = {}
+        # the connection settings and the response cache only apply to the reports of this generator
+        self.connection = Connection(connection_config, cache=response_cache)
 
-        output_modules = []
-        pbar = tqdm(total=len(analysis_modules), desc='Running analysis modules')
-        for analysis_module in analysis_modules:
-            output_modules = output_modules + analysis_module.run(self.fiddler_api)
+    def clear_cache(self):
+        """
+        Removes all entries from the response cache, the module output cache and the score store of the report
+        generator.
+        """
+        if self.response_cache:
+            self.response_cache.clear()
+
+        if self.module_cache:
+            self.module_cache.clear()
+
+        if self.score_store:
+            self.score_store.clear()
+
+    def _preflight(self, analysis_modules: List[BaseAnalysis], project_id):
+        def preflight(analysis_module):
+            name = type(analysis_module).__name__
+            with module_scope(name), profiled('preflight', name):
+                analysis_module.preflight(self.fiddler_api, project_id)
+
+        with active_io_stats.get().phase('preflight'):
+            run_concurrently([functools.partial(preflight, analysis_module) for analysis_module in analysis_modules])
+
+    def _prepare_analyses(self,
+                          analysis_modules: List[BaseAnalysis],
+                          project_id,
+                          plan_fetches: bool = False,
+                          use_cache: bool = True,
+                          ) -> list:
+        """
+        Runs the preflights, looks the modules up in the module output cache and fetches the data of the modules that
+        have to be run. Returns a (module, cache key, checkpoint key, cached outputs) tuple for each module.
+        """
+        io_stats = active_io_stats.get()
+        try:
+            self._preflight(analysis_modules, project_id)
+        except DeadlineExceeded as e:
+            # none of the modules can run once the report deadline has passed
+            return [(analysis_module, None, None, [self._truncation_note(analysis_module, e)])
+                    for analysis_module in analysis_modules]
+
+        checkpoint = active_checkpoint.get()
+        jobs = []
+        for index, analysis_module in enumerate(analysis_modules):
+            use_module_cache = self.module_cache is not None and use_cache
+            key = self.module_cache.fingerprint(analysis_module, self.fiddler_api) if use_module_cache else None
+            cached_outputs = self.module_cache.load(key) if key else None
+            # the key is taken once, before the modules are planned, since planning may change the parameters
+            checkpoint_key = _checkpoint_key(index, analysis_module)
+            if cached_outputs is not None:
+                self.cached_modules.append(type(analysis_module).__name__)
+            elif checkpoint is not None:
+                cached_outputs = checkpoint.load(checkpoint_key)
+                if cached_outputs is not None:
+                    self.resumed_modules.append(type(analysis_module).__name__)
+            jobs.append((analysis_module, key, checkpoint_key, cached_outputs))
+
+        # the data declared by all modules is fetched once, in parallel, before any module runs
+        if plan_fetches:
+            planner = DataPlanner(self.fiddler_api)
+            try:
+                with io_stats.phase('plan'):
+                    for analysis_module, _, checkpoint_key, cached_outputs in jobs:
+                        if cached_outputs is not None:
+                            continue
+                        # submodules completed by a previous attempt of the run are not planned either
+                        with checkpoint.scope(checkpoint_key) if checkpoint else contextlib.nullcontext():
+                            planner.plan([analysis_module])
+                    self.fetch_plan = planner.execute()
+            except DeadlineExceeded as e:
+                # the modules fetch their data themselves, and are truncated by the deadline when they run
+                warnings.warn(f'Fetch planning was cancelled: {e}')
+
+        return jobs
+
+    def _store_outputs(self, key, output_modules):
+        with self.module_cache.writer(key) as writer:
+            for output_module in output_modules:
+                writer.write(output_module)
+
+    def _truncation_note(self, analysis_module, error: DeadlineExceeded) -> DescriptiveTextBlock:
+        name = type(analysis_module).__name__
+        self.truncated_modules.append(name)
+        warnings.warn(f'The {name} module was cancelled: {error}')
+        return DescriptiveTextBlock(f'This {name} section is incomplete. It was cancelled because the '
+                                    f'{error.deadline.name} time budget of {error.deadline.seconds:g} seconds '
+                                    f'was exceeded.')
+
+    @staticmethod
+    def _profile_appendix() -> Iterator[BaseOutput]:
+        """
+        Yields the profiling table of the report. It is a generator so that the table is only built once all outputs
+        before it have been rendered.
+        """
+        profiler = active_profiler.get()
+        if profiler is None:
+            return
+
+        yield AddPageBreak()
+        yield SimpleTextBlock(text='Performance Profile', style=SimpleTextStyle(font_style='bold', size=18))
+        yield AddBreak(1)
+        yield DescriptiveTextBlock('Wall-clock time spent in each step of the report generation, longest first. '
+                                   'Steps are nested: the run time of a module includes the figures it creates and '
+                                   'the render_docx time of a line plot includes the creation of its figure.')
+        yield AddBreak(1)
+        yield Table(header=['Step', 'Name', 'Calls', 'Total (s)', 'Mean (s)', 'Max (s)'],
+                    records=profiler.records())
+
+    def _run_analyses(self, jobs: list, module_timeout: Optional[float] = None) -> List[Type[BaseOutput]]:
+        io_stats = active_io_stats.get()
+        pbar = tqdm(total=len(jobs), desc='Running analysis modules')
+
+        def run(job):
+            analysis_module, key, checkpoint_key, module_outputs = job
+            if module_outputs is None:
+                try:
+                    name = type(analysis_module).__name__
+                    with module_scope(name), deadline_scope(module_timeout), profiled('run', name):
+                        module_outputs = run_checkpointed(checkpoint_key,
+                                                          collect_outputs,
+                                                          analysis_module,
+                                                          self.fiddler_api)
+                except DeadlineExceeded as e:
+                    # truncated outputs are neither cached nor checkpointed
+                    module_outputs = e.partial_outputs + [self._truncation_note(analysis_module, e)]
+                else:
+                    if key:
+                        self._store_outputs(key, module_outputs)
             pbar.update()
+            return module_outputs
+
+        # modules may finish in any order, their outputs are assembled in the order they were declared
+        with io_stats.phase('run'):
+            results = run_concurrently([functools.partial(run, job) for job in jobs])
+
+        output_modules = []
+        for module_outputs in results:
+            output_modules.extend(module_outputs)
 
         return output_modules
 
+    def _iter_analyses(self, jobs: list, module_timeout: Optional[float] = None) -> Iterator[BaseOutput]:
+        checkpoint = active_checkpoint.get()
+        pbar = tqdm(total=len(jobs), desc='Running analysis modules')
+        for analysis_module, key, checkpoint_key, cached_outputs in jobs:
+            if cached_outputs is not None:
+                yield from cached_outputs
+            else:
+                # outputs are written to the caches before they are rendered, since rendering deletes their images
+                try:
+                    with contextlib.ExitStack() as stack:
+                        stack.enter_context(module_scope(type(analysis_module).__name__))
+                        stack.enter_context(deadline_scope(module_timeout))
+                        writers = [stack.enter_context(self.module_cache.writer(key))] if key else []
+                        if checkpoint is not None:
+                            stack.enter_context(checkpoint.scope(checkpoint_key))
+                            writers.append(stack.enter_context(checkpoint.writer(checkpoint_key)))
+
+                        name = type(analysis_module).__name__
+                        for output_module in profiled_iter(analysis_module.iter_run(self.fiddler_api), 'run', name):
+                            for writer in writers:
+                                writer.write(output_module)
+                            yield output_module
+                except DeadlineExceeded as e:
+                    # the outputs yielded so far are already rendered; the writers discard them
+                    yield self._truncation_note(analysis_module, e)
+            pbar.update()
+
     def generate_report(self,
                         project_id: Optional[str] = None,
                         analysis_modules: List[BaseAnalysis] = [],
                         output_type: OutputTypes = OutputTypes.DOCX,
                         output_path=None,
-                        template=None
-                        ):
+                        template=None,
+                        use_cache: bool = True,
+                        io_summary_path: Optional[str] = None,
+                        max_workers: int = 1,
+                        plan_fetches: bool = False,
+                        streaming: bool = False,
+                        scratch_dir: Optional[str] = None,
+                        run_id: Optional[str] = None,
+                        run_dir: str = DEFAULT_RUN_DIR,
+                        module_timeout: Optional[float] = None,
+                        report_timeout: Optional[float] = None,
+                        profile: bool = False,
+                        dry_run: bool = False,
+                        latencies: Optional[dict] = None,
+                        ) -> dict:
+        """
+        :param use_cache: If False the response cache, the module output cache and the score store are bypassed: all
+                          responses are fetched from the backend and all modules are run.
+        :param io_summary_path: If specified, the I/O summary of the report is also written to this JSON file.
+        :param max_workers: Number of analysis modules (and ProjectSummary submodules) that are run at the same time.
+                            With the default of 1 the modules are run one after another.
+        :param plan_fetches: If True the data requirements of all modules are merged after the preflights and each
+                             unique item is fetched once before the modules are run (see DataPlanner). The number of
+                             declared, unique and failed fetches is stored in the fetch_plan attribute.
+        :param streaming: If True the outputs of the analysis modules are rendered into the document as soon as
+                          they are yielded (see BaseAnalysis.iter_run) instead of being collected first, so figures
+                          are written and deleted one at a time. Top-level modules are then run one after another;
+                          max_workers still applies to the ProjectSummary submodules, whose outputs are only streamed
+                          if they are run one after another as well.
+        :param scratch_dir: Directory of the intermediate files of the report (figures and the docx of a PDF report).
+                            Defaults to the tmp directory of the working directory.
+        :param run_id: If specified, the outputs of every completed module and ProjectSummary submodule are
+                       checkpointed (images included) in the run_dir/run_id directory. If the report fails, calling
+                       generate_report again with the same run_id and analysis modules restores the completed modules
+                       and resumes with the one that failed. The checkpoints are removed once the report is written.
+        :param run_dir: Directory of the checkpoints of all runs.
+        :param module_timeout: Wall-clock time budget of each analysis module in seconds. A module that exceeds it is
+                               cancelled at its next backend call; the outputs it created so far are kept and followed
+                               by a note that the section was truncated. Stalled calls are abandoned at the deadline.
+        :param report_timeout: Wall-clock time budget of the whole report in seconds. Once it is exceeded, running
+                               modules are cancelled as above and the remaining modules only get the truncation note.
+                               Rendering the document is not subject to the budget.
+        :param profile: If True the preflight and run of every module, the render_docx call of every output, the
+                        creation of every figure and the saving of the document are timed. The timings are appended to
+                        the report as a table and returned under the profile key of the I/O summary (the table cannot
+                        include the final document.save). A cProfile dump of the calling thread is written next to the
+                        report with the .prof extension, except in dry runs; it can be inspected with pstats or
+                        snakeviz.
+        :param dry_run: If True only the preflights are run and no report is written. The expected number of scores,
+                        explain, get_slice and other backend calls and the expected wall time of every module are
+                        returned instead of the I/O summary (see CostEstimator), and a warning is issued for plans
+                        with more than LARGE_PLAN_CALLS data calls. Counting the segments of a time series takes one
+                        get_slice call. Caches are not taken into account.
+        :param latencies: Mean latency in seconds by endpoint or client method used by the dry run, e.g. the result
+                          of recorded_latencies. If None the latencies recorded by the previous report of this
+                          generator are used, with defaults for endpoints it did not call.
+        :return: I/O summary of the report: call counts, latency percentiles, payload sizes and errors of the backend
+                 calls by endpoint and by analysis module, duration of the report phases, and cache statistics.
+        """
+        # every response has to reach a recording client (see reportgen.replay)
+        use_cache = use_cache and not getattr(self.fiddler_api, 'bypass_caches', False)
+        scratch_token = active_scratch_dir.set(scratch_dir) if scratch_dir else None
+        checkpoint = RunCheckpoint(os.path.join(run_dir, run_id)) if run_id else None
+        checkpoint_token = active_checkpoint.set(checkpoint)
+        profiler_token = active_profiler.set(Profiler() if profile else None)
+        # a dry run writes no files
+        c_profile = cProfile.Profile() if profile and not dry_run else None
+        if c_profile is not None:
+            c_profile.enable()
+        try:
+            io_summary = self._generate_report(project_id=project_id,
+                                               analysis_modules=analysis_modules,
+                                               output_type=output_type,
+                                               output_path=output_path,
+                                               template=template,
+                                               use_cache=use_cache,
+                                               io_summary_path=io_summary_path,
+                                               max_workers=max_workers,
+                                               plan_fetches=plan_fetches,
+                                               streaming=streaming,
+                                               module_timeout=module_timeout,
+                                               report_timeout=report_timeout,
+                                               dry_run=dry_run,
+                                               latencies=latencies,
+                                               )
+        finally:
+            if c_profile is not None:
+                c_profile.disable()
+                c_profile.dump_stats((output_path if output_path else FIDDLER_DEFAULT_REPORT_NAME) + '.prof')
+            active_profiler.reset(profiler_token)
+            active_checkpoint.reset(checkpoint_token)
+            if scratch_token is not None:
+                active_scratch_dir.reset(scratch_token)
 
-        output_modules = []
-        output_modules += MetaData(author=self.author).run(self.fiddler_api)
-        output_modules += self._run_analyses(analysis_modules, project_id)
-
-        generate_output(output_type=output_type,
-                        output_modules=output_modules,
-                        output_path=output_path,
-                        template=template,
-                        )
+        if checkpoint is not None and not dry_run:
+            shutil.rmtree(checkpoint.directory, ignore_errors=True)
+        return io_summary
+
+    def _generate_report(self,
+                         project_id,
+                         analysis_modules,
+                         output_type,
+                         output_path,
+                         template,
+                         use_cache,
+                         io_summary_path,
+                         max_workers,
+                         plan_fetches,
+                         streaming,
+                         module_timeout,
+                         report_timeout,
+                         dry_run,
+                         latencies,
+                         ) -> dict:
+        self.fiddler_api.invalidate()
+        if self.warm_metadata:
+            self.fiddler_api.seed(self.warm_metadata)
+        self.fetch_plan = {}
+        self.cached_modules = []
+        self.resumed_modules = []
+        self.truncated_modules = []
+        io_stats = IOStats()
+        coalescer = RequestCoalescer()
+        stats_token = active_io_stats.set(io_stats)
+        cache_token = cache_enabled.set(use_cache)
+        store_token = active_score_store.set(self.score_store)
+        catalog_token = active_schema_catalog.set(SchemaCatalog())
+        coalescer_token = active_coalescer.set(coalescer)
+        connection_token = active_connection.set(self.connection)
+        workers_token = module_max_workers.set(max_workers)
+        deadline_token = active_deadline.set(Deadline(report_timeout, 'report') if report_timeout else None)
+        try:
+            if dry_run:
+                self._preflight(analysis_modules, project_id)
+                latencies = latencies if latencies is not None else recorded_latencies(self.io_summary)
+                self.dry_run_estimate = CostEstimator(self.fiddler_api, latencies).estimate(analysis_modules)
+                return self.dry_run_estimate
+
+            with io_stats.phase('run'), module_scope('MetaData'):
+                output_modules = MetaData(author=self.author).run(self.fiddler_api)
+            jobs = self._prepare_analyses(analysis_modules, project_id, plan_fetches, use_cache)
+
+            if streaming:
+                # the modules run while the document is rendered, so the report settings have to stay active
+                with io_stats.phase('run_and_render'):
+                    generate_output(output_type=output_type,
+                                    output_modules=itertools.chain(output_modules,
+                                                                   self._iter_analyses(jobs, module_timeout),
+                                                                   self._profile_appendix()),
+                                    output_path=output_path,
+                                    template=template,
+                                    )
+            else:
+                output_modules.extend(self._run_analyses(jobs, module_timeout))
+        finally:
+            active_deadline.reset(deadline_token)
+            module_max_workers.reset(workers_token)
+            active_connection.reset(connection_token)
+            active_coalescer.reset(coalescer_token)
+            active_schema_catalog.reset(catalog_token)
+            active_score_store.reset(store_token)
+            cache_enabled.reset(cache_token)
+            active_io_stats.reset(stats_token)
+            self.metadata_cache_stats = self.fiddler_api.cache_stats()
+
+        if not streaming:
+            with io_stats.phase('render'):
+                generate_output(output_type=output_type,
+                                output_modules=itertools.chain(output_modules, self._profile_appendix()),
+                                output_path=output_path,
+                                template=template,
+                                )
+
+        self.io_summary = io_stats.summary()
+        self.io_summary['coalesced_requests'] = coalescer.coalesced
+        self.io_summary['metadata_cache'] = self.metadata_cache_stats
+        self.io_summary['concurrency'] = concurrency_controller.snapshot()
+        self.io_summary['fetch_plan'] = self.fetch_plan
+        self.io_summary['cached_modules'] = self.cached_modules
+        self.io_summary['resumed_modules'] = self.resumed_modules
+        self.io_summary['truncated_modules'] = self.truncated_modules
+        if active_profiler.get() is not None:
+            self.io_summary['profile'] = active_profiler.get().summary()
+
+        if io_summary_path:
+            with open(io_summary_path, 'w') as f:
+                json.dump(self.io_summary, f, indent=2)
+        return self.io_summary
+
+    def warm_up(self, project_ids: List[str]) -> dict:
+        """
+        Fetches the metadata (models, datasets, model info and dataset info) of the given projects and keeps it in
+        the warm_metadata attribute, so that subsequent reports (and the workers of generate_reports) get it without
+        a round trip. Projects whose metadata cannot be fetched are skipped.
+        """
+        self.fiddler_api.invalidate()
+        for project_id in project_ids:
+            try:
+                metadata_snapshot(self.fiddler_api, project_id)
+            except Exception as e:
+                warnings.warn(f'Metadata of project {project_id} could not be fetched: {e}')
+        self.warm_metadata = self.fiddler_api.snapshot()
+        return self.warm_metadata
+
+    def generate_reports(self,
+                         jobs: List[tuple],
+                         max_processes: Optional[int] = None,
+                         warm_metadata: bool = True,
+                         **report_kwargs,
+                         ) -> List[dict]:
+        """
+        Generates the reports of several projects in a pool of worker processes. Every job renders into its own
+        scratch directory, so figures and intermediate files of concurrent reports do not collide. A failed job does
+        not stop the other jobs.
+
+        :param jobs: List of (project_id, analysis_modules, output_path) tuples. The analysis modules, the Fiddler
+                     client and the report_kwargs must be picklable, since they are sent to the worker processes.
+        :param max_processes: Number of worker processes. If None the number of CPUs is used.
+        :param warm_metadata: If True the metadata of all projects is fetched once (see warm_up) and shared with the
+                              workers.
+        :param report_kwargs: Further arguments of generate_report (e.g. output_type, template, max_workers) applied
+                              to every job.
+        :return: A dictionary for each job, in the order of the jobs, with the keys project_id, output_path, success,
+                 error and traceback (None on success), duration (in seconds) and io_summary.
+        """
+        if warm_metadata:
+            self.warm_up(sorted({project_id for project_id, _, _ in jobs}))
+
+        worker_args = (self.fiddler_api.client,
+                       self.author,
+                       self.connection_config,
+                       self.response_cache,
+                       self.module_cache,
+                       self.score_store,
+                       self.warm_metadata,
+                       )
+        results = []
+        with ProcessPoolExecutor(max_workers=max_processes,
+                                 initializer=_init_batch_worker,
+                                 initargs=worker_args) as executor:
+            futures = [executor.submit(_run_batch_job, project_id, analysis_modules, output_path, report_kwargs)
+                       for project_id, analysis_modules, output_path in jobs]
+
+            for (project_id, _, output_path), future in zip(jobs, tqdm(futures, desc='Generating reports')):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    # the job could not be sent to or returned from a worker, or the worker died
+                    results.append(_batch_result(project_id, output_path, error=e))
+
+        failed = [(result['project_id'], result['output_path']) for result in results if not result['success']]
+        if failed:
+            warnings.warn(f'{len(failed)} of {len(jobs)} reports failed: {failed}')
+        return results
+
+
+def _checkpoint_key(index: int, analysis_module) -> str:
+    # a module whose parameters changed between the attempts of a run is not restored (see fingerprint_params)
+    params_key = fingerprint(type(analysis_module).__qualname__, analysis_module.fingerprint_params())
+    return f'{index}_{type(analysis_module).__name__}_{params_key[:16]}'
+
+
+# report generator of a batch worker process, created by _init_batch_worker
+_batch_generator = None
+
+
+def _init_batch_worker(fiddler_api, author, connection_config, response_cache, module_cache, score_store,
+                       warm_metadata):
+    global _batch_generator
+    # sessions inherited from the parent process must not be shared with it
+    reset_connections()
+    _batch_generator = FiddlerReportGenerator(fiddler_api=fiddler_api,
+                                              author=author,
+                                              connection_config=connection_config,
+                                              response_cache=response_cache,
+                                              module_cache=module_cache,
+                                              score_store=score_store,
+                                              )
+    _batch_generator.warm_metadata = warm_metadata
+
+
+def _format_traceback(error: BaseException) -> str:
+    return ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+
+
+def _batch_result(project_id, output_path, error=None, duration=None, io_summary=None) -> dict:
+    return {'project_id': project_id,
+            'output_path': output_path,
+            'success': error is None,
+            'error': f'{type(error).__name__}: {error}' if error is not None else None,
+            'traceback': _format_traceback(error) if error is not None else None,
+            'duration': duration,
+            'io_summary': io_summary,
+            }
+
+
+def _run_batch_job(project_id, analysis_modules, output_path, report_kwargs) -> dict:
+    scratch_dir = tempfile.mkdtemp(prefix='reportgen_')
+    start = time.perf_counter()
+    try:
+        io_summary = _batch_generator.generate_report(project_id=project_id,
+                                                      analysis_modules=analysis_modules,
+                                                      output_path=output_path,
+                                                      scratch_dir=scratch_dir,
+                                                      **report_kwargs)
+    except Exception as e:
+        return _batch_result(project_id, output_path, error=e, duration=time.perf_counter() - start)
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+    return _batch_result(project_id, output_path, duration=time.perf_counter() - start, io_summary=io_summary)
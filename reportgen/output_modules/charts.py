@@ -1,13 +1,31 @@
+import functools
 import itertools
+import threading
 from dataclasses import dataclass
 
 import matplotlib.pyplot as plt
 import numpy as np
 
 from .base import BaseOutput
+from .profiling import profiled
 from .blocks import SimpleImage
 from .tmp_file import TempOutputFile
 
+# pyplot keeps global state (current figure, rc parameters), so figures are created one at a time
+plot_lock = threading.RLock()
+
+
+def synchronized_plot(func):
+    """
+    Decorator that holds plot_lock while the decorated plotting function runs. The time spent creating the figure is
+    added to the active profiler (see profiling.py).
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with plot_lock, profiled('figure', func.__qualname__):
+            return func(*args, **kwargs)
+    return wrapper
+
 
 @dataclass
 class PlotStyle:
@@ -59,6 +77,7 @@ class LinePlot(BaseOutput):
         self.style = style
         self.tmp_image_file = None
 
+    @synchronized_plot
     def _generate_matplotlib_plot(self):
         plt.rc('text', usetex=self.style.usetex)
         plt.rc('font', size=self.style.font_size)
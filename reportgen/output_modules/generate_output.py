@@ -1,6 +1,6 @@
 import os
 import warnings
-from typing import List, Type, Optional
+from typing import Optional, Iterable
 
 from docx import Document
 from docx2pdf import convert
@@ -8,11 +8,13 @@ from docxtpl import DocxTemplate
 from pkg_resources import resource_filename
 
 from .base import OutputTypes, BaseOutput
+from .profiling import profiled
+from .tmp_file import active_scratch_dir
 
 FIDDLER_DEFAULT_REPORT_NAME = 'fiddler_report'
 DEFAULT_TEMPLATE_FILE = resource_filename('reportgen', 'templates/template.docx')
 
-def _generate_output_docx(output_modules: List[BaseOutput], output_path: str, template: Optional[str]):
+def _generate_output_docx(output_modules: Iterable[BaseOutput], output_path: str, template: Optional[str]):
 
     template_file = template if template is not None else DEFAULT_TEMPLATE_FILE
     if os.path.isfile(template_file):
@@ -21,27 +23,33 @@ def _generate_output_docx(output_modules: List[BaseOutput], output_path: str, te
         warnings.warn(f'The template file {template_file} does not exist. The output is generated without a template.')
         document = Document()
 
+    # output_modules can be a generator, in which case every output is released right after it is rendered
     for output_module in output_modules:
-        output_module.render_docx(document=document)
+        with profiled('render_docx', type(output_module).__name__):
+            output_module.render_docx(document=document)
 
     report_name = FIDDLER_DEFAULT_REPORT_NAME + '.docx' if output_path is None else output_path + '.docx'
-    document.save(report_name)
+    with profiled('save', 'document.save'):
+        document.save(report_name)
     return None
 
 
-def _generate_output_pdf(output_modules: List[BaseOutput], output_path: str, template: Optional[str]):
+def _generate_output_pdf(output_modules: Iterable[BaseOutput], output_path: str, template: Optional[str]):
     template_file = template if template is not None else DEFAULT_TEMPLATE_FILE
-    _generate_output_docx(output_modules=output_modules, output_path='tmp/tmp', template=template_file)
+    # the intermediate docx is written to the scratch directory, so concurrent reports do not overwrite each other
+    os.makedirs(active_scratch_dir.get(), exist_ok=True)
+    tmp_path = os.path.join(active_scratch_dir.get(), 'tmp')
+    _generate_output_docx(output_modules=output_modules, output_path=tmp_path, template=template_file)
 
     report_name = FIDDLER_DEFAULT_REPORT_NAME + '.pdf' if output_path is None else output_path + '.pdf'
     file = open(report_name, "w")
     file.close()
-    convert('tmp/tmp.docx', report_name)
+    convert(tmp_path + '.docx', report_name)
     return None
 
 
 def generate_output(output_type: OutputTypes,
-                    output_modules: List[Type[BaseOutput]],
+                    output_modules: Iterable[BaseOutput],
                     output_path: str,
                     template: Optional[str] = None,
                     ):
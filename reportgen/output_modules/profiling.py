@@ -0,0 +1,92 @@
+import contextlib
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from typing import Iterable, Iterator, List
+
+# The report generator activates a Profiler for the duration of a report generated with profile=True
+active_profiler = contextvars.ContextVar('active_profiler', default=None)
+
+
+class Profiler:
+    """
+    Collects the wall-clock durations of the steps of a report, e.g. the preflight and run of every analysis module,
+    the render_docx call of every output, the creation of every figure and the final document.save. Durations are
+    grouped by step and name (analysis module, output class or plotting function).
+    """
+    def __init__(self):
+        self._timings = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def add(self, step: str, name: str, seconds: float):
+        with self._lock:
+            self._timings[step, name].append(seconds)
+
+    def summary(self) -> dict:
+        """
+        Returns the number of calls and the total, mean and maximum duration for each step and name.
+        """
+        with self._lock:
+            timings = dict(self._timings)
+
+        summary = defaultdict(dict)
+        for (step, name), durations in sorted(timings.items()):
+            summary[step][name] = {'calls': len(durations),
+                                   'total': sum(durations),
+                                   'mean': sum(durations) / len(durations),
+                                   'max': max(durations),
+                                   }
+        return dict(summary)
+
+    def records(self) -> List[tuple]:
+        """
+        Returns a (step, name, calls, total, mean, max) record for each step and name, longest total first.
+        """
+        records = [(step, name, stats['calls'], stats['total'], stats['mean'], stats['max'])
+                   for step, names in self.summary().items()
+                   for name, stats in names.items()]
+        return sorted(records, key=lambda record: record[3], reverse=True)
+
+
+@contextlib.contextmanager
+def profiled(step: str, name: str):
+    """
+    Times the context and adds its duration to the active profiler, if any.
+    """
+    profiler = active_profiler.get()
+    if profiler is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.add(step, name, time.perf_counter() - start)
+
+
+def profiled_iter(iterable: Iterable, step: str, name: str) -> Iterator:
+    """
+    Yields the items of an iterable (e.g. the outputs of BaseAnalysis.iter_run) and adds the time spent producing
+    them, excluding the time the consumer spends between items, to the active profiler as a single call.
+    """
+    profiler = active_profiler.get()
+    if profiler is None:
+        yield from iterable
+        return
+
+    iterator = iter(iterable)
+    total = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                total += time.perf_counter() - start
+            yield item
+    finally:
+        profiler.add(step, name, total)
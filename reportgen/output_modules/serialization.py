@@ -0,0 +1,102 @@
+import os
+import pickle
+import shutil
+from typing import List
+
+from .base import BaseOutput
+from .tmp_file import TempOutputFile
+
+OUTPUTS_FILE = 'outputs.pkl'
+
+
+class _OutputPickler(pickle.Pickler):
+    """
+    Pickles TempOutputFile objects by reference: the image file is copied next to the pickle file.
+    """
+    def __init__(self, file, directory):
+        super().__init__(file)
+        self.directory = directory
+        self.images = {}
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, TempOutputFile):
+            return None
+
+        if id(obj) not in self.images:
+            file_name = f'image_{len(self.images)}.png'
+            if os.path.isfile(obj.get_path()):
+                shutil.copyfile(obj.get_path(), os.path.join(self.directory, file_name))
+            self.images[id(obj)] = file_name
+        return 'TempOutputFile', self.images[id(obj)]
+
+
+class _OutputUnpickler(pickle.Unpickler):
+    """
+    Restores every image referenced by the pickle file into a new TempOutputFile, since rendering deletes them.
+    """
+    def __init__(self, file, directory, images):
+        super().__init__(file)
+        self.directory = directory
+        self.images = images
+
+    def persistent_load(self, pid):
+        kind, file_name = pid
+        if kind != 'TempOutputFile':
+            raise pickle.UnpicklingError(f'Unknown persistent object {kind}.')
+
+        if file_name not in self.images:
+            tmp_file = TempOutputFile()
+            source = os.path.join(self.directory, file_name)
+            if os.path.isfile(source):
+                shutil.copyfile(source, tmp_file.get_path())
+            self.images[file_name] = tmp_file
+        return self.images[file_name]
+
+
+class OutputWriter:
+    """
+    Writes output modules one at a time into a directory, together with copies of the images they reference, so
+    that they can be restored with load_outputs after the originals have been rendered and deleted.
+    """
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._file = open(os.path.join(directory, OUTPUTS_FILE), 'wb')
+        self._pickler = _OutputPickler(self._file, directory)
+
+    def write(self, output_module: BaseOutput):
+        self._pickler.dump(output_module)
+        # the memo would keep every written output alive
+        self._pickler.clear_memo()
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def save_outputs(output_modules: List[BaseOutput], directory: str):
+    with OutputWriter(directory) as writer:
+        for output_module in output_modules:
+            writer.write(output_module)
+
+
+def load_outputs(directory: str) -> List[BaseOutput]:
+    """
+    Restores the output modules written to a directory by OutputWriter or save_outputs.
+    """
+    output_modules = []
+    images = {}
+    with open(os.path.join(directory, OUTPUTS_FILE), 'rb') as f:
+        while True:
+            # every output is a separate pickle with its own memo (see OutputWriter.write)
+            try:
+                output_modules.append(_OutputUnpickler(f, directory, images).load())
+            except EOFError:
+                break
+    return output_modules
@@ -1,12 +1,26 @@
+import contextvars
 import os
+import threading
+
+# directory of the intermediate files of a report (figures, the docx of a PDF report); batch runs use one per job
+active_scratch_dir = contextvars.ContextVar('active_scratch_dir', default='tmp')
 
 
 class TempOutputFile:
     instance_counter = 0
+    _counter_lock = threading.Lock()
+
+    def __init__(self, tmp_dir=None, file_name=None):
+        """
+        :param tmp_dir: Directory of the file. If None the figs subdirectory of the active scratch directory is used.
+        """
+        # analysis modules may create figures from several threads at the same time
+        with TempOutputFile._counter_lock:
+            TempOutputFile.instance_counter += 1
+            self.ID = TempOutputFile.instance_counter
 
-    def __init__(self, tmp_dir='tmp/figs/', file_name=None):
-        TempOutputFile.instance_counter += 1
-        self.ID = TempOutputFile.instance_counter
+        if tmp_dir is None:
+            tmp_dir = os.path.join(active_scratch_dir.get(), 'figs')
 
         try:
             os.makedirs(tmp_dir)
@@ -18,7 +32,7 @@ class TempOutputFile:
         else:
             self.file_name = 'out_' + str(self.ID)
 
-        self.file_path = tmp_dir + self.file_name + '.png'
+        self.file_path = os.path.join(tmp_dir, self.file_name + '.png')
 
     def get_path(self):
         return self.file_path
@@ -0,0 +1,194 @@
+"""
+Record/replay stand-ins for the Fiddler client. RecordingFiddlerApi wraps a real client and stores every client method
+call and front-end POST of a report run in a fixture directory. FakeFiddlerApi serves these fixtures back, optionally
+with injected latency and errors, and can be passed as the fiddler_api argument of FiddlerReportGenerator to generate
+reports and measure their performance without a Fiddler deployment. Fixtures are matched by call arguments, so analysis
+modules replayed this way should use explicit start and end times rather than windows relative to the current date.
+"""
+import hashlib
+import json
+import os
+import pickle
+import random
+import threading
+import time
+from typing import Optional, Union, Dict
+
+import requests
+
+from .analysis_modules.connection_helpers import get_connection
+
+MANIFEST_FILE = 'manifest.json'
+CALLS_DIR = 'calls'
+POSTS_DIR = 'posts'
+
+
+def _normalize(value):
+    # fixture keys must stay stable across releases, so this is deliberately not shared with the module output cache
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if hasattr(value, '__dict__'):
+        return {'__class__': type(value).__name__, **_normalize(vars(value))}
+    return repr(value)
+
+
+def _fixture_key(*parts) -> str:
+    canonical = json.dumps(_normalize(parts), sort_keys=True, separators=(',', ':'), default=repr)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _endpoint(api_url: str, url: str) -> str:
+    return url[len(api_url):].strip('/') if url.startswith(api_url) else url
+
+
+class RecordingFiddlerApi:
+    """
+    A proxy around a Fiddler client that records the result (or raised exception) of every public method call and
+    the response of every front-end POST into a fixture directory. Reports generated with a recording client bypass
+    the response cache, the module output cache and the score store, so that every response is recorded.
+    """
+    bypass_caches = True
+
+    def __init__(self, api, fixture_dir: str):
+        self._api = api
+        self._fixture_dir = fixture_dir
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(fixture_dir, CALLS_DIR), exist_ok=True)
+        os.makedirs(os.path.join(fixture_dir, POSTS_DIR), exist_ok=True)
+
+        manifest = {'url': api.url,
+                    'organization_name': api.organization_name,
+                    'client_attributes': [name for name in dir(api) if not name.startswith('_')],
+                    }
+        with open(os.path.join(fixture_dir, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    def __getattr__(self, name):
+        attr = getattr(self._api, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        def recorded(*args, **kwargs):
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                self._save(os.path.join(CALLS_DIR, name), _fixture_key(args, kwargs) + '.pkl', pickle.dumps(e))
+                raise
+            self._save(os.path.join(CALLS_DIR, name), _fixture_key(args, kwargs) + '.pkl', pickle.dumps(result))
+            return result
+        return recorded
+
+    def __dir__(self):
+        return sorted(set(dir(self._api)) | set(super().__dir__()))
+
+    def frontend_transport(self, url, headers, request, timeout=None):
+        response = get_connection(self._api).send(url, headers, request, timeout)
+        endpoint = _endpoint(self._api.url, url)
+        self._save(os.path.join(POSTS_DIR, endpoint),
+                   _fixture_key(self._api.organization_name, request) + '.json',
+                   json.dumps({'request': request, 'response': response}).encode('utf-8'),
+                   )
+        return response
+
+    def _save(self, directory, file_name, data: bytes):
+        directory = os.path.join(self._fixture_dir, directory)
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, file_name), 'wb') as f:
+                f.write(data)
+
+
+class FakeFiddlerApi:
+    """
+    A stand-in for the Fiddler client that serves the fixtures recorded by RecordingFiddlerApi. A call or POST without
+    a recorded fixture raises a KeyError.
+    """
+    def __init__(self,
+                 fixture_dir: str,
+                 latency: Union[float, Dict[str, float]] = 0.0,
+                 latency_jitter: float = 0.0,
+                 error_rate: Union[float, Dict[str, float]] = 0.0,
+                 seed: Optional[int] = None,
+                 ):
+        """
+        :param fixture_dir: Fixture directory written by RecordingFiddlerApi.
+        :param latency: Latency (in seconds) injected into every call, or a dictionary of latencies keyed by client
+                        method or front-end endpoint name (e.g. {'get_slice': 0.2, 'scores': 0.5}).
+        :param latency_jitter: Maximum random latency (in seconds) added to the injected latency.
+        :param error_rate: Probability that a call fails with a ConnectionError, or a dictionary of probabilities
+                           keyed by client method or front-end endpoint name.
+        :param seed: Seed of the random generator used for jitter and errors.
+        """
+        with open(os.path.join(fixture_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+
+        self._fixture_dir = fixture_dir
+        self._client_attributes = manifest['client_attributes']
+        self._latency = latency
+        self._latency_jitter = latency_jitter
+        self._error_rate = error_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+        self.url = manifest['url']
+        self.organization_name = manifest['organization_name']
+        self.request_headers = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_random_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._random_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name.startswith('_') or not os.path.isdir(os.path.join(self._fixture_dir, CALLS_DIR, name)):
+            raise AttributeError(f"'{type(self).__name__}' has no recorded method '{name}'")
+
+        def replayed(*args, **kwargs):
+            self._simulate(name, ConnectionError)
+            path = os.path.join(self._fixture_dir, CALLS_DIR, name, _fixture_key(args, kwargs) + '.pkl')
+            if not os.path.isfile(path):
+                raise KeyError(f'No recorded response for {name} with args={args} and kwargs={kwargs}.')
+
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return replayed
+
+    def __dir__(self):
+        return sorted(set(self._client_attributes) | set(super().__dir__()))
+
+    def frontend_transport(self, url, headers, request, timeout=None):
+        endpoint = _endpoint(self.url, url)
+        self._simulate(endpoint, requests.ConnectionError)
+
+        path = os.path.join(self._fixture_dir, POSTS_DIR, endpoint,
+                            _fixture_key(self.organization_name, request) + '.json')
+        if not os.path.isfile(path):
+            raise KeyError(f'No recorded response for a {endpoint} request with payload {request}.')
+
+        with open(path) as f:
+            return json.load(f)['response']
+
+    def _simulate(self, name, error_type):
+        latency = self._latency.get(name, 0.0) if isinstance(self._latency, dict) else self._latency
+        error_rate = self._error_rate.get(name, 0.0) if isinstance(self._error_rate, dict) else self._error_rate
+
+        with self._random_lock:
+            jitter = self._random.uniform(0, self._latency_jitter) if self._latency_jitter else 0.0
+            failed = self._random.random() < error_rate if error_rate else False
+
+        if latency or jitter:
+            time.sleep(latency + jitter)
+        if failed:
+            raise error_type(f'Injected error for {name}.')
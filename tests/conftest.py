@@ -0,0 +1,277 @@
+import json
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from types import SimpleNamespace
+
+import fiddler as fdl
+import numpy as np
+import pandas as pd
+import pytest
+from docx import Document
+
+from reportgen import FiddlerReportGenerator
+from reportgen.analysis_modules import BaseAnalysis
+from reportgen.output_modules import DescriptiveTextBlock
+
+SCORES_RESPONSE = {'kind': 'NORMAL',
+                   'data': {'accuracy': 0.8, 'f1_score': 0.7, 'auc': 0.9, 'precision': 0.6, 'recall': 0.5,
+                            'confusion_matrix': {'tp': 5, 'fn': 2, 'fp': 1, 'tn': 9},
+                            'roc_curve': {'fpr': [0, 0.2, 1], 'tpr': [0, 0.7, 1], 'thresholds': [1, 0.5, 0]},
+                            },
+                   }
+EXPLAIN_RESPONSE = {'kind': 'NORMAL',
+                    'data': {'explanations': {'out': {'baseline_prediction': 0.4,
+                                                      'model_prediction': 0.9,
+                                                      'GEM': {'contents': [{'type': 'simple',
+                                                                            'feature-name': 'a',
+                                                                            'attribution': 0.3,
+                                                                            'value': 1},
+                                                                           {'type': 'simple',
+                                                                            'feature-name': 'cat',
+                                                                            'attribution': -0.2,
+                                                                            'value': 'x'},
+                                                                           ]},
+                                                      }}},
+                    }
+
+
+class FrontEndServer:
+    """
+    A local HTTP server that answers every scores and explain request with a fixed response and records the
+    requests it receives, the client connections they came from and the largest number of requests it handled at the
+    same time. The statuses in fail_statuses are returned (one per request) before the fixed responses.
+    """
+    def __init__(self, latency: float = 0.0):
+        self.posts = []
+        self.latency = latency
+        self.clients = set()
+        self.fail_statuses = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with server._lock:
+                    server.posts.append((self.path, body))
+                    server.clients.add(self.client_address)
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    status = server.fail_statuses.pop(0) if server.fail_statuses else 200
+                time.sleep(server.latency)
+                with server._lock:
+                    server.in_flight -= 1
+                response = SCORES_RESPONSE if self.path.endswith('scores') else EXPLAIN_RESPONSE
+                data = json.dumps(response if status == 200 else {'error': 'unavailable'}).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self._httpd.server_port}'
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def _column(name, data_type):
+    return SimpleNamespace(name=name, data_type=data_type)
+
+
+def _predicate(df: pd.DataFrame, predicate: str) -> np.ndarray:
+    # translates the SQL predicates generated by the segments into pandas expressions
+    expression = re.sub(r'(\w+) IS NOT NULL', r'\1.notna()', predicate)
+    expression = re.sub(r'(\w+) IS NULL', r'\1.isna()', expression)
+    expression = re.sub(r'(?<![<>!=])=(?!=)', '==', expression)
+    expression = re.sub(r'NOT IN \(([^)]*)\)', r'not in [\1]', expression)
+    expression = re.sub(r'\bIN \(([^)]*)\)', r'in [\1]', expression)
+    expression = expression.replace(' AND ', ' and ').replace(' OR ', ' or ').replace('NOT ', 'not ')
+    df = df.copy()
+    df['cat'] = df['cat'].astype(object)
+    return np.asarray(df.eval(expression, engine='python'), dtype=bool)
+
+
+class FakeFiddlerApi:
+    """
+    A Fiddler client test double with one binary classification model ('m1') of one project ('p'). get_slice
+    answers the queries issued by the analysis modules from an in-memory table; front-end calls go to a local
+    FrontEndServer.
+    """
+    def __init__(self, url: str, rows: int = 200):
+        self.url = url
+        self.organization_name = 'org'
+        self.request_headers = {'Authorization': 'Bearer test'}
+        self.calls = []
+        self.queries = []
+
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({'a': rng.normal(size=rows),
+                                'cat': pd.Categorical(rng.choice(list('xyz'), rows)),
+                                'out': rng.random(rows),
+                                'target': rng.choice([0, 1], rows),
+                                'fiddler_timestamp': pd.date_range('2023-01-01', periods=rows, freq='6h'),
+                                })
+
+    def _log(self, name):
+        self.calls.append(name)
+
+    def add_model(self):
+        # the report generator recognizes a Fiddler client by this method
+        raise NotImplementedError
+
+    def list_projects(self):
+        self._log('list_projects')
+        return ['p']
+
+    def list_models(self, project_id):
+        self._log('list_models')
+        return ['m1']
+
+    def list_datasets(self, project_id):
+        self._log('list_datasets')
+        return ['baseline']
+
+    def get_dataset(self, project_id, dataset_id):
+        self._log('get_dataset')
+        return SimpleNamespace(file_list={'tree': [{'name': 'train.csv'}]})
+
+    def get_model_info(self, project_id, model_id):
+        self._log('get_model_info')
+        return SimpleNamespace(model_task=fdl.ModelTask.BINARY_CLASSIFICATION,
+                               datasets=['baseline'],
+                               binary_classification_threshold=0.5,
+                               inputs=[_column('a', fdl.DataType.FLOAT), _column('cat', fdl.DataType.CATEGORY)],
+                               outputs=[_column('out', fdl.DataType.FLOAT)],
+                               targets=[_column('target', fdl.DataType.INTEGER)],
+                               metadata=[],
+                               target_class_order=[0, 1],
+                               )
+
+    def get_alert_rules(self, project_id, model_id):
+        self._log('get_alert_rules')
+        return []
+
+    def get_triggered_alerts(self, **kwargs):
+        self._log('get_triggered_alerts')
+        return []
+
+    def get_feature_impact(self, project_id, model_id, data_source):
+        self._log('get_feature_impact')
+        return SimpleNamespace(feature_names=['a', 'cat'], mean_abs_prediction_change_impact=[0.3, 0.1])
+
+    def get_slice(self, sql_query, project_id):
+        self._log('get_slice')
+        self.queries.append(sql_query)
+        query = sql_query
+        df = self.df
+
+        if 'COUNT(*) FROM "' in query:
+            return pd.DataFrame({'count()': [len(df)]})
+        if 'DISTINCT' in query:
+            return pd.DataFrame({'cat': sorted(df['cat'].dropna().unique())})
+
+        match = re.search(r'MIN\((\w+)\) AS min_value', query)
+        if match:
+            return pd.DataFrame({'min_value': [df[match.group(1)].min()], 'max_value': [df[match.group(1)].max()]})
+
+        match = re.search(r'FLOOR\(\((\w+) - ([-\d.e]+)\) / ([-\d.e]+)\) AS bin', query)
+        if match:
+            bins = np.floor((df[match.group(1)] - float(match.group(2))) / float(match.group(3))).value_counts()
+            return pd.DataFrame({'bin': bins.index.to_numpy(), 'num': bins.to_numpy()})
+
+        if 'AS start_time' in query:
+            return pd.DataFrame({'start_time': [df['fiddler_timestamp'].min()],
+                                 'end_time': [df['fiddler_timestamp'].max()]})
+        if query.strip().endswith('LIMIT 1'):
+            return df.head(1)
+        if 'MIN(fiddler_timestamp)' in query:
+            return df[df['fiddler_timestamp'] == df['fiddler_timestamp'].min()].reset_index(drop=True)
+        if 'MAX(fiddler_timestamp)' in query:
+            return df[df['fiddler_timestamp'] == df['fiddler_timestamp'].max()].reset_index(drop=True)
+
+        match = re.search(r'SELECT (\w+), COUNT\(\*\) AS num .*LIMIT (\d+)', query)
+        if match:
+            column = df[match.group(1)]
+            if 'IS NOT NULL' in query:
+                column = column.dropna()
+            counts = column.astype(object).value_counts(dropna=False).head(int(match.group(2)))
+            return pd.DataFrame({match.group(1): list(counts.index), 'num': counts.to_numpy()})
+        if 'LIMIT 3' in query:
+            return df.head(2)
+
+        match = re.search(r"BETWEEN '([^']+)' AND '([^']+)'", query)
+        if match:
+            df = df[(df['fiddler_timestamp'] >= match.group(1)) & (df['fiddler_timestamp'] <= match.group(2))]
+
+        match = re.search(r'CASE (.*) END AS segment_label', query)
+        if match:
+            df = df.copy()
+            labels = pd.Series([None] * len(df), index=df.index, dtype=object)
+            for predicate, label in reversed(re.findall(r"WHEN (.*?) THEN '((?:[^']|'')*)'", match.group(1))):
+                labels[_predicate(df, predicate)] = label.replace("''", "'")
+            df['segment_label'] = labels
+        return df.reset_index(drop=True)
+
+
+class TextAnalysis(BaseAnalysis):
+    """
+    An analysis module that adds text blocks to the report after an optional delay, and counts its runs.
+    """
+    def __init__(self, *texts: str, delay: float = 0.0, fail: bool = False):
+        self.texts = texts
+        self.delay = delay
+        self.fail = fail
+        self.runs = 0
+
+    def preflight(self, api, project_id):
+        pass
+
+    def run(self, api):
+        return list(self.iter_run(api))
+
+    def iter_run(self, api):
+        self.runs += 1
+        for text in self.texts:
+            time.sleep(self.delay)
+            yield DescriptiveTextBlock(text)
+        if self.fail:
+            raise RuntimeError('module failed')
+
+
+def report_text(output_path: str) -> list:
+    """
+    Returns the non-empty paragraphs of a docx report.
+    """
+    return [paragraph.text for paragraph in Document(output_path + '.docx').paragraphs if paragraph.text]
+
+
+@pytest.fixture
+def frontend_server():
+    server = FrontEndServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def fake_api(frontend_server):
+    return FakeFiddlerApi(frontend_server.url)
+
+
+@pytest.fixture
+def generator(fake_api, tmp_path, monkeypatch):
+    # reports, figures and caches are written to the working directory
+    monkeypatch.chdir(tmp_path)
+    return FiddlerReportGenerator(fiddler_api=fake_api, author='test')
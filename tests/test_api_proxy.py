@@ -0,0 +1,48 @@
+from reportgen.analysis_modules import MemoizedFiddlerApi
+
+
+def test_metadata_calls_are_memoized(fake_api):
+    api = MemoizedFiddlerApi(fake_api)
+    api.get_model_info('p', 'm1')
+    api.get_model_info(project_id='p', model_id='m1')
+    api.get_model_info('p', 'm2')
+
+    assert fake_api.calls.count('get_model_info') == 2
+    assert api.cache_stats()['get_model_info'] == {'hits': 1, 'misses': 2}
+
+
+def test_other_calls_are_forwarded(fake_api):
+    api = MemoizedFiddlerApi(fake_api)
+    api.get_triggered_alerts(project_id='p')
+    api.get_triggered_alerts(project_id='p')
+
+    assert fake_api.calls.count('get_triggered_alerts') == 2
+
+
+def test_callers_get_their_own_copy(fake_api):
+    api = MemoizedFiddlerApi(fake_api)
+    model_info = api.get_model_info('p', 'm1')
+    model_info.inputs.clear()
+
+    assert len(api.get_model_info('p', 'm1').inputs) == 2
+
+
+def test_prefetched_slices_are_copied(fake_api):
+    api = MemoizedFiddlerApi(fake_api)
+    query = 'SELECT * FROM baseline."m1" LIMIT 1'
+    api.prefetch('get_slice', sql_query=query, project_id='p')
+    slice_df = api.get_slice(sql_query=query, project_id='p')
+    slice_df['a'] = 0
+
+    assert fake_api.calls.count('get_slice') == 1
+    assert (api.get_slice(sql_query=query, project_id='p')['a'] != 0).all()
+
+
+def test_invalidate(fake_api):
+    api = MemoizedFiddlerApi(fake_api)
+    api.list_models('p')
+    api.invalidate()
+    api.list_models('p')
+
+    assert fake_api.calls.count('list_models') == 2
+    assert api.cache_stats()['list_models'] == {'hits': 0, 'misses': 1}
@@ -0,0 +1,52 @@
+import random
+import time
+
+from reportgen.analysis_modules import AsyncFrontEndCall
+from reportgen.analysis_modules.connection_helpers import Connection
+
+
+class EchoApi:
+    """
+    A client whose front-end transport answers each request with its index after a random delay, and fails the
+    requests marked with fail.
+    """
+    url = 'http://echo'
+    organization_name = 'org'
+    request_headers = {}
+
+    def frontend_transport(self, url, headers, request, timeout=None):
+        time.sleep(random.uniform(0, 0.02))
+        if request.get('fail'):
+            raise RuntimeError('request failed')
+        return {'kind': 'NORMAL', 'data': request['index']}
+
+
+def test_responses_keep_the_order_of_the_requests():
+    payloads = [{'index': index} for index in range(20)]
+    responses = AsyncFrontEndCall(EchoApi(), 'echo_order', max_concurrency=8,
+                                  connection=Connection()).post_batch(payloads)
+
+    assert [response['data'] for response in responses] == list(range(20))
+
+
+def test_failed_requests_do_not_affect_the_others():
+    payloads = [{'index': index, 'fail': index == 3} for index in range(6)]
+    responses = AsyncFrontEndCall(EchoApi(), 'echo_errors', connection=Connection()).post_batch(payloads)
+
+    assert responses[3] == {'kind': 'ERROR', 'error': 'RuntimeError: request failed'}
+    assert [response['data'] for i, response in enumerate(responses) if i != 3] == [0, 1, 2, 4, 5]
+
+
+def test_requests_in_flight_are_bounded(fake_api, frontend_server):
+    frontend_server.latency = 0.05
+    payloads = [{'index': index} for index in range(10)]
+    responses = AsyncFrontEndCall(fake_api, 'bounded', max_concurrency=3).post_batch(payloads)
+
+    assert len(responses) == 10
+    assert len(frontend_server.posts) == 10
+    assert frontend_server.max_in_flight == 3
+
+
+def test_empty_batch(fake_api, frontend_server):
+    assert AsyncFrontEndCall(fake_api, 'scores').post_batch([]) == []
+    assert frontend_server.posts == []
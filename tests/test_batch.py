@@ -0,0 +1,26 @@
+import pytest
+
+from conftest import TextAnalysis
+
+
+def test_failed_jobs_do_not_stop_the_batch(generator):
+    jobs = [('p', [TextAnalysis('first')], 'first'),
+            ('p', [TextAnalysis('second', fail=True)], 'second'),
+            ]
+    with pytest.warns(UserWarning, match='1 of 2 reports failed'):
+        results = generator.generate_reports(jobs, max_processes=2)
+
+    assert [result['success'] for result in results] == [True, False]
+    assert results[0]['traceback'] is None
+    assert results[0]['io_summary'] is not None
+    assert results[1]['error'] == 'RuntimeError: module failed'
+    assert 'raise RuntimeError' in results[1]['traceback']
+
+
+def test_warm_up_skips_unknown_projects(generator, fake_api):
+    def list_models(project_id):
+        raise KeyError(project_id)
+
+    fake_api.list_models = list_models
+    with pytest.warns(UserWarning, match='Metadata of project q could not be fetched'):
+        generator.warm_up(['q'])
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from conftest import TextAnalysis, report_text
+
+
+class ParamAnalysis(TextAnalysis):
+    def fingerprint_params(self):
+        return {'texts': self.texts}
+
+
+class PlannedAnalysis(TextAnalysis):
+    """
+    Changes its parameters when its requirements are declared.
+    """
+    planned = False
+
+    def fingerprint_params(self):
+        return {'texts': self.texts, 'planned': self.planned}
+
+    def requirements(self, api):
+        self.planned = True
+        return []
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_failed_run_is_resumed(generator, streaming):
+    completed, failing = TextAnalysis('completed'), TextAnalysis('failing', fail=True)
+    with pytest.raises(RuntimeError):
+        generator.generate_report(project_id='p', analysis_modules=[completed, failing], output_path='report',
+                                  run_id='run', streaming=streaming)
+
+    failing.fail = False
+    io_summary = generator.generate_report(project_id='p', analysis_modules=[completed, failing],
+                                           output_path='report', run_id='run', streaming=streaming)
+
+    assert io_summary['resumed_modules'] == ['TextAnalysis']
+    assert (completed.runs, failing.runs) == (1, 2)
+    assert report_text('report')[-2:] == ['completed', 'failing']
+    # the checkpoints are removed once the report is written
+    assert not os.path.exists(os.path.join('.reportgen_runs', 'run'))
+
+
+def test_changed_modules_are_not_resumed(generator):
+    with pytest.raises(RuntimeError):
+        generator.generate_report(project_id='p',
+                                  analysis_modules=[ParamAnalysis('old'), TextAnalysis('failing', fail=True)],
+                                  output_path='report', run_id='run')
+
+    changed = ParamAnalysis('new')
+    io_summary = generator.generate_report(project_id='p', analysis_modules=[changed, TextAnalysis('fixed')],
+                                           output_path='report', run_id='run')
+
+    assert io_summary['resumed_modules'] == []
+    assert changed.runs == 1
+    assert report_text('report')[-2:] == ['new', 'fixed']
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_planned_run_is_resumed(generator, streaming):
+    with pytest.raises(RuntimeError):
+        generator.generate_report(project_id='p',
+                                  analysis_modules=[PlannedAnalysis('completed'), TextAnalysis('failing', fail=True)],
+                                  output_path='report', run_id='run', plan_fetches=True, streaming=streaming)
+
+    # the modules are created again, as by a new process resuming the run
+    completed = PlannedAnalysis('completed')
+    io_summary = generator.generate_report(project_id='p', analysis_modules=[completed, TextAnalysis('fixed')],
+                                           output_path='report', run_id='run', plan_fetches=True,
+                                           streaming=streaming)
+
+    assert io_summary['resumed_modules'] == ['PlannedAnalysis']
+    assert completed.runs == 0
+    assert report_text('report')[-2:] == ['completed', 'fixed']
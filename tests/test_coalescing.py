@@ -0,0 +1,56 @@
+import threading
+
+from reportgen.analysis_modules.connection_helpers import RequestCoalescer, FrontEndCall, active_coalescer
+
+
+def test_identical_requests_are_sent_once(fake_api, frontend_server):
+    token = active_coalescer.set(RequestCoalescer())
+    try:
+        call = FrontEndCall(fake_api, 'scores')
+        first = call.post({'metric': 'accuracy'})
+        second = call.post({'metric': 'accuracy'})
+        call.post({'metric': 'auc'})
+    finally:
+        active_coalescer.reset(token)
+
+    assert first == second
+    assert len(frontend_server.posts) == 2
+
+
+def test_concurrent_callers_wait_for_the_request_in_flight():
+    coalescer = RequestCoalescer()
+    release = threading.Event()
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        release.wait(5)
+        return {'kind': 'NORMAL', 'data': {}}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(coalescer.run('key', fetch))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(fetches) == 1
+    assert len(results) == 3
+    assert coalescer.coalesced == 2
+
+
+def test_error_responses_are_not_kept():
+    coalescer = RequestCoalescer()
+    coalescer.run('key', lambda: {'kind': 'ERROR', 'error': 'failed'})
+    response = coalescer.run('key', lambda: {'kind': 'NORMAL', 'data': {}})
+
+    assert response['kind'] == 'NORMAL'
+
+
+def test_callers_get_their_own_copy():
+    coalescer = RequestCoalescer()
+    response = coalescer.run('key', lambda: {'kind': 'NORMAL', 'data': {'accuracy': 0.8}})
+    response['data']['accuracy'] = 0
+
+    assert coalescer.run('key', lambda: None)['data']['accuracy'] == 0.8
@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+
+from reportgen.analysis_modules import AdaptiveLimiter, ConcurrencyController
+from reportgen.analysis_modules.concurrency import run_concurrently
+
+
+def test_limit_grows_after_successful_calls():
+    limiter = AdaptiveLimiter('scores', initial_limit=2, max_limit=4)
+    for _ in range(10):
+        with limiter.acquire():
+            pass
+
+    assert limiter.limit > 2
+    assert limiter.limit <= 4
+
+
+def test_limit_shrinks_after_failed_calls():
+    limiter = AdaptiveLimiter('scores', initial_limit=8, min_limit=2)
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            with limiter.acquire():
+                raise RuntimeError('failed')
+
+    assert limiter.limit == 2
+    assert limiter.in_flight == 0
+
+
+def test_in_flight_calls_do_not_exceed_the_limit():
+    limiter = AdaptiveLimiter('scores', initial_limit=2, max_limit=2)
+    in_flight = []
+    lock = threading.Lock()
+
+    def call():
+        with limiter.acquire():
+            with lock:
+                in_flight.append(limiter.in_flight)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(in_flight) <= 2
+
+
+def test_controller_keeps_one_limiter_per_endpoint():
+    controller = ConcurrencyController()
+
+    assert controller.limiter('scores') is controller.limiter('scores')
+    assert controller.limit('explain') == 4
+    assert controller.configure('explain', initial_limit=2).limit == 2
+    assert set(controller.snapshot()) == {'scores', 'explain'}
+
+
+def test_run_concurrently_keeps_the_order_of_the_tasks():
+    tasks = [lambda i=i: time.sleep(0.01 * (5 - i)) or i for i in range(5)]
+
+    assert run_concurrently(tasks, max_workers=5) == list(range(5))
@@ -0,0 +1,108 @@
+import math
+import time
+
+import numpy as np
+import pytest
+import requests
+
+from conftest import TextAnalysis
+from reportgen import FiddlerReportGenerator
+from reportgen.analysis_modules import ConnectionConfig, ResponseCache
+from reportgen.analysis_modules.connection_helpers import Connection, FrontEndCall, get_connection, as_numpy_arrays, \
+    decode_json, ROC_ARRAY_FIELDS
+
+
+def test_decode_json():
+    assert decode_json(b'{"kind": "NORMAL", "data": [1, 2.5]}') == {'kind': 'NORMAL', 'data': [1, 2.5]}
+
+
+def test_decode_json_non_finite_numbers():
+    data = decode_json(b'{"kind": "NORMAL", "data": [NaN, Infinity, -Infinity]}')['data']
+
+    assert math.isnan(data[0]) and data[1:] == [math.inf, -math.inf]
+
+
+def test_listed_fields_are_converted():
+    response = {'kind': 'NORMAL',
+                'data': {'accuracy': 0.8, 'roc_curve': {'fpr': [0, 1], 'tpr': [0, 1], 'thresholds': [1, 0]}}}
+    converted = as_numpy_arrays(response, ROC_ARRAY_FIELDS)
+
+    assert isinstance(converted['data']['roc_curve']['fpr'], np.ndarray)
+    np.testing.assert_array_equal(converted['data']['roc_curve']['tpr'], [0, 1])
+    assert converted['data']['accuracy'] == 0.8
+
+
+def test_only_the_path_to_converted_fields_is_copied():
+    unrelated = {'tp': 1, 'fn': 2}
+    response = {'kind': 'NORMAL', 'data': {'confusion_matrix': unrelated, 'roc_curve': {'fpr': [0, 1]}}}
+    converted = as_numpy_arrays(response, ROC_ARRAY_FIELDS)
+
+    assert isinstance(response['data']['roc_curve']['fpr'], list)
+    assert converted['data'] is not response['data']
+    assert converted['data']['confusion_matrix'] is unrelated
+
+
+def test_response_without_fields_is_returned_as_is():
+    response = {'kind': 'NORMAL', 'data': {'explanations': [{'attribution': [0.1, 0.2]}]}}
+
+    assert as_numpy_arrays(response, ROC_ARRAY_FIELDS) is response
+
+
+def test_session_is_reused(fake_api, frontend_server):
+    call = FrontEndCall(fake_api, 'scores', connection=Connection())
+    for _ in range(3):
+        call.post({'metric': 'accuracy'})
+
+    assert len(frontend_server.posts) == 3
+    assert len(frontend_server.clients) == 1
+
+
+def test_overload_responses_are_retried(fake_api, frontend_server):
+    frontend_server.fail_statuses = [503, 429]
+    connection = Connection(ConnectionConfig(max_retries=2, backoff_factor=0))
+    response = FrontEndCall(fake_api, 'scores', connection=connection).post({'metric': 'accuracy'})
+
+    assert response['kind'] == 'NORMAL'
+    assert len(frontend_server.posts) == 3
+
+
+def test_overload_after_all_retries_raises(fake_api, frontend_server):
+    frontend_server.fail_statuses = [500] * 3
+    connection = Connection(ConnectionConfig(max_retries=1, backoff_factor=0))
+    with pytest.raises(requests.HTTPError):
+        FrontEndCall(fake_api, 'scores', connection=connection).post({'metric': 'accuracy'})
+
+    assert len(frontend_server.posts) == 2
+
+
+def test_read_timeout(fake_api, frontend_server):
+    frontend_server.latency = 0.5
+    connection = Connection(ConnectionConfig(max_retries=0, read_timeout=0.1))
+    start = time.monotonic()
+    with pytest.raises(requests.RequestException, match='timed out'):
+        FrontEndCall(fake_api, 'scores', connection=connection).post({'metric': 'accuracy'})
+
+    assert time.monotonic() - start < 0.5
+
+
+class ConnectionAnalysis(TextAnalysis):
+    """
+    Records the connection of the front-end calls made while it runs.
+    """
+    def iter_run(self, api):
+        self.connection = get_connection(api)
+        yield from super().iter_run(api)
+
+
+def test_connections_are_scoped_to_the_generator(fake_api, generator, tmp_path):
+    cached_generator = FiddlerReportGenerator(fiddler_api=fake_api, author='test',
+                                              response_cache=ResponseCache(str(tmp_path / 'responses.sqlite')))
+    cached_module, module = ConnectionAnalysis('first'), ConnectionAnalysis('second')
+    cached_generator.generate_report(project_id='p', analysis_modules=[cached_module], output_path='cached')
+    generator.generate_report(project_id='p', analysis_modules=[module], output_path='report')
+
+    assert cached_module.connection is cached_generator.connection
+    assert cached_module.connection.cache is not None
+    assert module.connection is generator.connection
+    assert module.connection.cache is None
+    assert get_connection(fake_api).cache is None
@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+from urllib3.util.retry import Retry
+
+from conftest import TextAnalysis, report_text
+from reportgen.analysis_modules import MemoizedFiddlerApi
+from reportgen.analysis_modules.concurrency import concurrency_controller, DEFAULT_INITIAL_LIMITS
+from reportgen.analysis_modules.connection_helpers import FrontEndCall, deadline_retry
+from reportgen.analysis_modules.deadline import DeadlineExceeded, deadline_scope
+
+
+class SlowAnalysis(TextAnalysis):
+    """
+    Makes a backend call after each text block.
+    """
+    def iter_run(self, api):
+        for output_module in super().iter_run(api):
+            yield output_module
+            api.get_slice(sql_query='SELECT * FROM baseline."m1" LIMIT 1', project_id='p')
+
+
+class SlowPreflightAnalysis(TextAnalysis):
+    def preflight(self, api, project_id):
+        time.sleep(self.delay)
+        api.get_model_info(project_id, 'm1')
+
+
+def test_truncated_module_keeps_its_outputs(generator):
+    # the first backend call is made well within the time budget, the second one after it
+    modules = [SlowAnalysis('first', 'second', delay=0.4), TextAnalysis('other')]
+    summary = generator.generate_report(project_id='p', analysis_modules=modules, output_path='report',
+                                        module_timeout=0.7)
+
+    text = report_text('report')
+    assert 'first' in text and 'second' in text and 'other' in text
+    assert any('SlowAnalysis section is incomplete' in paragraph for paragraph in text)
+    assert summary['truncated_modules'] == ['SlowAnalysis']
+
+
+def test_report_deadline_in_preflight_truncates_the_report(generator):
+    modules = [SlowPreflightAnalysis('first', delay=0.3), TextAnalysis('other')]
+    summary = generator.generate_report(project_id='p', analysis_modules=modules, output_path='report',
+                                        report_timeout=0.2)
+
+    text = report_text('report')
+    assert 'first' not in text and 'other' not in text
+    assert summary['truncated_modules'] == ['SlowPreflightAnalysis', 'TextAnalysis']
+
+
+def test_timed_out_request_is_not_sent_again(fake_api, frontend_server):
+    frontend_server.latency = 0.5
+    with pytest.raises(DeadlineExceeded):
+        with deadline_scope(0.2):
+            FrontEndCall(fake_api, 'scores').post({'metric': 'accuracy'})
+
+    time.sleep(0.5)
+    assert len(frontend_server.posts) == 1
+
+
+def test_retries_fit_into_the_remaining_time():
+    retry = Retry(total=3, backoff_factor=1)
+
+    assert deadline_retry(retry, 100).total == 3
+    # the first retry is immediate, the second one waits 2 seconds
+    assert deadline_retry(retry, 2.5).total == 2
+    assert deadline_retry(retry, 0.5).total == 1
+    assert deadline_retry(retry, 0.5).read == 0
+
+
+def test_abandoned_call_holds_its_slot(fake_api):
+    release = threading.Event()
+
+    class StalledApi:
+        def get_slice(self, sql_query, project_id):
+            release.wait(timeout=5)
+            return fake_api.get_slice(sql_query, project_id)
+
+    limiter = concurrency_controller.configure('get_slice', initial_limit=4)
+    try:
+        with pytest.raises(DeadlineExceeded):
+            with deadline_scope(0.1):
+                MemoizedFiddlerApi(StalledApi()).get_slice(sql_query='SELECT * FROM baseline."m1"', project_id='p')
+        assert limiter.in_flight == 1
+
+        release.set()
+        for _ in range(50):
+            if limiter.in_flight == 0:
+                break
+            time.sleep(0.01)
+        assert limiter.in_flight == 0
+    finally:
+        concurrency_controller.configure('get_slice', initial_limit=DEFAULT_INITIAL_LIMITS['get_slice'])
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from conftest import TextAnalysis
+from reportgen.analysis_modules import PerformanceAnalysis, PerformanceAnalysisSpec
+from reportgen.analysis_modules.concurrency import concurrency_controller
+from reportgen.analysis_modules.estimator import CostEstimator, recorded_latencies
+
+
+class FixedCallsAnalysis(TextAnalysis):
+    def __init__(self, calls):
+        super().__init__()
+        self.calls = calls
+
+    def estimate_calls(self, api):
+        return self.calls
+
+
+def performance_analysis():
+    return PerformanceAnalysis(analysis_specs=[PerformanceAnalysisSpec(model_id='m1', metric='accuracy',
+                                                                       interval_length='7D'),
+                                               PerformanceAnalysisSpec(model_id='m1', metric='recall',
+                                                                       interval_length='7D'),
+                                               ])
+
+
+def test_estimate_sums_the_modules(fake_api):
+    estimator = CostEstimator(fake_api, latencies={'scores': 2.0, 'get_model_info': 0.5})
+    estimate = estimator.estimate([FixedCallsAnalysis({'scores': 4, 'get_model_info': 1}),
+                                   FixedCallsAnalysis({'scores': 2, 'get_slice': 1})])
+
+    assert estimate['calls'] == {'get_model_info': 1, 'get_slice': 1, 'scores': 6}
+    assert estimate['data_calls'] == 7
+    assert [module['data_calls'] for module in estimate['modules']] == [4, 3]
+    # data calls use the whole concurrency budget of their endpoint, metadata calls are sequential
+    assert estimate['modules'][0]['wall_time'] == pytest.approx(4 * 2.0 / concurrency_controller.limit('scores') + 0.5)
+    assert estimate['wall_time'] == pytest.approx(sum(module['wall_time'] for module in estimate['modules']))
+
+
+def test_large_plans_are_reported(fake_api):
+    with pytest.warns(UserWarning, match='makes 20 data calls'):
+        CostEstimator(fake_api, large_plan_calls=10).estimate([FixedCallsAnalysis({'scores': 20})])
+
+
+def test_recorded_latencies():
+    io_summary = {'by_endpoint': {'scores': {'calls': 4, 'total_latency': 2.0},
+                                  'explain': {'calls': 0, 'total_latency': 0.0}}}
+
+    assert recorded_latencies(io_summary) == {'scores': 0.5}
+
+
+def test_dry_run_does_not_write_the_report(generator, frontend_server):
+    estimate = generator.generate_report(project_id='p', analysis_modules=[performance_analysis()],
+                                         output_path='report', dry_run=True)
+
+    assert estimate['calls']['scores'] > 0
+    assert generator.dry_run_estimate == estimate
+    assert frontend_server.posts == []
+    assert not os.path.exists('report.docx')
+
+
+def test_dry_run_estimates_the_report(generator, frontend_server):
+    module = performance_analysis()
+    estimate = generator.generate_report(project_id='p', analysis_modules=[module], output_path='report',
+                                         dry_run=True, use_cache=False)
+    generator.generate_report(project_id='p', analysis_modules=[module], output_path='report', use_cache=False)
+
+    # the specs share one time series, which the second preflight does not duplicate
+    assert len(module.analysis_modules) == 1
+    assert module.spec_outputs == [(0, 0), (0, 1)]
+    assert estimate['calls']['scores'] == len(frontend_server.posts)
@@ -0,0 +1,52 @@
+import pytest
+
+from reportgen.analysis_modules import IOStats, MemoizedFiddlerApi
+from reportgen.analysis_modules.connection_helpers import FrontEndCall
+from reportgen.analysis_modules.instrumentation import active_io_stats, module_scope, track_call
+
+
+@pytest.fixture
+def io_stats():
+    stats = IOStats()
+    token = active_io_stats.set(stats)
+    yield stats
+    active_io_stats.reset(token)
+
+
+def test_calls_are_attributed_to_modules(io_stats):
+    with module_scope('ProjectSummary'), module_scope('ModelEvaluation'):
+        with track_call('scores', request_bytes=10):
+            pass
+    with track_call('scores'):
+        pass
+
+    summary = io_stats.summary()
+    assert summary['total']['calls'] == 2
+    assert summary['by_endpoint']['scores']['request_bytes'] == 10
+    assert set(summary['by_module']) == {'ProjectSummary/ModelEvaluation', 'FiddlerReportGenerator'}
+
+
+def test_failed_calls_are_counted(io_stats):
+    with pytest.raises(ValueError):
+        with track_call('explain'):
+            raise ValueError('failed')
+
+    assert io_stats.summary()['by_endpoint']['explain']['errors'] == 1
+
+
+def test_client_and_front_end_calls_are_recorded(io_stats, fake_api):
+    MemoizedFiddlerApi(fake_api).get_slice(sql_query='SELECT * FROM baseline."m1" LIMIT 1', project_id='p')
+    FrontEndCall(fake_api, 'scores').post({'metric': 'accuracy'})
+
+    by_endpoint = io_stats.summary()['by_endpoint']
+    assert by_endpoint['get_slice']['calls'] == 1
+    assert by_endpoint['get_slice']['response_bytes'] > 0
+    assert by_endpoint['scores']['calls'] == 1
+    assert by_endpoint['scores']['response_bytes'] > 0
+
+
+def test_phases(io_stats):
+    with io_stats.phase('run'):
+        pass
+
+    assert 'run' in io_stats.summary()['phases']
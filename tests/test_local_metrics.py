@@ -0,0 +1,77 @@
+import warnings
+
+import fiddler as fdl
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn import metrics
+
+from reportgen.analysis_modules.local_metrics import LOCAL_METRICS, cell_metric, positive_class_rows
+
+SKLEARN_METRICS = {'accuracy': lambda y_true, y_score: metrics.accuracy_score(y_true, y_score > 0.5),
+                   'precision': lambda y_true, y_score: metrics.precision_score(y_true, y_score > 0.5,
+                                                                                zero_division=0),
+                   'recall': lambda y_true, y_score: metrics.recall_score(y_true, y_score > 0.5, zero_division=0),
+                   'f1_score': lambda y_true, y_score: metrics.f1_score(y_true, y_score > 0.5, zero_division=0),
+                   'auc': metrics.roc_auc_score,
+                   'mae': metrics.mean_absolute_error,
+                   'mse': metrics.mean_squared_error,
+                   'r2': metrics.r2_score,
+                   }
+
+
+def cells(model_task):
+    """
+    Returns the cell codes and rows of four cells: a mixed cell, a single-class (constant) cell, an empty cell and a
+    single-row cell. Rows with the code -1 belong to no cell.
+    """
+    rng = np.random.default_rng(0)
+    if model_task == fdl.ModelTask.BINARY_CLASSIFICATION:
+        y_true = np.concatenate([rng.random(50) > 0.5, np.ones(10, dtype=bool), [False], [True, False]])
+        # the outputs include ties and the threshold itself
+        y_output = np.concatenate([rng.choice([0.1, 0.5, 0.7, 0.9], 50), rng.random(10), [0.8], [0.9, 0.1]])
+    else:
+        y_true = np.concatenate([rng.normal(size=50), np.full(10, 2.0), [1.0], [3.0, 4.0]])
+        y_output = np.concatenate([rng.normal(size=50), rng.normal(size=10), [1.5], [3.0, 4.0]])
+    codes = np.concatenate([np.zeros(50, dtype=int), np.ones(10, dtype=int), [3], [-1, -1]])
+    return codes, y_true, y_output
+
+
+def sklearn_metric(metric, y_true, y_output):
+    if len(y_true) == 0:
+        return np.nan
+    with warnings.catch_warnings():
+        # sklearn warns about undefined metrics (auc of a single class, r2 of a single row) and returns NaN
+        warnings.simplefilter('ignore')
+        return SKLEARN_METRICS[metric](y_true, y_output)
+
+
+@pytest.mark.parametrize('model_task, metric', [(model_task, metric)
+                                                for model_task, task_metrics in LOCAL_METRICS.items()
+                                                for metric in task_metrics])
+def test_cell_metric_matches_sklearn(model_task, metric):
+    codes, y_true, y_output = cells(model_task)
+    values = cell_metric(model_task, metric, codes, 4, y_true, y_output)
+
+    expected = [sklearn_metric(metric, y_true[codes == cell], y_output[codes == cell]) for cell in range(4)]
+    np.testing.assert_allclose(values, expected, equal_nan=True)
+
+
+def test_sklearn_reference_covers_local_metrics():
+    assert {metric for task_metrics in LOCAL_METRICS.values() for metric in task_metrics} == set(SKLEARN_METRICS)
+
+
+@pytest.mark.parametrize('target', [pd.Series([0.0, 1.0, np.nan, 1.0]),
+                                    pd.Series([0, 1, 0, 1]),
+                                    pd.Series([0, 1, None, 1], dtype='Int64'),
+                                    pd.Series(['0', '1', '0', '1']),
+                                    pd.Series([False, True, False, True]),
+                                    pd.Series(pd.Categorical([0.0, 1.0, None, 1.0])),
+                                    ])
+@pytest.mark.parametrize('positive_class', [1, 1.0, '1'])
+def test_positive_class_matches_the_target_dtype(target, positive_class):
+    np.testing.assert_array_equal(positive_class_rows(target, positive_class), [False, True, False, True])
+
+
+def test_positive_class_label():
+    np.testing.assert_array_equal(positive_class_rows(pd.Series(['no', 'yes', None]), 'yes'), [False, True, False])
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from conftest import FakeFiddlerApi
+from reportgen.analysis_modules import MemoizedFiddlerApi, PerformanceAnalysis, PerformanceAnalysisSpec, \
+    PerformanceTimeSeries
+
+
+class SlowSliceApi(FakeFiddlerApi):
+    """
+    Records the largest number of get_slice calls of the time series (the ones with a time window) in flight.
+    """
+    def __init__(self, url):
+        super().__init__(url)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get_slice(self, sql_query, project_id):
+        if 'BETWEEN' not in sql_query:
+            return super().get_slice(sql_query, project_id)
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        with self._lock:
+            self.in_flight -= 1
+        return super().get_slice(sql_query, project_id)
+
+
+def run_time_series(api, **kwargs):
+    module = PerformanceTimeSeries(model_id='m1', metric='accuracy', interval_length='7D', start_time='2023-01-01',
+                                   end_time='2023-02-20', **kwargs)
+    module.preflight(api, 'p')
+    module.run(api)
+
+
+def test_scores_requests_in_flight(fake_api, frontend_server):
+    frontend_server.latency = 0.05
+    run_time_series(MemoizedFiddlerApi(fake_api), show_baseline=False, max_workers=2)
+
+    # seven weekly intervals
+    assert len(frontend_server.posts) == 7
+    assert frontend_server.max_in_flight == 2
+
+
+def test_scores_requests_use_the_connection_default(fake_api, frontend_server):
+    frontend_server.latency = 0.05
+    run_time_series(MemoizedFiddlerApi(fake_api), show_baseline=False)
+
+    assert frontend_server.max_in_flight > 2
+
+
+@pytest.mark.parametrize('max_workers', [1, 3])
+def test_local_slices_in_flight(frontend_server, max_workers):
+    api = SlowSliceApi(frontend_server.url)
+    run_time_series(MemoizedFiddlerApi(api), engine='local', chunk_length='7D', max_workers=max_workers)
+
+    assert api.max_in_flight == max_workers
+
+
+def test_specs_with_different_max_workers_are_not_merged(fake_api):
+    module = PerformanceAnalysis(analysis_specs=[PerformanceAnalysisSpec(model_id='m1', metric='accuracy',
+                                                                         max_workers=2),
+                                                 PerformanceAnalysisSpec(model_id='m1', metric='recall',
+                                                                         max_workers=2),
+                                                 PerformanceAnalysisSpec(model_id='m1', metric='auc'),
+                                                 ])
+    module.preflight(MemoizedFiddlerApi(fake_api), 'p')
+
+    assert [series.max_workers for series in module.analysis_modules] == [2, None]
+    assert module.analysis_modules[0].metrics == ['accuracy', 'recall']
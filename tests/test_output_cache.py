@@ -0,0 +1,79 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from conftest import TextAnalysis, report_text
+from reportgen.analysis_modules import ModuleOutputCache, MemoizedFiddlerApi, PerformanceTimeSeries, Segment, \
+    AlertsDetails, DatasetSummary, FailureCaseAnalysis
+from reportgen.replay import _fixture_key
+
+
+class CachedTextAnalysis(TextAnalysis):
+    def fingerprint_params(self):
+        return {'project_id': 'p', 'texts': self.texts}
+
+
+def time_series(**kwargs) -> PerformanceTimeSeries:
+    params = dict(model_id='m1', metric='accuracy', project_id='p', start_time='2023-01-01', end_time='2023-02-01',
+                  segments=Segment.categorical('cat'))
+    params.update(kwargs)
+    return PerformanceTimeSeries(**params)
+
+
+def test_fingerprint_is_stable(fake_api, tmp_path):
+    cache = ModuleOutputCache(str(tmp_path))
+    api = MemoizedFiddlerApi(fake_api)
+    module = time_series()
+    key = cache.fingerprint(module, api)
+
+    assert key == cache.fingerprint(time_series(), api)
+    # state created while the module runs is not part of the fingerprint
+    module.runtime_state = object()
+    assert key == cache.fingerprint(module, api)
+    # neither are arguments that only affect how the data is fetched
+    assert key == cache.fingerprint(time_series(max_workers=2, chunk_length='3D'), api)
+
+
+def test_fingerprint_changes_with_parameters(fake_api, tmp_path):
+    cache = ModuleOutputCache(str(tmp_path))
+    api = MemoizedFiddlerApi(fake_api)
+    key = cache.fingerprint(time_series(), api)
+
+    assert key != cache.fingerprint(time_series(metric='auc'), api)
+    assert key != cache.fingerprint(time_series(end_time='2023-02-02'), api)
+    assert key != cache.fingerprint(time_series(segments=Segment.categorical('cat', 'top_n', {'top_n': 2})), api)
+
+
+def test_modules_without_fingerprint_params_are_not_cached(fake_api, tmp_path):
+    assert ModuleOutputCache(str(tmp_path)).fingerprint(TextAnalysis('text'), MemoizedFiddlerApi(fake_api)) is None
+
+
+def test_modules_with_open_windows_are_not_cached(fake_api, tmp_path):
+    cache = ModuleOutputCache(str(tmp_path))
+    api = MemoizedFiddlerApi(fake_api)
+    modules = [AlertsDetails(project_id='p', start_time=datetime(2023, 1, 1), end_time=end_time)
+               for end_time in [datetime(2023, 2, 1), datetime.now(), None]]
+    for module in modules:
+        module.preflight(api, 'p')
+
+    assert [cache.fingerprint(module, api) is None for module in modules] == [False, True, True]
+    assert cache.fingerprint(FailureCaseAnalysis(project_id='p', models=['m1']), api) is None
+    # the row counts of the datasets are data-dependent
+    assert cache.fingerprint(DatasetSummary('p'), api) is None
+
+
+def test_unchanged_modules_are_restored(generator, fake_api, tmp_path):
+    generator.module_cache = ModuleOutputCache(str(tmp_path / 'modules'))
+    cached, uncached = CachedTextAnalysis('cached'), TextAnalysis('uncached')
+    generator.generate_report(project_id='p', analysis_modules=[cached, uncached], output_path='first')
+    io_summary = generator.generate_report(project_id='p', analysis_modules=[cached, uncached], output_path='second')
+
+    assert io_summary['cached_modules'] == ['CachedTextAnalysis']
+    assert (cached.runs, uncached.runs) == (1, 2)
+    assert report_text('second')[-2:] == ['cached', 'uncached']
+
+
+def test_fixture_keys_are_stable():
+    # changing these keys invalidates all recorded fixtures (see reportgen.replay)
+    assert _fixture_key(('p', 'm1'), {}) == '8c173679d2d1827848dac4c8e81ffdd4bdeae134b7a6cd3219f3d4f9c723de86'
+    assert _fixture_key('org', {'metric': 'accuracy', 'filter': SimpleNamespace(a=1)}) == \
+        '0590f2dcf017336c0b2987188709a78a428b3f4b69d4173a80370ddbec7b71fe'
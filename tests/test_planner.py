@@ -0,0 +1,83 @@
+import pytest
+
+from conftest import TextAnalysis, report_text
+from reportgen.analysis_modules import DataPlanner, MemoizedFiddlerApi, ModelEvaluation
+from reportgen.analysis_modules.planner import client_requirement, scores_requirement
+
+QUERY = 'SELECT * FROM baseline."m1" LIMIT 1'
+
+
+class SliceAnalysis(TextAnalysis):
+    """
+    Declares and runs one get_slice query.
+    """
+    def requirements(self, api):
+        return [client_requirement('get_slice', sql_query=QUERY, project_id='p')]
+
+    def iter_run(self, api):
+        api.get_slice(sql_query=QUERY, project_id='p')
+        yield from super().iter_run(api)
+
+
+class BrokenRequirementsAnalysis(TextAnalysis):
+    def requirements(self, api):
+        raise ValueError('unknown positive class')
+
+
+def test_identical_requirements_are_fetched_once(fake_api):
+    api = MemoizedFiddlerApi(fake_api)
+    planner = DataPlanner(api)
+    estimate = planner.plan([SliceAnalysis(), SliceAnalysis()])
+    fetch_plan = planner.execute()
+    api.get_slice(sql_query=QUERY, project_id='p')
+
+    assert estimate == {'get_slice': {'declared': 2, 'unique': 1}}
+    assert fetch_plan == {'get_slice': {'declared': 2, 'unique': 1, 'failed': 0}}
+    assert fake_api.calls.count('get_slice') == 1
+
+
+def test_failed_fetches_are_counted(fake_api, frontend_server):
+    class FailingFetchAnalysis(TextAnalysis):
+        def requirements(self, api):
+            # the project_id argument is missing
+            return [client_requirement('get_slice', sql_query=QUERY), scores_requirement({'metric': 'auc'})]
+
+    planner = DataPlanner(MemoizedFiddlerApi(fake_api))
+    planner.plan([FailingFetchAnalysis()])
+
+    with pytest.warns(UserWarning, match='1 planned fetches failed'):
+        fetch_plan = planner.execute()
+    assert fetch_plan['get_slice']['failed'] == 1
+    assert fetch_plan['scores']['failed'] == 0
+    assert len(frontend_server.posts) == 1
+
+
+def test_modules_without_requirements_are_skipped(generator):
+    with pytest.warns(UserWarning, match='BrokenRequirementsAnalysis'):
+        io_summary = generator.generate_report(project_id='p',
+                                               analysis_modules=[BrokenRequirementsAnalysis('broken'),
+                                                                 SliceAnalysis('slice')],
+                                               output_path='report',
+                                               plan_fetches=True,
+                                               )
+
+    assert io_summary['fetch_plan'] == {'get_slice': {'declared': 1, 'unique': 1, 'failed': 0}}
+    assert report_text('report')[-2:] == ['broken', 'slice']
+
+
+def test_fetches_are_not_planned_by_default(generator, fake_api):
+    io_summary = generator.generate_report(project_id='p', analysis_modules=[SliceAnalysis('slice')],
+                                           output_path='report')
+
+    assert io_summary['fetch_plan'] == {}
+    assert fake_api.calls.count('get_slice') == 1
+
+
+def test_requirements_do_not_change_the_module(fake_api):
+    api = MemoizedFiddlerApi(fake_api)
+    module = ModelEvaluation()
+    module.preflight(api, 'p')
+    fingerprint_params = module.fingerprint_params()
+
+    assert module.requirements(api)
+    assert module.fingerprint_params() == fingerprint_params
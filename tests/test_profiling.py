@@ -0,0 +1,79 @@
+import os
+import time
+
+from conftest import TextAnalysis, report_text
+from reportgen.output_modules.profiling import Profiler, active_profiler, profiled, profiled_iter
+
+
+def test_profiled_adds_to_the_active_profiler():
+    profiler = Profiler()
+    token = active_profiler.set(profiler)
+    try:
+        for _ in range(2):
+            with profiled('run', 'Module'):
+                time.sleep(0.01)
+    finally:
+        active_profiler.reset(token)
+
+    stats = profiler.summary()['run']['Module']
+    assert stats['calls'] == 2
+    assert stats['total'] >= 0.02
+    assert stats['max'] <= stats['total']
+
+
+def test_profiled_iter_excludes_the_consumer():
+    profiler = Profiler()
+
+    def produce():
+        for item in range(3):
+            time.sleep(0.01)
+            yield item
+
+    token = active_profiler.set(profiler)
+    try:
+        for _ in profiled_iter(produce(), 'run', 'Module'):
+            time.sleep(0.05)
+    finally:
+        active_profiler.reset(token)
+
+    stats = profiler.summary()['run']['Module']
+    assert stats['calls'] == 1
+    assert 0.03 <= stats['total'] < 0.15
+
+
+def test_records_are_sorted_by_total():
+    profiler = Profiler()
+    profiler.add('run', 'fast', 0.1)
+    profiler.add('run', 'slow', 1.0)
+    profiler.add('render_docx', 'Table', 0.5)
+
+    assert [record[1] for record in profiler.records()] == ['slow', 'Table', 'fast']
+
+
+def test_report_profile(generator):
+    summary = generator.generate_report(project_id='p', analysis_modules=[TextAnalysis('first')],
+                                        output_path='report', profile=True)
+
+    profile = summary['profile']
+    assert set(profile['preflight']) == {'TextAnalysis'}
+    assert profile['run']['TextAnalysis']['calls'] == 1
+    assert 'DescriptiveTextBlock' in profile['render_docx']
+    assert 'document.save' in profile['save']
+    assert 'Performance Profile' in report_text('report')
+    assert os.path.exists('report.prof')
+
+
+def test_no_profile_by_default(generator):
+    summary = generator.generate_report(project_id='p', analysis_modules=[TextAnalysis('first')],
+                                        output_path='report')
+
+    assert 'profile' not in summary
+    assert 'Performance Profile' not in report_text('report')
+    assert not os.path.exists('report.prof')
+
+
+def test_dry_run_writes_no_profile(generator):
+    generator.generate_report(project_id='p', analysis_modules=[TextAnalysis('first')], output_path='report',
+                              profile=True, dry_run=True)
+
+    assert not os.path.exists('report.prof')
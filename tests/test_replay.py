@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+from reportgen.analysis_modules import MemoizedFiddlerApi, ResponseCache
+from reportgen.analysis_modules.connection_helpers import Connection, FrontEndCall, active_connection
+from reportgen.analysis_modules.instrumentation import IOStats, active_io_stats
+from reportgen.replay import RecordingFiddlerApi, FakeFiddlerApi, POSTS_DIR
+
+
+def test_calls_are_replayed(fake_api, tmp_path):
+    recorder = RecordingFiddlerApi(fake_api, str(tmp_path))
+    model_info = recorder.get_model_info('p', 'm1')
+
+    replayed = FakeFiddlerApi(str(tmp_path))
+    assert replayed.get_model_info('p', 'm1').model_task == model_info.model_task
+    with pytest.raises(KeyError):
+        replayed.get_model_info('p', 'm2')
+    with pytest.raises(AttributeError):
+        replayed.list_projects()
+
+
+def test_posts_are_replayed(fake_api, frontend_server, tmp_path):
+    recorder = RecordingFiddlerApi(fake_api, str(tmp_path))
+    response = FrontEndCall(recorder, 'scores').post({'metric': 'accuracy'})
+
+    frontend_server.close()
+    assert FrontEndCall(FakeFiddlerApi(str(tmp_path)), 'scores').post({'metric': 'accuracy'}) == response
+
+
+def test_cached_responses_are_recorded(fake_api, frontend_server, tmp_path):
+    token = active_connection.set(Connection(cache=ResponseCache(str(tmp_path / 'responses.sqlite'))))
+    try:
+        FrontEndCall(fake_api, 'scores').post({'metric': 'accuracy'})
+        recorder = RecordingFiddlerApi(fake_api, str(tmp_path / 'fixtures'))
+        FrontEndCall(recorder, 'scores').post({'metric': 'accuracy'})
+    finally:
+        active_connection.reset(token)
+
+    assert len(frontend_server.posts) == 2
+    assert len(os.listdir(tmp_path / 'fixtures' / POSTS_DIR / 'scores')) == 1
+
+
+def test_injected_errors(fake_api, tmp_path):
+    RecordingFiddlerApi(fake_api, str(tmp_path)).list_models('p')
+
+    with pytest.raises(ConnectionError):
+        FakeFiddlerApi(str(tmp_path), error_rate=1.0).list_models('p')
+
+
+def test_transport_of_memoized_clients_is_not_tracked(fake_api, frontend_server, tmp_path):
+    api = MemoizedFiddlerApi(RecordingFiddlerApi(fake_api, str(tmp_path)))
+    stats = IOStats()
+    token = active_io_stats.set(stats)
+    try:
+        FrontEndCall(api, 'scores', connection=Connection()).post({'metric': 'accuracy'})
+    finally:
+        active_io_stats.reset(token)
+
+    assert api.frontend_transport == api.client.frontend_transport
+    assert set(stats.summary()['by_endpoint']) == {'scores'}
+    assert stats.summary()['by_endpoint']['scores']['calls'] == 1
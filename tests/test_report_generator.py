@@ -0,0 +1,25 @@
+import threading
+
+from conftest import TextAnalysis, report_text
+
+
+class BarrierAnalysis(TextAnalysis):
+    """
+    Waits until all modules sharing the barrier run at the same time.
+    """
+    def __init__(self, text, barrier):
+        super().__init__(text)
+        self.barrier = barrier
+
+    def iter_run(self, api):
+        self.barrier.wait(timeout=5)
+        yield from super().iter_run(api)
+
+
+def test_concurrent_modules_keep_their_order(generator):
+    barrier = threading.Barrier(3)
+    modules = [BarrierAnalysis('first', barrier), BarrierAnalysis('second', barrier), BarrierAnalysis('third', barrier)]
+    generator.generate_report(project_id='p', analysis_modules=modules, output_path='report', max_workers=3)
+
+    text = report_text('report')
+    assert text.index('first') < text.index('second') < text.index('third')
@@ -0,0 +1,86 @@
+import time
+
+import pandas as pd
+
+from reportgen.analysis_modules import ResponseCache, CACHE_FOREVER, NO_CACHE, MemoizedFiddlerApi, \
+    PerformanceTimeSeries
+from reportgen.analysis_modules.connection_helpers import Connection, FrontEndCall, active_connection
+from reportgen.analysis_modules.response_cache import canonical_request_key
+
+
+def test_request_key_ignores_key_order():
+    first = canonical_request_key('url', 'org', {'a': 1, 'b': {'c': 2, 'd': 3}})
+    second = canonical_request_key('url', 'org', {'b': {'d': 3, 'c': 2}, 'a': 1})
+
+    assert first == second
+    assert first != canonical_request_key('url', 'other', {'a': 1, 'b': {'c': 2, 'd': 3}})
+
+
+def test_put_and_get(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'responses.sqlite'))
+    cache.put('key', {'kind': 'NORMAL', 'data': {'accuracy': 0.8}})
+
+    assert cache.get('key') == {'kind': 'NORMAL', 'data': {'accuracy': 0.8}}
+    assert cache.get('other') is None
+    assert len(cache) == 1
+
+
+def test_expired_entries_are_not_returned(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'responses.sqlite'), ttl=0.01)
+    cache.put('key', {'kind': 'NORMAL'})
+    cache.put('forever', {'kind': 'NORMAL'}, ttl=CACHE_FOREVER)
+    time.sleep(0.05)
+
+    assert cache.get('key') is None
+    assert cache.get('forever') == {'kind': 'NORMAL'}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'responses.sqlite'), max_size_mb=150 / 1024 / 1024)
+    cache.put('first', {'data': 'x' * 50})
+    cache.put('second', {'data': 'x' * 50})
+    cache.get('first')
+    cache.put('third', {'data': 'x' * 50})
+
+    assert cache.get('second') is None
+    assert cache.get('first') is not None
+    assert cache.get('third') is not None
+
+
+def test_successful_responses_are_served_from_the_cache(fake_api, frontend_server, tmp_path):
+    connection = Connection(cache=ResponseCache(str(tmp_path / 'responses.sqlite')))
+    call = FrontEndCall(fake_api, 'scores', connection=connection)
+    first = call.post({'metric': 'accuracy'})
+    second = call.post({'metric': 'accuracy'})
+
+    assert first == second
+    assert len(frontend_server.posts) == 1
+
+
+def test_no_cache_bypasses_the_cache(fake_api, frontend_server, tmp_path):
+    cache = ResponseCache(str(tmp_path / 'responses.sqlite'))
+    call = FrontEndCall(fake_api, 'scores', connection=Connection(cache=cache))
+    call.post({'metric': 'accuracy'})
+    call.post({'metric': 'accuracy'}, cache_ttl=NO_CACHE)
+
+    assert len(frontend_server.posts) == 2
+    assert len(cache) == 1
+
+
+def test_open_intervals_are_not_cached(fake_api, frontend_server, tmp_path):
+    api = MemoizedFiddlerApi(fake_api)
+    today = pd.Timestamp.now(tz='UTC').tz_localize(None).floor('D')
+    token = active_connection.set(Connection(cache=ResponseCache(str(tmp_path / 'responses.sqlite'))))
+    try:
+        for _ in range(2):
+            frontend_server.posts.clear()
+            module = PerformanceTimeSeries(model_id='m1', metric='accuracy', interval_length='7D',
+                                           start_time=today - pd.Timedelta('7D'), end_time=today + pd.Timedelta('7D'))
+            module.preflight(api, 'p')
+            module.run(api)
+    finally:
+        active_connection.reset(token)
+
+    # the closed interval and the baseline are served from the cache
+    assert len(frontend_server.posts) == 1
+    assert f"'{today}'" in frontend_server.posts[0][1]['data_source']['query']
@@ -0,0 +1,60 @@
+import fiddler as fdl
+import pandas as pd
+
+from reportgen.analysis_modules import MemoizedFiddlerApi, PerformanceAnalysis, PerformanceAnalysisSpec, \
+    SchemaCatalog
+from reportgen.analysis_modules.schema_catalog import active_schema_catalog, schema_catalog
+
+
+def test_declared_columns_are_not_probed(fake_api):
+    catalog = SchemaCatalog()
+
+    assert catalog.column_type(fake_api, 'p', 'm1', 'production', 'cat') == fdl.DataType.CATEGORY
+    assert catalog.column_type(fake_api, 'p', 'm1', 'production', 'target') == fdl.DataType.INTEGER
+    assert fake_api.queries == []
+
+
+def test_undeclared_columns_are_probed_once(fake_api):
+    catalog = SchemaCatalog()
+
+    assert catalog.column_type(fake_api, 'p', 'm1', 'production', 'fiddler_timestamp') == fdl.DataType.TIMESTAMP
+    assert catalog.column_type(fake_api, 'p', 'm1', 'production', 'missing') is None
+    assert len(fake_api.queries) == 1
+    assert fake_api.calls.count('get_model_info') == 1
+
+
+def test_time_range_is_fetched_once(fake_api):
+    catalog = SchemaCatalog()
+    time_range = catalog.time_range(fake_api, 'p', 'm1', 'production')
+
+    assert time_range == (pd.Timestamp('2023-01-01'), fake_api.df['fiddler_timestamp'].max())
+    assert catalog.time_range(fake_api, 'p', 'm1', 'production') == time_range
+    assert len(fake_api.queries) == 1
+
+
+def test_schema_catalog_outside_of_a_report():
+    assert schema_catalog() is not schema_catalog()
+
+    catalog = SchemaCatalog()
+    token = active_schema_catalog.set(catalog)
+    try:
+        assert schema_catalog() is catalog
+    finally:
+        active_schema_catalog.reset(token)
+
+
+def test_specs_share_the_schema(fake_api):
+    module = PerformanceAnalysis(analysis_specs=[PerformanceAnalysisSpec(model_id='m1', metric='accuracy',
+                                                                         segment_col='cat', segment_mode='all'),
+                                                 PerformanceAnalysisSpec(model_id='m1', metric='auc',
+                                                                         interval_length='7D'),
+                                                 PerformanceAnalysisSpec(model_id='m1', metric='recall',
+                                                                         interval_length='3D'),
+                                                 ])
+    module.preflight(MemoizedFiddlerApi(fake_api), 'p')
+
+    assert len(module.analysis_modules) == 3
+    # one MIN/MAX query for the time range of all three series, the segment column is declared by the model
+    assert len(fake_api.queries) == 1
+    assert 'AS start_time' in fake_api.queries[0]
+    assert fake_api.calls.count('get_model_info') == 1
@@ -0,0 +1,76 @@
+import math
+import re
+
+import pandas as pd
+import pytest
+
+from reportgen.analysis_modules import IntervalScoreStore, MemoizedFiddlerApi, PerformanceTimeSeries
+from reportgen.analysis_modules.score_store import active_score_store
+
+SERIES = ('p', 'm1', 'production', 'accuracy', 'all', '7D')
+
+
+@pytest.fixture
+def store(tmp_path):
+    return IntervalScoreStore(str(tmp_path / 'scores' / 'interval_scores.sqlite'))
+
+
+@pytest.fixture
+def run_series(fake_api, frontend_server, store):
+    """
+    Runs a weekly accuracy time series with the score store and returns the start times of the production intervals
+    it requested.
+    """
+    api = MemoizedFiddlerApi(fake_api)
+
+    def run(start_time, end_time):
+        frontend_server.posts.clear()
+        module = PerformanceTimeSeries(model_id='m1', metric='accuracy', interval_length='7D',
+                                       start_time=start_time, end_time=end_time)
+        module.preflight(api, 'p')
+        token = active_score_store.set(store)
+        try:
+            module.run(api)
+        finally:
+            active_score_store.reset(token)
+        queries = [body['data_source']['query'] for _, body in frontend_server.posts]
+        # the baseline is always requested
+        assert sum('baseline' in query for query in queries) == 1
+        return sorted(pd.Timestamp(match.group(1))
+                      for query in queries for match in [re.search(r"BETWEEN '([^']+)'", query)] if match)
+    return run
+
+
+def test_scores_are_persisted(store):
+    store.put(SERIES, {'2023-01-01 00:00:00': 0.8, '2023-01-08 00:00:00': math.nan})
+
+    assert IntervalScoreStore(store.path).get(SERIES) == {'2023-01-01 00:00:00': 0.8}
+    assert store.get(SERIES[:-1] + ('1D',)) == {}
+
+
+def test_is_final():
+    store = IntervalScoreStore(':memory:', grace_period='6h')
+    interval = pd.Interval(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-08'))
+
+    assert not store.is_final(interval, now=pd.Timestamp('2023-01-08 05:00'))
+    assert store.is_final(interval, now=pd.Timestamp('2023-01-08 06:00'))
+
+
+def test_only_missing_intervals_are_fetched(run_series, store):
+    assert run_series('2023-01-01', '2023-01-20') == [pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-08')]
+    assert len(store) == 2
+
+    assert run_series('2023-01-01', '2023-01-20') == []
+    assert run_series('2023-01-01', '2023-01-27') == [pd.Timestamp('2023-01-15')]
+    assert len(store) == 3
+
+
+def test_open_intervals_are_fetched_again(run_series, store):
+    today = pd.Timestamp.now(tz='UTC').tz_localize(None).floor('D')
+    start_time = today - pd.Timedelta('14D')
+    closed = [start_time, start_time + pd.Timedelta('7D')]
+    current = start_time + pd.Timedelta('14D')
+
+    assert run_series(start_time, today + pd.Timedelta('7D')) == closed + [current]
+    assert len(store) == 2
+    assert run_series(start_time, today + pd.Timedelta('7D')) == [current]
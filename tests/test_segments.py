@@ -0,0 +1,112 @@
+import contextlib
+
+import numpy as np
+import pytest
+
+from conftest import _predicate
+from reportgen.analysis_modules import PerformanceTimeSeries, Segment
+from reportgen.analysis_modules.segment_analysis import OTHER_SEGMENT, bin_labels
+
+
+@pytest.fixture
+def time_series():
+    return PerformanceTimeSeries(project_id='p', model_id='m1', metric='accuracy')
+
+
+def segment_rows(fake_api, segment_predicates: dict) -> dict:
+    return {segment: _predicate(fake_api.df, predicate) for segment, predicate in segment_predicates.items()}
+
+
+def test_bin_labels():
+    assert bin_labels(np.array([0.0, 0.5, 1.0])) == ['[0, 0.5)', '[0.5, 1]']
+    assert bin_labels(np.array([1.5, 1.5])) == ['[1.5, 1.5]']
+
+
+def test_close_edges_get_distinct_labels():
+    edges = np.linspace(1000, 1001, 5)
+    labels = bin_labels(edges)
+
+    assert len(set(labels)) == 4
+    assert labels[0].startswith('[1000, ') and labels[-1].endswith(', 1001]')
+    assert len(set(bin_labels(np.array([1.0, 1.0 + 1e-12, 1.0 + 2e-12])))) == 2
+
+
+def test_equal_width_edges(fake_api, time_series):
+    edges = time_series._get_bin_edges(fake_api, 'production', Segment.numerical('a', args={'n_bins': 3}))
+    values = fake_api.df['a']
+
+    np.testing.assert_allclose(edges, np.linspace(values.min(), values.max(), 4))
+
+
+def test_quantile_edges(fake_api, time_series):
+    edges = time_series._get_bin_edges(fake_api, 'production', Segment.numerical('a', 'quantile', {'n_bins': 4}))
+    values = fake_api.df['a']
+
+    # the quantiles are interpolated from a histogram, so each bin holds about a quarter of the rows
+    assert edges[0] == values.min() and edges[-1] == values.max()
+    below = [np.mean(values < edge) for edge in edges[1:-1]]
+    np.testing.assert_allclose(below, [0.25, 0.5, 0.75], atol=2 / len(values))
+
+
+def test_explicit_edges_are_sorted_and_unique(fake_api, time_series):
+    segment = Segment.numerical('a', 'edges', {'edges': [1, -1, 0, 1]})
+    edges = time_series._get_bin_edges(fake_api, 'production', segment)
+
+    np.testing.assert_array_equal(edges, [-1, 0, 1])
+    assert fake_api.queries == []
+
+
+@pytest.mark.parametrize('edges', [[0, 1, np.inf], [-np.inf, 0], [0, np.nan, 1]])
+def test_non_finite_edges_are_rejected(edges):
+    with pytest.raises(ValueError, match='finite'):
+        Segment.numerical('a', 'edges', {'edges': edges})
+
+
+@pytest.mark.parametrize('mode', ['equal_width', 'quantile'])
+def test_bins_cover_every_row_once(fake_api, time_series, mode):
+    segment_predicates = time_series._get_segment_predicates(fake_api, 'production',
+                                                             Segment.numerical('a', mode, {'n_bins': 4}))
+    rows = segment_rows(fake_api, segment_predicates)
+
+    assert len(rows) == 4
+    assert (np.sum(list(rows.values()), axis=0) == 1).all()
+
+
+def test_close_bins_are_all_kept(fake_api, time_series):
+    fake_api.df['a'] = np.linspace(1000, 1001, len(fake_api.df))
+    segment_predicates = time_series._get_segment_predicates(fake_api, 'production', Segment.numerical('a'))
+
+    assert len(segment_predicates) == 4
+    assert (np.sum(list(segment_rows(fake_api, segment_predicates).values()), axis=0) == 1).all()
+
+
+@pytest.fixture
+def missing_categories(fake_api):
+    # the most frequent value of the column is NULL
+    fake_api.df['cat'] = fake_api.df['cat'].cat.add_categories(['w'])
+    fake_api.df.loc[:79, 'cat'] = None
+    fake_api.df.loc[80:84, 'cat'] = 'w'
+    return fake_api
+
+
+@pytest.mark.parametrize('mode, args', [('top_n_with_other', {'top_n': 2}),
+                                        ('list', {'categories': ['x', 'y'], 'other': True}),
+                                        ('all', {'max_segments': 2}),
+                                        ])
+def test_other_segment_includes_missing_categories(missing_categories, time_series, mode, args):
+    with pytest.warns(UserWarning) if mode == 'all' else contextlib.nullcontext():
+        segment_predicates = time_series._get_segment_predicates(missing_categories, 'production',
+                                                                 Segment.categorical('cat', mode, args))
+    rows = segment_rows(missing_categories, segment_predicates)
+
+    assert list(segment_predicates)[-1] == OTHER_SEGMENT
+    assert (np.sum(list(rows.values()), axis=0) == 1).all()
+    assert rows[OTHER_SEGMENT][missing_categories.df['cat'].isna()].all()
+
+
+def test_missing_categories_are_not_ranked(missing_categories, time_series):
+    segment_predicates = time_series._get_segment_predicates(missing_categories, 'production',
+                                                             Segment.categorical('cat', 'top_n', {'top_n': 3}))
+
+    assert sorted(segment_predicates) == ['x', 'y', 'z']
+    assert 'IS NOT NULL' in missing_categories.queries[-1]
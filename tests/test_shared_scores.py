@@ -0,0 +1,126 @@
+import re
+import warnings
+
+import numpy as np
+import pytest
+from sklearn import metrics
+
+from conftest import SCORES_RESPONSE, FakeFiddlerApi, _predicate
+from reportgen.analysis_modules import MemoizedFiddlerApi, PerformanceAnalysis, PerformanceAnalysisSpec, \
+    PerformanceTimeSeries, Segment
+
+
+def time_series(**kwargs):
+    return PerformanceTimeSeries(model_id='m1', interval_length='7D', start_time='2023-01-01', end_time='2023-01-20',
+                                 **kwargs)
+
+
+class ScoringFiddlerApi(FakeFiddlerApi):
+    """
+    A FakeFiddlerApi whose scores endpoint computes the metrics of the rows selected by the query with sklearn, and
+    whose table has rows without a target, which the backend leaves out.
+    """
+    def __init__(self):
+        super().__init__('http://scoring')
+        self.df['target'] = self.df['target'].astype(float)
+        self.df.loc[::7, 'target'] = np.nan
+
+    def frontend_transport(self, url, headers, request, timeout=None):
+        query = request['data_source']['query'].strip()
+        df = self.df
+        match = re.search(r"BETWEEN '([^']+)' AND '([^']+)'\)(?: AND (.*))?$", query)
+        if match:
+            df = df[(df['fiddler_timestamp'] >= match.group(1)) & (df['fiddler_timestamp'] <= match.group(2))]
+            predicate = match.group(3)
+        else:
+            match = re.search(r'WHERE (.*)$', query)
+            predicate = match.group(1) if match else None
+        if predicate:
+            df = df[_predicate(df, predicate)]
+
+        df = df[df['target'].notna()]
+        y_true, y_pred = df['target'] == 1, df['out'] > 0.5
+        with warnings.catch_warnings():
+            # the auc of a single class is undefined
+            warnings.simplefilter('ignore')
+            data = {'accuracy': metrics.accuracy_score(y_true, y_pred),
+                    'precision': metrics.precision_score(y_true, y_pred, zero_division=0),
+                    'recall': metrics.recall_score(y_true, y_pred, zero_division=0),
+                    'f1_score': metrics.f1_score(y_true, y_pred, zero_division=0),
+                    'auc': metrics.roc_auc_score(y_true, df['out']),
+                    }
+        return {'kind': 'NORMAL', 'data': data}
+
+
+def test_engines_compute_the_same_scores():
+    api = MemoizedFiddlerApi(ScoringFiddlerApi())
+    plots = {}
+    for engine in ['scores', 'local']:
+        module = PerformanceTimeSeries(model_id='m1', metric='accuracy',
+                                       additional_metrics=['precision', 'recall', 'f1_score', 'auc'],
+                                       interval_length='7D', start_time='2023-01-01', end_time='2023-02-20',
+                                       segments=Segment.categorical('cat'), engine=engine)
+        module.preflight(api, 'p')
+        plots[engine] = module.run(api)
+
+    for endpoint_plot, local_plot in zip(plots['scores'], plots['local']):
+        assert set(endpoint_plot.data) == set(local_plot.data) == {'production_all', 'production_x',
+                                                                  'production_y', 'production_z'}
+        for series in endpoint_plot.data:
+            np.testing.assert_allclose(local_plot.data[series], endpoint_plot.data[series], equal_nan=True)
+        assert set(endpoint_plot.benchmarks) == set(local_plot.benchmarks)
+        np.testing.assert_allclose([local_plot.benchmarks[series] for series in endpoint_plot.benchmarks],
+                                   list(endpoint_plot.benchmarks.values()), equal_nan=True)
+
+
+def test_metrics_share_the_scores_responses(fake_api, frontend_server):
+    api = MemoizedFiddlerApi(fake_api)
+    module = time_series(metric='accuracy', additional_metrics=['recall', 'accuracy', 'auc'])
+    module.preflight(api, 'p')
+    plots = module.run(api)
+
+    assert module.metrics == ['accuracy', 'recall', 'auc']
+    # two intervals and the baseline, each requested once for all metrics
+    assert len(frontend_server.posts) == 3
+    assert [plot.ylabel for plot in plots] == module.metrics
+    for plot in plots:
+        assert plot.data == {'production_all': [SCORES_RESPONSE['data'][plot.ylabel]] * 2}
+        assert plot.benchmarks == {'baseline_all': SCORES_RESPONSE['data'][plot.ylabel]}
+
+
+def test_local_engine_fetches_the_rows_once(fake_api):
+    api = MemoizedFiddlerApi(fake_api)
+    single = time_series(metric='accuracy', engine='local')
+    single.preflight(api, 'p')
+    single.run(api)
+    single_queries = len(fake_api.queries)
+
+    fake_api.queries.clear()
+    shared = time_series(metric='accuracy', additional_metrics=['recall', 'auc'], engine='local')
+    shared.preflight(api, 'p')
+    plots = shared.run(api)
+
+    assert len(fake_api.queries) == single_queries
+    assert len(plots) == 3
+
+
+def test_specs_that_differ_in_metric_share_a_time_series(generator, frontend_server):
+    specs = [PerformanceAnalysisSpec(model_id='m1', metric=metric, interval_length='7D')
+             for metric in ['accuracy', 'recall', 'auc']]
+    module = PerformanceAnalysis(analysis_specs=specs, start_time='2023-01-01', end_time='2023-01-20')
+    generator.generate_report(project_id='p', analysis_modules=[module], output_path='report', use_cache=False)
+
+    assert len(module.analysis_modules) == 1
+    assert module.spec_outputs == [(0, 0), (0, 1), (0, 2)]
+    assert len(frontend_server.posts) == 3
+
+
+def test_failed_scores_are_missing():
+    module = time_series(metric='accuracy', additional_metrics=['recall'])
+    response = {'kind': 'ERROR', 'error': 'bad query'}
+    request = {'data_source': {'query': ' SELECT * FROM production."m1" '}}
+
+    with pytest.warns(UserWarning, match='bad query.*SELECT'):
+        scores = module._get_scores(response, request, module.metrics)
+    assert list(scores) == ['accuracy', 'recall']
+    assert all(np.isnan(score) for score in scores.values())
@@ -0,0 +1,67 @@
+from datetime import date
+
+from conftest import TextAnalysis, report_text
+from reportgen.analysis_modules import ProjectSummary, MemoizedFiddlerApi
+from reportgen.output_modules import DescriptiveTextBlock
+
+
+class AlertsStub(TextAnalysis):
+    alerts_count = 0
+
+    def _load_alerts(self, api):
+        pass
+
+
+class TrackedAnalysis(TextAnalysis):
+    """
+    Records the outputs it has produced; run must not be used when the outputs are streamed.
+    """
+    def __init__(self, *texts):
+        super().__init__(*texts)
+        self.produced = []
+
+    def run(self, api):
+        raise AssertionError('run is called instead of iter_run')
+
+    def iter_run(self, api):
+        for text in self.texts:
+            self.produced.append(text)
+            yield DescriptiveTextBlock(text)
+
+
+def project_summary(max_workers=1, **submodules) -> ProjectSummary:
+    summary = ProjectSummary(project_id='p', start_time=date(2023, 1, 1), end_time=date(2023, 2, 1),
+                             max_workers=max_workers)
+    summary.submodules = {'AlertsSummary': AlertsStub('alerts'), **submodules}
+    return summary
+
+
+def test_submodule_outputs_are_streamed(fake_api):
+    submodule = TrackedAnalysis('first', 'second')
+    summary = project_summary(PerformanceAnalysis=submodule)
+
+    texts = []
+    for output_module in summary.iter_run(MemoizedFiddlerApi(fake_api)):
+        if isinstance(output_module, DescriptiveTextBlock):
+            texts.append(output_module.text)
+            if output_module.text == 'first':
+                assert submodule.produced == ['first']
+
+    assert texts == ['alerts', 'first', 'second']
+
+
+def test_concurrent_submodules_are_collected_in_order(fake_api):
+    summary = project_summary(max_workers=2,
+                              ModelSummary=TrackedAnalysis('model'),
+                              PerformanceAnalysis=TrackedAnalysis('performance'))
+    texts = [output_module.text for output_module in summary.iter_run(MemoizedFiddlerApi(fake_api))
+             if isinstance(output_module, DescriptiveTextBlock)]
+
+    assert texts == ['model', 'alerts', 'performance']
+
+
+def test_streaming_report(generator):
+    generator.generate_report(project_id='p', analysis_modules=[TextAnalysis('first', 'second'), TextAnalysis('third')],
+                              output_path='report', streaming=True)
+
+    assert report_text('report')[-3:] == ['first', 'second', 'third']